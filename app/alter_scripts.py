@@ -2170,6 +2170,198 @@ def check_and_enable_trigram():
         db.rollback()
     finally:
         db.close()
+
+def token_store_session_id():
+    db = SessionLocal()
+    try:
+        db.execute(text("ALTER TABLE token_store ADD COLUMN IF NOT EXISTS session_id VARCHAR(32);"))
+        db.execute(text("""
+        CREATE UNIQUE INDEX IF NOT EXISTS token_store_session_id_key
+        ON token_store (session_id);
+        """))
+        db.commit()
+        print("token_store.session_id column and unique index created successfully!")
+
+    except Exception as e:
+        db.rollback()
+        print("Error while altering table:", e)
+
+    finally:
+        db.close()
+
+def token_store_hash_tokens():
+    db = SessionLocal()
+    try:
+        db.execute(text("ALTER TABLE token_store ADD COLUMN IF NOT EXISTS access_token_hash BYTEA;"))
+        db.execute(text("ALTER TABLE token_store ADD COLUMN IF NOT EXISTS refresh_token_hash BYTEA;"))
+
+        # --- Rehash existing rows while the raw token columns still exist ---
+        has_raw_tokens = db.execute(text("""
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'token_store' AND column_name = 'access_token';
+        """)).fetchone()
+
+        if has_raw_tokens:
+            db.execute(text("""
+            UPDATE token_store
+            SET access_token_hash = sha256(convert_to(access_token, 'UTF8')),
+                refresh_token_hash = sha256(convert_to(refresh_token, 'UTF8'))
+            WHERE access_token_hash IS NULL OR refresh_token_hash IS NULL;
+            """))
+            print("Existing token_store rows rehashed successfully.")
+
+        db.execute(text("ALTER TABLE token_store ALTER COLUMN access_token_hash SET NOT NULL;"))
+        db.execute(text("ALTER TABLE token_store ALTER COLUMN refresh_token_hash SET NOT NULL;"))
+
+        # --- Drop raw token columns and their constraints ---
+        db.execute(text("ALTER TABLE token_store DROP CONSTRAINT IF EXISTS uq_user_refresh_token;"))
+        db.execute(text("ALTER TABLE token_store DROP CONSTRAINT IF EXISTS check_access_token_length;"))
+        db.execute(text("ALTER TABLE token_store DROP CONSTRAINT IF EXISTS check_refresh_token_length;"))
+        db.execute(text("ALTER TABLE token_store DROP COLUMN IF EXISTS access_token;"))
+        db.execute(text("ALTER TABLE token_store DROP COLUMN IF EXISTS refresh_token;"))
+
+        # --- Fixed-width digest constraints and indexes ---
+        db.execute(text("ALTER TABLE token_store DROP CONSTRAINT IF EXISTS check_access_token_hash_length;"))
+        db.execute(text("ALTER TABLE token_store DROP CONSTRAINT IF EXISTS check_refresh_token_hash_length;"))
+        db.execute(text("""
+        ALTER TABLE token_store
+        ADD CONSTRAINT check_access_token_hash_length CHECK (octet_length(access_token_hash) = 32),
+        ADD CONSTRAINT check_refresh_token_hash_length CHECK (octet_length(refresh_token_hash) = 32);
+        """))
+        db.execute(text("""
+        CREATE UNIQUE INDEX IF NOT EXISTS token_store_refresh_token_hash_key
+        ON token_store (refresh_token_hash);
+        """))
+        db.execute(text("""
+        CREATE INDEX IF NOT EXISTS ix_token_store_user_tokens
+        ON token_store (user_id, access_token_hash, refresh_token_hash);
+        """))
+        db.commit()
+        print("token_store now keeps SHA-256 token digests with a composite lookup index!")
+
+    except Exception as e:
+        db.rollback()
+        print("Error while altering table:", e)
+
+    finally:
+        db.close()
+
+def expiry_indexes():
+    db = SessionLocal()
+    try:
+        db.execute(text("""
+        CREATE INDEX IF NOT EXISTS ix_token_store_refresh_token_expiry
+        ON token_store (refresh_token_expiry);
+        """))
+        db.execute(text("""
+        CREATE INDEX IF NOT EXISTS ix_otps_expiry
+        ON otps (expiry) WHERE expiry IS NOT NULL;
+        """))
+        db.execute(text("""
+        CREATE INDEX IF NOT EXISTS ix_revoked_sessions_expires_at
+        ON revoked_sessions (expires_at);
+        """))
+        db.commit()
+        print("Expiry indexes for the reaper created successfully!")
+
+    except Exception as e:
+        db.rollback()
+        print("Error while altering table:", e)
+
+    finally:
+        db.close()
+
+def room_rating_stats():
+    db = SessionLocal()
+    try:
+        db.execute(text("ALTER TABLE ratings_reviews ADD COLUMN IF NOT EXISTS ratings SMALLINT;"))
+        db.execute(text("ALTER TABLE ratings_reviews DROP CONSTRAINT IF EXISTS check_ratings_range;"))
+        db.execute(text("""
+        ALTER TABLE ratings_reviews
+        ADD CONSTRAINT check_ratings_range CHECK (ratings IS NULL OR ratings BETWEEN 1 AND 5);
+        """))
+        db.execute(text("""
+        CREATE TABLE IF NOT EXISTS room_rating_stats (
+            room_id INTEGER PRIMARY KEY REFERENCES rooms(id) ON DELETE CASCADE,
+            rating_count INTEGER NOT NULL DEFAULT 0,
+            rating_sum INTEGER NOT NULL DEFAULT 0,
+            avg_rating NUMERIC(3, 2),
+            star_1 INTEGER NOT NULL DEFAULT 0,
+            star_2 INTEGER NOT NULL DEFAULT 0,
+            star_3 INTEGER NOT NULL DEFAULT 0,
+            star_4 INTEGER NOT NULL DEFAULT 0,
+            star_5 INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            CONSTRAINT check_rating_count_non_negative CHECK (rating_count >= 0)
+        );
+        """))
+        db.execute(text("""
+        CREATE INDEX IF NOT EXISTS ix_room_rating_stats_avg_rating
+        ON room_rating_stats (avg_rating, rating_count);
+        """))
+        db.commit()
+        print("room_rating_stats table created; it is filled on the next application start!")
+
+    except Exception as e:
+        db.rollback()
+        print("Error while altering table:", e)
+
+    finally:
+        db.close()
+
+
+def ratings_reviews_room_index():
+    db = SessionLocal()
+    try:
+        db.execute(text("""
+        CREATE INDEX IF NOT EXISTS ix_ratings_reviews_room_created
+        ON ratings_reviews (room_id, created_at DESC, id DESC);
+        """))
+        db.commit()
+        print("ratings_reviews room index created!")
+
+    except Exception as e:
+        db.rollback()
+        print("Error while creating index:", e)
+
+    finally:
+        db.close()
+
+
+def review_outbox():
+    db = SessionLocal()
+    try:
+        db.execute(text("""
+        CREATE TABLE IF NOT EXISTS review_outbox (
+            id BIGSERIAL PRIMARY KEY,
+            op VARCHAR(10) NOT NULL,
+            object_id VARCHAR(24) NOT NULL,
+            payload JSONB,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            processed_at TIMESTAMPTZ,
+            CONSTRAINT check_review_outbox_op CHECK (op IN ('upsert', 'delete'))
+        );
+        """))
+        db.execute(text("""
+        CREATE INDEX IF NOT EXISTS ix_review_outbox_pending
+        ON review_outbox (id) WHERE processed_at IS NULL;
+        """))
+        db.execute(text("""
+        CREATE INDEX IF NOT EXISTS ix_review_outbox_object_id
+        ON review_outbox (object_id);
+        """))
+        db.commit()
+        print("review_outbox table created!")
+
+    except Exception as e:
+        db.rollback()
+        print("Error while creating table:", e)
+
+    finally:
+        db.close()
+
         
 if __name__ == "__main__":
     create_extension()
@@ -2190,6 +2382,12 @@ if __name__ == "__main__":
     users_search_vector()
     users_search_text()
     check_and_enable_trigram()
+    token_store_session_id()
+    token_store_hash_tokens()
+    expiry_indexes()
+    room_rating_stats()
+    ratings_reviews_room_index()
+    review_outbox()
     
     
     
\ No newline at end of file
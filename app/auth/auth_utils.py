@@ -1,53 +1,56 @@
 import inspect
 from functools import wraps
+from typing import List, Union
 from fastapi import Request, HTTPException
+from app.auth.scope_mask import ADMIN_FULL_SCOPE, scope_bit, scopes_to_mask
+
+
+def require_scope(required_scope: Union[str, List[str]]):
+    """
+    Guard a route with one or more scopes. The required scopes are compiled
+    into a bitmask at import time, so each request is checked with a single
+    AND against the role mask the auth middleware puts on request.state.
+    """
+    scope_names = [required_scope] if isinstance(required_scope, str) else list(required_scope)
+    required_mask = scopes_to_mask(scope_names) | scope_bit(ADMIN_FULL_SCOPE)
 
-def require_scope(required_scope: str):
     def decorator(func):
+        is_coroutine = inspect.iscoroutinefunction(func)
+        signature = inspect.signature(func)
+
+        request_param = next(
+            (name for name, param in signature.parameters.items() if param.annotation is Request),
+            None
+        )
+        inject_request = request_param is None
+        if inject_request:
+            request_param = "request"
+
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            
-            request = None
-            
-            for arg in args:
-                if isinstance(arg, Request):
-                    request = arg
-                    break
-            
-            if not request:
-                request = kwargs.get('request')
-            
-            if not request:
-                print(f"  ERROR in require_scope: Request not found")
-                print(f"   Args: {[type(a).__name__ for a in args]}")
-                print(f"   Kwargs: {list(kwargs.keys())}")
-                raise HTTPException(status_code=500, detail="Request not found in decorator")
-
-            scopes = getattr(request.state, "scopes", [])
-            role = getattr(request.state, "role", None)
-            role_name = role.role_name if role else "unknown"
-
-            print(f" Checking scope '{required_scope}' for role '{role_name}' with scopes: {scopes}")
-
-            if "admin:full" in scopes:
-                print(f"Admin bypass granted")
-                if inspect.iscoroutinefunction(func):
-                    return await func(*args, **kwargs)
-                return func(*args, **kwargs)
-
-            if not any(s in scopes for s in required_scope):
+            request = kwargs.pop(request_param, None) if inject_request else kwargs.get(request_param)
+
+            if request is None:
+                request = next((arg for arg in args if isinstance(arg, Request)), None)
+                if request is None:
+                    raise HTTPException(status_code=500, detail="Request not found in decorator")
+
+            if not getattr(request.state, "scope_mask", 0) & required_mask:
+                role = getattr(request.state, "role", None)
+                role_name = role.role_name if role else "unknown"
                 raise HTTPException(
                     status_code=403,
-                    detail=f"Role '{role_name}' lacks required permission: {required_scope}"
+                    detail=f"Role '{role_name}' lacks required permission: {scope_names}"
                 )
 
-            print(f"Scope check passed")
-            
-            if inspect.iscoroutinefunction(func):
+            if is_coroutine:
                 return await func(*args, **kwargs)
             return func(*args, **kwargs)
 
+        if inject_request:
+            params = list(signature.parameters.values())
+            params.append(inspect.Parameter(request_param, inspect.Parameter.KEYWORD_ONLY, annotation=Request))
+            wrapper.__signature__ = signature.replace(parameters=params)
+
         return wrapper
     return decorator
-
-
@@ -1,6 +1,23 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+from fastapi import HTTPException
 from passlib.context import CryptContext
+from app.core.config import get_settings
+from app.core.metrics import metrics
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+settings = get_settings()
+
+# min/max rounds pinned to the configured cost so hashes made with any other
+# cost are flagged by needs_update and rehashed on the next successful login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
 
 def get_password_hash(password: str) -> str:
     """Hash a password for storing."""
@@ -11,3 +28,43 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
     return pwd_context.verify(plain_password, hashed_password)
 
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a bounded thread pool so a login burst never stalls the
+    event loop. Requests beyond max_pending are rejected with 503.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._workers = workers
+        self._max_pending = max_pending
+        self._pending = 0
+
+    async def _run(self, operation: str, fn, *args):
+        if self._pending >= self._max_pending:
+            metrics.incr("hashing.rejected")
+            raise HTTPException(status_code=503, detail="Too many concurrent sign-ins, please retry")
+
+        self._pending += 1
+        metrics.set_gauge("hashing.queue_depth", max(self._pending - self._workers, 0))
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+            metrics.set_gauge("hashing.queue_depth", max(self._pending - self._workers, 0))
+            metrics.observe(f"hashing.{operation}", (time.perf_counter() - start) * 1000)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Verify a password; the second value is a fresh hash when the stored cost is outdated."""
+        return await self._run("verify", pwd_context.verify_and_update, password, hashed_password)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+password_hasher = PasswordHasher(settings.HASH_WORKERS, settings.HASH_MAX_PENDING)
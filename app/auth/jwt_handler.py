@@ -1,3 +1,4 @@
+import hashlib
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from typing import Optional, Dict
@@ -87,6 +88,11 @@ def verify_refresh_token(token: str) -> Dict:
         )
 
 
+def hash_token(token: str) -> bytes:
+    """SHA-256 digest under which a token is stored and looked up in token_store."""
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
 def get_token(request: Request) -> str:
     """
     Extract token from cookie (preferred) or Authorization header (fallback).
@@ -0,0 +1,43 @@
+from typing import Dict
+from fastapi import HTTPException, status
+from app.core.database_postgres import SessionLocal
+from app.models.user import Users
+
+
+class RolePrincipal:
+    """Role of the authenticated user as carried in the access token."""
+
+    def __init__(self, role_id: int, role_name: str):
+        self.id = role_id
+        self.role_name = role_name
+
+
+class Principal:
+    """
+    Authenticated user built from verified access token claims. Columns that
+    are not carried in the token are loaded from the users table on first use.
+    """
+
+    def __init__(self, payload: Dict):
+        self.id = int(payload["sub"])
+        self.email = payload.get("email")
+        self.phone_no = payload.get("phone_no")
+        self.role_id = payload.get("role_id")
+        self._user = None
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        if self._user is None:
+            db = SessionLocal()
+            try:
+                self._user = db.query(Users).filter(Users.id == self.id).first()
+            finally:
+                db.close()
+
+            if self._user is None:
+                # the token outlived its user (deleted after it was issued)
+                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User no longer exists")
+
+        return getattr(self._user, name)
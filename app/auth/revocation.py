@@ -0,0 +1,132 @@
+import hashlib
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from app.core.config import get_settings
+from app.core.database_postgres import SessionLocal
+from app.models.revoked_session import RevokedSessions
+from app.models.token_store import TokenStore
+
+settings = get_settings()
+
+
+class BloomFilter:
+    """Fixed-size bloom filter over session ids, used as the negative fast path."""
+
+    def __init__(self, size_bits: int, hashes: int):
+        self.size_bits = size_bits
+        self.hashes = hashes
+        self.bits = bytearray((size_bits + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=8 * self.hashes).digest()
+        for i in range(self.hashes):
+            yield int.from_bytes(digest[i * 8:(i + 1) * 8], "little") % self.size_bits
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def might_contain(self, key: str) -> bool:
+        for pos in self._positions(key):
+            if not self.bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+
+class RevocationList:
+    """
+    In-memory set of revoked session ids. A bloom filter answers the common
+    "not revoked" case; hits are confirmed against the exact set. Entries
+    are pulled from the revoked_sessions table, which is written whenever a
+    TokenStore row is deleted.
+    """
+
+    def __init__(self, size_bits: int, hashes: int):
+        self._size_bits = size_bits
+        self._hashes = hashes
+        self._bloom = BloomFilter(size_bits, hashes)
+        self._revoked: Dict[str, datetime] = {}
+        self._last_synced_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def add(self, session_id: str, expires_at: datetime):
+        with self._lock:
+            self._revoked[session_id] = expires_at
+            self._bloom.add(session_id)
+
+    def is_revoked(self, session_id: str) -> bool:
+        if not self._bloom.might_contain(session_id):
+            return False
+        return session_id in self._revoked
+
+    def prune(self, now: Optional[datetime] = None):
+        """Drop entries whose access tokens have expired and rebuild the filter."""
+        now = now or datetime.now(timezone.utc)
+        with self._lock:
+            live = {sid: exp for sid, exp in self._revoked.items() if exp > now}
+            if len(live) == len(self._revoked):
+                return
+            bloom = BloomFilter(self._size_bits, self._hashes)
+            for sid in live:
+                bloom.add(sid)
+            self._revoked = live
+            self._bloom = bloom
+
+    def sync(self):
+        """Pull revocations written since the last sync, by this or any other worker."""
+        now = datetime.now(timezone.utc)
+        db = SessionLocal()
+        try:
+            query = db.query(RevokedSessions.session_id, RevokedSessions.expires_at)
+            if self._last_synced_at is not None:
+                since = self._last_synced_at - timedelta(seconds=settings.REVOCATION_SYNC_OVERLAP_SECONDS)
+                query = query.filter(RevokedSessions.created_at >= since)
+            rows = query.all()
+        finally:
+            db.close()
+
+        for session_id, expires_at in rows:
+            if expires_at > now:
+                self.add(session_id, expires_at)
+        self._last_synced_at = now
+
+        self.prune(now)
+        return len(rows)
+
+
+revocation_list = RevocationList(settings.REVOCATION_BLOOM_BITS, settings.REVOCATION_BLOOM_HASHES)
+
+
+PENDING_REVOCATIONS = "pending_revocations"
+
+
+def record_revocation(db: Session, connection, session_id: Optional[str], expires_at: datetime):
+    """
+    Write a revocation row on the session's connection. It is applied to the
+    local list once the session commits, so a rollback leaves nothing behind.
+    """
+    if not session_id:
+        return
+    connection.execute(
+        RevokedSessions.__table__.insert().values(session_id=session_id, expires_at=expires_at)
+    )
+    db.info.setdefault(PENDING_REVOCATIONS, []).append((session_id, expires_at))
+
+
+@event.listens_for(TokenStore, "after_delete")
+def _revoke_deleted_session(mapper, connection, target):
+    record_revocation(object_session(target), connection, target.session_id, target.access_token_expiry)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed_revocations(session):
+    for session_id, expires_at in session.info.pop(PENDING_REVOCATIONS, []):
+        revocation_list.add(session_id, expires_at)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back_revocations(session):
+    session.info.pop(PENDING_REVOCATIONS, None)
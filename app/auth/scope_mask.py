@@ -0,0 +1,92 @@
+import time
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import event
+from app.alter_scopes import DEFAULT_SCOPES
+from app.core.config import get_settings
+from app.core.database_postgres import SessionLocal
+from app.models.role import Roles
+from app.models.scope import Scopes
+
+settings = get_settings()
+
+ADMIN_FULL_SCOPE = "admin:full"
+
+_scope_bits: Dict[str, int] = {}
+# role id -> (mask, compiled_at); entries older than SCOPE_MASK_TTL_SECONDS
+# are recompiled so scope edits made elsewhere are picked up
+_role_masks: Dict[int, Tuple[int, float]] = {}
+
+
+def scope_bit(scope_name: str) -> int:
+    """Return the bit assigned to a scope, allocating the next free one for unseen names."""
+    bit = _scope_bits.get(scope_name)
+    if bit is None:
+        bit = 1 << len(_scope_bits)
+        _scope_bits[scope_name] = bit
+    return bit
+
+
+def scopes_to_mask(scope_names: Iterable[str]) -> int:
+    """Fold a list of scope names into a single integer bitmask."""
+    mask = 0
+    for scope_name in scope_names:
+        mask |= scope_bit(scope_name)
+    return mask
+
+
+@lru_cache(maxsize=64)
+def scope_claim_mask(scope_claim: str) -> int:
+    """Return the mask for a space separated "scope" token claim."""
+    return scopes_to_mask(scope_claim.split())
+
+
+def _fresh(entry: Optional[Tuple[int, float]]) -> bool:
+    return entry is not None and time.monotonic() - entry[1] < settings.SCOPE_MASK_TTL_SECONDS
+
+
+def role_mask(role: Roles) -> int:
+    """Return the precomputed bitmask of a role, compiling it on first sight or once it is stale."""
+    entry = _role_masks.get(role.id)
+    if not _fresh(entry):
+        entry = (scopes_to_mask(scope.scope_name for scope in role.scope), time.monotonic())
+        _role_masks[role.id] = entry
+    return entry[0]
+
+
+def invalidate_role_mask(role_id: Optional[int] = None):
+    """Drop one role's compiled mask (or all of them) so the next lookup recompiles it."""
+    if role_id is None:
+        _role_masks.clear()
+    else:
+        _role_masks.pop(role_id, None)
+
+
+# in-process ORM edits (including role.scope = [...], which fires both)
+@event.listens_for(Roles.scope, "append")
+@event.listens_for(Roles.scope, "remove")
+def _role_scopes_changed(target, value, initiator):
+    invalidate_role_mask(target.id)
+
+
+def init_scope_catalog():
+    """
+    Compile every scope in the scopes table into a bit position and
+    precompute the bitmask of each role. Run once at startup.
+    """
+    db = SessionLocal()
+    try:
+        for (scope_name,) in db.query(Scopes.scope_name).order_by(Scopes.id).all():
+            scope_bit(scope_name)
+
+        _role_masks.clear()
+        for role in db.query(Roles).all():
+            role_mask(role)
+
+        print(f"Compiled {len(_scope_bits)} scopes into bitmasks for {len(_role_masks)} roles")
+    finally:
+        db.close()
+
+
+for _scope_name in (ADMIN_FULL_SCOPE, *DEFAULT_SCOPES):
+    scope_bit(_scope_name)
@@ -12,12 +12,90 @@ class Settings(BaseSettings):
 
     MONGO_URL: str
     MONGO_DB: str
+    MONGO_APP_NAME: str = "hotel_booking_system"
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: Optional[int] = None
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    MONGO_CONNECT_TIMEOUT_MS: int = 10000
+    # comma separated, e.g. "zstd,zlib"; snappy and zstd need their optional packages
+    MONGO_COMPRESSORS: str = ""
+    MONGO_READ_PREFERENCE: str = "primary"
+    # "majority" or a node count
+    MONGO_WRITE_CONCERN: str = "1"
+    MONGO_JOURNAL: Optional[bool] = None
+    MONGO_COMMAND_MONITORING: bool = True
 
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     REFRESH_TOKEN_EXPIRE_DAYS: int
     ALGORITHM : str
     SECRET_KEY : str
     REFRESH_SECRET_KEY : str
+
+    AUTH_STATELESS_FAST_PATH: bool = True
+    REVOCATION_SYNC_SECONDS: int = 5
+    REVOCATION_SYNC_OVERLAP_SECONDS: int = 120
+    REVOCATION_BLOOM_BITS: int = 1 << 20
+    REVOCATION_BLOOM_HASHES: int = 4
+    SCOPE_MASK_TTL_SECONDS: int = 60
+
+    REAPER_INTERVAL_MINUTES: int = 5
+    REAPER_BATCH_SIZE: int = 500
+    REAPER_MAX_BATCHES: int = 20
+    REAPER_BATCH_PAUSE_MS: int = 100
+    REAPER_LOCK_TIMEOUT_MS: int = 2000
+
+    BCRYPT_ROUNDS: int = 12
+    HASH_WORKERS: int = 4
+    HASH_MAX_PENDING: int = 64
+
+    RAG_RETRIEVER_BACKEND: str = "pinecone"
+    RAG_HYBRID_ALPHA: float = 0.5
+    RAG_TOP_K: int = 4
+
+    ANSWER_CACHE_MAX_ENTRIES: int = 512
+    ANSWER_CACHE_TTL_SECONDS: int = 3600
+    ANSWER_CACHE_SIMILARITY: float = 0.92
+
+    EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBEDDING_BATCH_WINDOW_MS: float = 5
+    EMBEDDING_MAX_BATCH: int = 64
+    EMBEDDING_CACHE_PATH: str = "embedding_cache"
+    EMBEDDING_QUERY_CACHE_SIZE: int = 1024
+
+    RAG_WARMUP: bool = False
+
+    RAG_SIDECAR_ENABLED: bool = False
+    RAG_SIDECAR_SOCKET: str = "/tmp/hotel_rag_sidecar.sock"
+    RAG_SIDECAR_HOST: Optional[str] = None
+    RAG_SIDECAR_PORT: int = 8765
+    RAG_SIDECAR_TIMEOUT_SECONDS: float = 30
+    RAG_SIDECAR_CONCURRENCY: int = 8
+    RAG_SIDECAR_FALLBACK: bool = True
+
+    CHAT_HISTORY_PAGE_SIZE: int = 50
+    CHAT_HISTORY_MAX_PAGE_SIZE: int = 200
+
+    REVIEWS_PAGE_SIZE: int = 20
+    REVIEWS_MAX_PAGE_SIZE: int = 100
+    REVIEW_OUTBOX_RELAY_SECONDS: int = 5
+    REVIEW_OUTBOX_BATCH_SIZE: int = 200
+    REVIEW_OUTBOX_MAX_ATTEMPTS: int = 10
+    REVIEW_OUTBOX_RETENTION_DAYS: int = 30
+    REVIEW_RECONCILE_MINUTES: int = 30
+    REVIEW_RECONCILE_SAMPLE_SIZE: int = 200
+
+    CONTENT_SNAPSHOT_TTL_SECONDS: int = 30
+
+    CHAT_BUS_BACKEND: str = "local"
+    CHAT_BUS_CHANNEL: str = "hotel_chat"
+    CHAT_PRESENCE_HEARTBEAT_SECONDS: int = 15
+    CHAT_PRESENCE_DEBOUNCE_MS: int = 250
+    CHAT_SEND_QUEUE_SIZE: int = 256
+
+    CHAT_WRITE_BATCH_SIZE: int = 100
+    CHAT_WRITE_FLUSH_MS: int = 50
+    CHAT_WRITE_MAX_PENDING: int = 5000
     
     class Config:
         env_file = ".env"
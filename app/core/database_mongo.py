@@ -1,12 +1,33 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel
 from app.core.config import get_settings
+from app.core.mongo_monitoring import CommandLatencyListener, PoolCheckoutListener
 
 settings = get_settings()
 
-client: AsyncIOMotorClient = AsyncIOMotorClient(
-    settings.MONGO_URL,
-    serverSelectionTimeoutMS=5000
-)
+
+def client_options() -> dict:
+    options = {
+        "appname": settings.MONGO_APP_NAME,
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+        "readPreference": settings.MONGO_READ_PREFERENCE,
+        "w": int(settings.MONGO_WRITE_CONCERN) if settings.MONGO_WRITE_CONCERN.isdigit() else settings.MONGO_WRITE_CONCERN,
+    }
+    if settings.MONGO_MAX_IDLE_TIME_MS is not None:
+        options["maxIdleTimeMS"] = settings.MONGO_MAX_IDLE_TIME_MS
+    if settings.MONGO_COMPRESSORS:
+        options["compressors"] = settings.MONGO_COMPRESSORS
+    if settings.MONGO_JOURNAL is not None:
+        options["journal"] = settings.MONGO_JOURNAL
+    if settings.MONGO_COMMAND_MONITORING:
+        options["event_listeners"] = [CommandLatencyListener(), PoolCheckoutListener()]
+    return options
+
+
+client: AsyncIOMotorClient = AsyncIOMotorClient(settings.MONGO_URL, **client_options())
 
 db = client[settings.MONGO_DB]
 
@@ -14,3 +35,52 @@ chat_collection1 = db["chats"]
 chat_collection2 = db["generalQuery"]
 collection = db["ratings_reviews"]
 collection_cm = db["content_management"]
+conversations_collection = db["conversations"]
+
+
+# Indexes each collection's queries rely on, created at startup.
+MONGO_INDEXES = {
+    "chats": [
+        IndexModel(
+            [("sender_id", ASCENDING), ("receiver_id", ASCENDING), ("timestamp", ASCENDING)],
+            name="ix_chats_sender_receiver_ts"
+        ),
+        # history paging: each branch of the sender/receiver $or walks its own
+        # index in (timestamp, _id) order and the two are merge-sorted
+        IndexModel(
+            [("sender_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+            name="ix_chats_sender_ts"
+        ),
+        IndexModel(
+            [("receiver_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+            name="ix_chats_receiver_ts"
+        ),
+    ],
+    "conversations": [
+        IndexModel([("last_timestamp", DESCENDING)], name="ix_conversations_last_ts"),
+    ],
+    "generalQuery": [
+        # get_all_queries lists oldest first
+        IndexModel([("created_at", ASCENDING)], name="ix_general_query_created_at"),
+    ],
+    # reviews are only ever read by _id (single lookups and the room page's
+    # $in), which the default _id index already serves
+    "ratings_reviews": [],
+    "content_management": [
+        IndexModel([("terms_and_conditions", ASCENDING)], name="ix_cm_terms", sparse=True),
+        # per-type listings (carousel, management, ...) filter on type and sort by order
+        IndexModel([("type", ASCENDING), ("order", ASCENDING)], name="ix_cm_type_order"),
+    ],
+}
+
+
+async def init_mongo_indexes():
+    """Create the indexes in MONGO_INDEXES; a no-op when they already exist."""
+    for name, indexes in MONGO_INDEXES.items():
+        if not indexes:
+            continue
+        try:
+            await db[name].create_indexes(indexes)
+        except Exception as e:
+            # an index with the same name but another definition must be dropped by hand
+            print(f"Index bootstrap failed for {name}: {str(e)}")
@@ -0,0 +1,50 @@
+import threading
+from collections import defaultdict
+from typing import Dict
+
+
+class Metrics:
+    """
+    Process-local counters, gauges and timings. Exposed as a JSON snapshot
+    on /metrics; every worker reports its own numbers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, float] = {}
+        self._timings: Dict[str, Dict[str, float]] = {}
+
+    def incr(self, name: str, value: float = 1):
+        with self._lock:
+            self._counters[name] += value
+
+    def set_gauge(self, name: str, value: float):
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, duration_ms: float):
+        with self._lock:
+            timing = self._timings.get(name)
+            if timing is None:
+                timing = self._timings[name] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+            timing["count"] += 1
+            timing["total_ms"] += duration_ms
+            timing["max_ms"] = max(timing["max_ms"], duration_ms)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "timings": {
+                    name: {
+                        **timing,
+                        "avg_ms": round(timing["total_ms"] / timing["count"], 3) if timing["count"] else 0.0
+                    }
+                    for name, timing in self._timings.items()
+                }
+            }
+
+
+metrics = Metrics()
@@ -0,0 +1,93 @@
+import threading
+import time
+from typing import Dict
+from pymongo import monitoring
+from app.core.metrics import metrics
+
+
+class CommandLatencyListener(monitoring.CommandListener):
+    """
+    Records every Mongo command as mongo.cmd.<collection>.<command> timings.
+    The collection name is only present on the started event, so it is kept
+    by request_id until the command finishes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._collections: Dict[int, str] = {}
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        collection = target if isinstance(target, str) else event.database_name
+        with self._lock:
+            self._collections[event.request_id] = collection
+
+    def _finish(self, event, failed: bool):
+        with self._lock:
+            collection = self._collections.pop(event.request_id, event.database_name)
+        name = f"mongo.cmd.{collection}.{event.command_name}"
+        metrics.observe(name, event.duration_micros / 1000)
+        if failed:
+            metrics.incr(f"{name}.failed")
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+
+class PoolCheckoutListener(monitoring.ConnectionPoolListener):
+    """
+    Times how long operations wait for a pooled connection (mongo.pool_checkout)
+    and tracks connections in use. Checkouts happen on the thread running the
+    operation, so the start time is kept per thread.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._checked_out = 0
+
+    def _in_use(self, delta: int):
+        with self._lock:
+            self._checked_out += delta
+            metrics.set_gauge("mongo.pool_in_use", self._checked_out)
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, "started", None)
+        if started is not None:
+            metrics.observe("mongo.pool_checkout", (time.perf_counter() - started) * 1000)
+            self._local.started = None
+        self._in_use(1)
+
+    def connection_check_out_failed(self, event):
+        self._local.started = None
+        metrics.incr(f"mongo.pool_checkout_failed.{event.reason}")
+
+    def connection_checked_in(self, event):
+        self._in_use(-1)
+
+    def connection_created(self, event):
+        metrics.incr("mongo.connections_created")
+
+    def connection_closed(self, event):
+        metrics.incr("mongo.connections_closed")
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        metrics.incr("mongo.pool_cleared")
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
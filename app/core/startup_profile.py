@@ -0,0 +1,122 @@
+import os
+import resource
+import sys
+import threading
+import time
+from importlib.abc import MetaPathFinder
+from typing import Dict, List
+
+
+class _TimedLoader:
+    """Wraps a module loader so exec_module reports its wall time to the profiler."""
+
+    def __init__(self, loader, profiler: "ImportProfiler"):
+        self._loader = loader
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._profiler._enter()
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler._leave(module.__name__, (time.perf_counter() - start) * 1000)
+
+
+class ImportProfiler(MetaPathFinder):
+    """
+    Records cumulative and self import time per module, like
+    `python -X importtime` but readable from inside the running app.
+    Only imports executed while the profiler is installed are counted.
+    """
+
+    def __init__(self):
+        self.cumulative_ms: Dict[str, float] = {}
+        self.self_ms: Dict[str, float] = {}
+        self._child_ms = threading.local()
+        self._started = time.perf_counter()
+        self._finished = None
+        self._in_find = threading.local()
+
+    def _stack(self) -> List[float]:
+        stack = getattr(self._child_ms, "stack", None)
+        if stack is None:
+            stack = self._child_ms.stack = []
+        return stack
+
+    def _enter(self):
+        self._stack().append(0.0)
+
+    def _leave(self, name: str, elapsed_ms: float):
+        stack = self._stack()
+        children = stack.pop()
+        self.cumulative_ms[name] = elapsed_ms
+        self.self_ms[name] = elapsed_ms - children
+        if stack:
+            stack[-1] += elapsed_ms
+
+    def find_spec(self, fullname, path, target=None):
+        if getattr(self._in_find, "active", False):
+            return None
+        self._in_find.active = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                        spec.loader = _TimedLoader(spec.loader, self)
+                    return spec
+            return None
+        finally:
+            self._in_find.active = False
+
+    def install(self):
+        sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+        self._finished = time.perf_counter()
+
+    def report(self, top: int = 15) -> Dict:
+        by_package: Dict[str, float] = {}
+        for name, elapsed in self.self_ms.items():
+            package = name.split(".")[0]
+            by_package[package] = by_package.get(package, 0.0) + elapsed
+
+        def ranked(values: Dict[str, float]):
+            return [
+                {"module": name, "ms": round(ms, 2)}
+                for name, ms in sorted(values.items(), key=lambda item: item[1], reverse=True)[:top]
+            ]
+
+        finished = self._finished or time.perf_counter()
+        return {
+            "total_ms": round((finished - self._started) * 1000, 2),
+            "modules_imported": len(self.cumulative_ms),
+            "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            "by_package": ranked(by_package),
+            "slowest_modules": ranked(self.cumulative_ms),
+        }
+
+
+def print_report(report: Dict):
+    print(f"Startup: ready in {report['total_ms']} ms, {report['modules_imported']} modules imported, "
+          f"max RSS {report['max_rss_mb']} MB. Import self-time by package:")
+    for entry in report["by_package"]:
+        print(f"  {entry['ms']:>9.2f} ms  {entry['module']}")
+
+
+# Enabled with STARTUP_PROFILE=1. Read from the environment rather than
+# Settings because it has to be installed before the app modules import.
+profiler = ImportProfiler() if os.getenv("STARTUP_PROFILE", "").lower() in ("1", "true", "yes") else None
+if profiler is not None:
+    profiler.install()
@@ -0,0 +1,111 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+from bson import ObjectId
+from app.core.config import get_settings
+from app.core.database_mongo import collection_cm
+from app.core.metrics import metrics
+
+settings = get_settings()
+
+CAROUSEL = "carousel"
+MANAGEMENT = "management"
+CONTACT = "contact"
+FOUNDER = "founder"
+TERMS = "terms_conditions"
+
+# Fields each listing returns; everything else in the document stays in Mongo.
+PROJECTIONS: Dict[str, Dict[str, int]] = {
+    CAROUSEL: {"title": 1, "description": 1, "images": 1, "order": 1, "is_active": 1},
+    MANAGEMENT: {"name": 1, "position": 1, "image": 1, "order": 1, "is_active": 1},
+    CONTACT: {"email": 1, "phone": 1, "address": 1, "city": 1, "state": 1, "country": 1,
+              "LinkedIn": 1, "twitter": 1, "zip_code": 1},
+    FOUNDER: {"name": 1, "title": 1, "message": 1, "image": 1},
+}
+
+# Types whose items carry order / is_active.
+ORDERED_TYPES = {CAROUSEL, MANAGEMENT}
+
+# Documents written before the type field existed, recognised by shape.
+# Checked in this order, so the terms document is claimed first.
+LEGACY_SHAPES: List[Tuple[str, Dict]] = [
+    (TERMS, {"terms_and_conditions": {"$exists": True}}),
+    (CAROUSEL, {"images": {"$exists": True}}),
+    (MANAGEMENT, {"position": {"$exists": True}}),
+    (CONTACT, {"email": {"$exists": True}, "phone": {"$exists": True}}),
+    (FOUNDER, {"name": {"$exists": True}, "title": {"$exists": True}}),
+]
+
+
+class ContentSnapshot:
+    """
+    Per-worker copy of each content listing. Writes in this worker
+    invalidate the type they touch; the TTL bounds how long another worker's
+    write can go unseen.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl = ttl_seconds
+        self._entries: Dict[Tuple[str, bool], Tuple[float, Dict]] = {}
+        self._locks: Dict[Tuple[str, bool], asyncio.Lock] = {}
+
+    async def get(self, content_type: str, include_inactive: bool = False) -> Dict:
+        key = (content_type, include_inactive or content_type not in ORDERED_TYPES)
+        entry = self._entries.get(key)
+        if entry and time.monotonic() - entry[0] < self.ttl:
+            metrics.incr("content_snapshot.hits")
+            return entry[1]
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(key)
+            if entry and time.monotonic() - entry[0] < self.ttl:
+                return entry[1]
+            metrics.incr("content_snapshot.misses")
+            data = await load_content(content_type, include_inactive=key[1])
+            result = {"count": len(data), "data": data}
+            self._entries[key] = (time.monotonic(), result)
+            return result
+
+    def invalidate(self, content_type: str):
+        for key in [key for key in self._entries if key[0] == content_type]:
+            self._entries.pop(key, None)
+
+
+async def load_content(content_type: str, include_inactive: bool = False) -> List[Dict]:
+    query = {"type": content_type}
+    if content_type in ORDERED_TYPES and not include_inactive:
+        query["is_active"] = True
+
+    cursor = collection_cm.find(query, PROJECTIONS[content_type])
+    if content_type in ORDERED_TYPES:
+        cursor = cursor.sort([("order", 1), ("_id", 1)])
+
+    docs = await cursor.to_list(None)
+    for doc in docs:
+        doc["_id"] = str(doc["_id"])
+    return docs
+
+
+async def find_content(content_type: str, content_id: str) -> Optional[Dict]:
+    """Fetch one item of the given type; ids of other content types do not match."""
+    if not ObjectId.is_valid(content_id):
+        return None
+    return await collection_cm.find_one({"_id": ObjectId(content_id), "type": content_type})
+
+
+async def backfill_content_types() -> int:
+    """Tag untyped legacy documents with their type; a no-op once every document has one."""
+    tagged = 0
+    for content_type, shape in LEGACY_SHAPES:
+        result = await collection_cm.update_many(
+            {"type": {"$exists": False}, **shape},
+            {"$set": {"type": content_type}}
+        )
+        tagged += result.modified_count
+    if tagged:
+        print(f"Tagged {tagged} content_management documents with their type")
+    return tagged
+
+
+content_snapshot = ContentSnapshot(ttl_seconds=settings.CONTENT_SNAPSHOT_TTL_SECONDS)
@@ -0,0 +1,205 @@
+import asyncio
+import base64
+from datetime import datetime
+from typing import Dict, Optional
+from bson import ObjectId
+from sqlalchemy import text, tuple_
+from sqlalchemy.orm import Session
+from app.core.database_mongo import collection
+from app.core.database_postgres import SessionLocal
+from app.core.metrics import metrics
+from app.models.rating_reviews import RatingsReviews
+from app.services.review_outbox import pending_documents
+
+
+def apply_rating(db: Session, room_id: int, rating: int, delta: int):
+    """
+    Add (delta=1) or remove (delta=-1) one star rating from the room's
+    aggregate row. Runs inside the caller's transaction and does not commit,
+    so the aggregate changes together with the ratings_reviews row.
+    """
+    star = f"star_{int(rating)}"
+    params = {"room_id": room_id, "rating": int(rating), "delta": delta}
+    update = f"""
+        rating_count = room_rating_stats.rating_count + :delta,
+        rating_sum = room_rating_stats.rating_sum + :delta * :rating,
+        {star} = room_rating_stats.{star} + :delta,
+        avg_rating = ROUND(
+            (room_rating_stats.rating_sum + :delta * :rating)::numeric
+            / NULLIF(room_rating_stats.rating_count + :delta, 0), 2
+        ),
+        updated_at = now()
+    """
+
+    if delta > 0:
+        db.execute(text(f"""
+        INSERT INTO room_rating_stats (room_id, rating_count, rating_sum, avg_rating, {star}, updated_at)
+        VALUES (:room_id, :delta, :delta * :rating, :rating, :delta, now())
+        ON CONFLICT (room_id) DO UPDATE SET {update};
+        """), params)
+    else:
+        db.execute(text(f"""
+        UPDATE room_rating_stats SET {update}
+        WHERE room_id = :room_id AND rating_count + :delta >= 0;
+        """), params)
+
+
+def recompute_room_ratings(db: Session) -> Dict:
+    """Rebuild every room's aggregate from ratings_reviews in one statement; repairs any drift."""
+    result = db.execute(text("""
+    WITH agg AS (
+        SELECT room_id,
+               COUNT(*) AS rating_count,
+               SUM(ratings) AS rating_sum,
+               ROUND(AVG(ratings)::numeric, 2) AS avg_rating,
+               COUNT(*) FILTER (WHERE ratings = 1) AS star_1,
+               COUNT(*) FILTER (WHERE ratings = 2) AS star_2,
+               COUNT(*) FILTER (WHERE ratings = 3) AS star_3,
+               COUNT(*) FILTER (WHERE ratings = 4) AS star_4,
+               COUNT(*) FILTER (WHERE ratings = 5) AS star_5
+        FROM ratings_reviews
+        WHERE ratings IS NOT NULL
+        GROUP BY room_id
+    ),
+    upserted AS (
+        INSERT INTO room_rating_stats
+            (room_id, rating_count, rating_sum, avg_rating, star_1, star_2, star_3, star_4, star_5, updated_at)
+        SELECT room_id, rating_count, rating_sum, avg_rating, star_1, star_2, star_3, star_4, star_5, now()
+        FROM agg
+        ON CONFLICT (room_id) DO UPDATE SET
+            rating_count = EXCLUDED.rating_count,
+            rating_sum = EXCLUDED.rating_sum,
+            avg_rating = EXCLUDED.avg_rating,
+            star_1 = EXCLUDED.star_1,
+            star_2 = EXCLUDED.star_2,
+            star_3 = EXCLUDED.star_3,
+            star_4 = EXCLUDED.star_4,
+            star_5 = EXCLUDED.star_5,
+            updated_at = now()
+        RETURNING room_id
+    ),
+    removed AS (
+        DELETE FROM room_rating_stats
+        WHERE room_id NOT IN (SELECT room_id FROM agg)
+        RETURNING room_id
+    )
+    SELECT (SELECT COUNT(*) FROM upserted) AS rooms, (SELECT COUNT(*) FROM removed) AS removed;
+    """)).fetchone()
+    db.commit()
+    return {"rooms": result.rooms, "removed": result.removed}
+
+
+def encode_review_cursor(created_at: datetime, review_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{review_id}".encode()).decode()
+
+
+def decode_review_cursor(cursor: str):
+    try:
+        created_at, review_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(review_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid review cursor")
+
+
+async def get_room_reviews(db: Session, room_id: int, limit: int, cursor: Optional[str] = None) -> Dict:
+    """
+    One page of a room's reviews, newest first, in two round trips: the rows
+    are paged from ratings_reviews on (created_at, id) and every referenced
+    Mongo document is fetched with a single $in. The cursor carries the last
+    row's (created_at, id), so it needs no extra lookup. Reviews the outbox
+    relay has not written yet are served from their pending payload.
+    """
+    query = db.query(
+        RatingsReviews.id, RatingsReviews.booking_id, RatingsReviews.object_id,
+        RatingsReviews.ratings, RatingsReviews.created_at
+    ).filter(RatingsReviews.room_id == room_id)
+
+    if cursor:
+        created_at, review_id = decode_review_cursor(cursor)
+        query = query.filter(tuple_(RatingsReviews.created_at, RatingsReviews.id) < (created_at, review_id))
+
+    rows = query.order_by(RatingsReviews.created_at.desc(), RatingsReviews.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    object_ids = [ObjectId(row.object_id) for row in rows if ObjectId.is_valid(row.object_id)]
+    docs = await collection.find({"_id": {"$in": object_ids}}).to_list(None) if object_ids else []
+    docs_by_id = {str(doc["_id"]): doc for doc in docs}
+    docs_by_id.update(pending_documents(db, [row.object_id for row in rows if row.object_id not in docs_by_id]))
+
+    reviews = []
+    for row in rows:
+        doc = docs_by_id.get(row.object_id)
+        if doc is None:
+            # the SQL row outlived its Mongo document; skip it rather than fail the page
+            metrics.incr("reviews.missing_documents")
+            continue
+        reviews.append({
+            "id": row.id,
+            "booking_id": row.booking_id,
+            "object_id": row.object_id,
+            "ratings": doc.get("ratings", row.ratings),
+            "review": doc.get("review"),
+            "created_at": row.created_at
+        })
+
+    return {
+        "reviews": reviews,
+        "has_more": has_more,
+        "next_cursor": encode_review_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+    }
+
+
+async def backfill_ratings(db: Session) -> int:
+    """Copy star values from Mongo into ratings_reviews rows created before the column existed."""
+    rows = db.query(RatingsReviews.id, RatingsReviews.object_id).filter(RatingsReviews.ratings.is_(None)).all()
+    if not rows:
+        return 0
+
+    object_ids = [ObjectId(row.object_id) for row in rows if ObjectId.is_valid(row.object_id)]
+    docs = await collection.find({"_id": {"$in": object_ids}}, {"ratings": 1}).to_list(None)
+    ratings_by_id = {str(doc["_id"]): doc.get("ratings") for doc in docs}
+
+    updated = 0
+    for row in rows:
+        rating = ratings_by_id.get(row.object_id)
+        if rating is not None:
+            db.query(RatingsReviews).filter(RatingsReviews.id == row.id).update({"ratings": rating})
+            updated += 1
+    db.commit()
+    return updated
+
+
+async def repair_room_ratings_job():
+    db = SessionLocal()
+    try:
+        backfilled = await backfill_ratings(db)
+        stats = await asyncio.to_thread(recompute_room_ratings, db)
+        metrics.incr("room_ratings.repairs")
+        print(f"Room rating stats repaired: {stats['rooms']} rooms, "
+              f"{stats['removed']} stale rows removed, {backfilled} reviews backfilled")
+    except Exception as e:
+        db.rollback()
+        metrics.incr("room_ratings.repair_errors")
+        print(f"Room rating repair failed: {str(e)}")
+    finally:
+        db.close()
+
+
+async def seed_room_ratings():
+    """
+    Fill room_rating_stats on the first start after its migration, so the
+    rating filter works before the nightly repair. Later starts find the
+    table populated and return after one query.
+    """
+    db = SessionLocal()
+    try:
+        empty = db.execute(text("""
+        SELECT EXISTS (SELECT 1 FROM ratings_reviews)
+           AND NOT EXISTS (SELECT 1 FROM room_rating_stats);
+        """)).scalar()
+        db.rollback()
+    finally:
+        db.close()
+    if empty:
+        await repair_room_ratings_job()
@@ -8,9 +8,8 @@ from app.models.bookings import Bookings
 from app.models.rooms import Rooms
 from app.models.room_type import RoomTypeWithSizes
 from app.models.bookings import Bookings
-from app.models import Rooms, RoomTypeWithSizes, Features, RoomTypeBedTypes, BedTypes, RatingsReviews, Floors,associations
+from app.models import Rooms, RoomTypeWithSizes, Features, RoomTypeBedTypes, BedTypes, Floors,associations, RoomRatingStats
 from sqlalchemy import and_
-from app.core.database_mongo import collection
 
 def check_availability(model: Type, db: Session,**kwargs):
     room_id = kwargs.get('room_id')
@@ -115,11 +114,11 @@ async def whole_filter(
     check_in=None,
     check_out=None,
     no_of_child=None,
-    no_of_adult=None
+    no_of_adult=None,
+    sort_by_rating=False
 ):
-    query = db.query(Rooms).join(RoomTypeWithSizes, Rooms.room_type_id == RoomTypeWithSizes.id)\
+    query = db.query(Rooms.id).join(RoomTypeWithSizes, Rooms.room_type_id == RoomTypeWithSizes.id)\
                            .join(Floors, Rooms.floor_id == Floors.id)\
-                           .outerjoin(RatingsReviews, RatingsReviews.room_id == Rooms.id)\
                            .outerjoin(associations.room_type_features, RoomTypeWithSizes.id == associations.room_type_features.c.room_type_id)\
                            .outerjoin(Features, associations.room_type_features.c.feature_id == Features.id)\
                            .outerjoin(RoomTypeBedTypes, RoomTypeWithSizes.id == RoomTypeBedTypes.room_type_id)\
@@ -138,15 +137,9 @@ async def whole_filter(
     if room_type_name:
         filters.append(RoomTypeWithSizes.room_name.ilike(f"%{room_type_name}%"))
     if ratings:
-
-        matching_ratings = await collection.find({"rating": {"$gte": ratings}}).to_list(length=None)
-        matching_object_ids = [r["_id"] for r in matching_ratings]
-
-        ratings_review_ids = db.query(RatingsReviews.room_id).filter(
-            RatingsReviews.odject_id.in_(matching_object_ids)
-        ).subquery()
-
-        filters.append(Rooms.id.in_(ratings_review_ids))
+        # served from the maintained per-room aggregate and its avg_rating index
+        rated_room_ids = db.query(RoomRatingStats.room_id).filter(RoomRatingStats.avg_rating >= ratings)
+        filters.append(Rooms.id.in_(rated_room_ids))
 
     if feature_ids:
         filters.append(Features.id.in_(feature_ids))
@@ -171,7 +164,14 @@ async def whole_filter(
         )
         query = query.filter(~Rooms.id.in_(booked_subquery))
 
-    query = query.distinct()
+    # DISTINCT over the feature/bed-type joins runs on ids only, so the
+    # outer query is free to order by the rating aggregate
+    room_ids = query.distinct().subquery()
+    result_query = db.query(Rooms).filter(Rooms.id.in_(db.query(room_ids.c.id)))
+    if sort_by_rating:
+        result_query = result_query.outerjoin(RoomRatingStats, RoomRatingStats.room_id == Rooms.id)\
+                                   .order_by(RoomRatingStats.avg_rating.desc().nullslast(),
+                                             RoomRatingStats.rating_count.desc().nullslast())
 
-    result = query.all()
+    result = result_query.all()
     return result
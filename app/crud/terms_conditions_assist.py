@@ -1,21 +1,26 @@
 import os
 import json
+import asyncio
+import hashlib
 import time
-from typing import List
+import threading
+from typing import AsyncIterator, Dict, List
 from pathlib import Path
-from pinecone import Pinecone, ServerlessSpec
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.retrievers import PineconeHybridSearchRetriever
-from pinecone_text.sparse import BM25Encoder
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import numpy as np
+from app.core.config import get_settings
 from app.core.database_mongo import collection_cm
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnablePassthrough
-from langchain_core.output_parsers import StrOutputParser
-from dotenv import loadenv
+from app.services.local_vector_index import LocalHybridRetriever, LocalVectorIndex
+from app.services.answer_cache import AnswerCache
+from app.services.embedding_service import EMBEDDING_DIM, embedding_service
+from app.core.metrics import metrics
+from dotenv import load_dotenv
 
-loadenv()
+# pinecone, pinecone_text, langchain_groq and the text splitter are imported
+# inside the functions that use them so that a backend that is not
+# configured is never imported.
+
+load_dotenv()
+settings = get_settings()
 CONFIG_PATH = Path("rag_config.json")
 BM25_PATH = "hotel_terms_bm25.json"
 
@@ -47,6 +52,8 @@ def initialize_pinecone():
     """
     Initialize Pinecone index for hybrid search.
     """
+    from pinecone import Pinecone, ServerlessSpec
+
     pc = Pinecone(api_key=PINECONE_API_KEY)
     existing = [i.name for i in pc.list_indexes()]
     
@@ -54,7 +61,7 @@ def initialize_pinecone():
         print(f"Creating Pinecone index: {INDEX_NAME}")
         pc.create_index(
             name=INDEX_NAME,
-            dimension=384,  
+            dimension=EMBEDDING_DIM,  
             metric='dotproduct',
             spec=ServerlessSpec(cloud='aws', region='us-east-1')
         )
@@ -65,37 +72,7 @@ def initialize_pinecone():
     return pc.Index(INDEX_NAME)
 
 
-def get_rag_chain():
-    """
-    Initialize RAG chain components (call this each time you need to query).
-    This recreates the chain from scratch - no pickling needed.
-    """
-    index = initialize_pinecone()
-    
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2",
-        model_kwargs={"device": "cpu"},
-        encode_kwargs={"normalize_embeddings": True}
-    )
-    
-    bm25 = BM25Encoder().default()
-    if Path(BM25_PATH).exists():
-        bm25 = BM25Encoder().load(BM25_PATH)
-    
-    retriever = PineconeHybridSearchRetriever(
-        embeddings=embeddings,
-        sparse_encoder=bm25,
-        index=index
-    )
-    
-    llm = ChatGroq(
-        model="llama-3.3-70b-versatile",
-        temperature=0.2,
-        max_tokens=1024,
-        groq_api_key=GROQ_API_KEY
-    )
-    
-    prompt = ChatPromptTemplate.from_template("""You are a helpful and professional hotel assistant. Use the context below to answer questions about hotel terms and conditions accurately.
+PROMPT_TEMPLATE = """You are a helpful and professional hotel assistant. Use the context below to answer questions about hotel terms and conditions accurately.
 
 Context:
 {context}
@@ -109,25 +86,273 @@ Instructions:
 - Be professional and friendly
 - Format your response clearly
 
-Answer:""")
-    rag_chain = (
-        {
-            "context": retriever,
-            "question": RunnablePassthrough()
-        }
-        | prompt
-        | llm
-        | StrOutputParser()
-    )
-    
-    return rag_chain, retriever
+Answer:"""
+
+
+def chunk_id(chunk: str) -> str:
+    """Content hash used as the vector id, matching PineconeHybridSearchRetriever.add_texts."""
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
 
+def upsert_to_pinecone(index, ids: List[str], chunks: List[str], dense, sparse, batch_size: int = 32):
+    """Upsert precomputed dense + sparse vectors in the layout the hybrid retriever reads."""
+    for start in range(0, len(chunks), batch_size):
+        index.upsert(vectors=[
+            {
+                "id": ids[i],
+                "values": [float(v) for v in dense[i]],
+                "sparse_values": sparse[i],
+                "metadata": {"context": chunks[i]}
+            }
+            for i in range(start, min(start + batch_size, len(chunks)))
+        ])
 
 
-async def store_terms_to_pinecone():
+def format_docs(docs) -> str:
+    return "\n\n".join(doc.page_content for doc in docs)
+
+
+class RagEngine:
     """
-    Fetch hotel terms & conditions from MongoDB and store embeddings in Pinecone.
+    Long-lived RAG components shared by every question. Embeddings come from
+    the process-wide embedding_service and the LLM client is built once; the
+    retriever is rebuilt only when rag_config.json records a new indexing run.
     """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._config_mtime = None
+        self._config_timestamp = None
+        self._embeddings = embedding_service
+        self._llm_chain = None
+        self._retriever = None
+
+    def _read_config_timestamp(self):
+        """(mtime, timestamp) of rag_config.json; the file is only parsed when its mtime changed."""
+        mtime = CONFIG_PATH.stat().st_mtime
+        if mtime == self._config_mtime:
+            return mtime, self._config_timestamp
+        with open(CONFIG_PATH) as f:
+            timestamp = json.load(f).get("timestamp")
+        return mtime, timestamp
+
+    def _build_retriever(self):
+        from pinecone_text.sparse import BM25Encoder
+
+        bm25 = BM25Encoder().default()
+        if Path(BM25_PATH).exists():
+            bm25 = BM25Encoder().load(BM25_PATH)
+
+        if settings.RAG_RETRIEVER_BACKEND == "local":
+            return LocalHybridRetriever(
+                embeddings=self._embeddings,
+                sparse_encoder=bm25,
+                index=LocalVectorIndex.load(),
+                alpha=settings.RAG_HYBRID_ALPHA,
+                top_k=settings.RAG_TOP_K
+            )
+
+        from langchain_community.retrievers import PineconeHybridSearchRetriever
+
+        return PineconeHybridSearchRetriever(
+            embeddings=self._embeddings,
+            sparse_encoder=bm25,
+            index=initialize_pinecone(),
+            alpha=settings.RAG_HYBRID_ALPHA,
+            top_k=settings.RAG_TOP_K
+        )
+
+    def get_embeddings(self):
+        """Return the shared embedding service, loading the model on first use."""
+        self._embeddings.get_model()
+        return self._embeddings
+
+    def ensure_ready(self):
+        mtime, timestamp = self._read_config_timestamp()
+        if self._retriever is not None and timestamp == self._config_timestamp:
+            self._config_mtime = mtime
+            return
+
+        self.get_embeddings()
+        with self._lock:
+            if self._retriever is not None and timestamp == self._config_timestamp:
+                return
+
+            if self._llm_chain is None:
+                from langchain_core.output_parsers import StrOutputParser
+                from langchain_core.prompts import ChatPromptTemplate
+                from langchain_groq import ChatGroq
+
+                llm = ChatGroq(
+                    model="llama-3.3-70b-versatile",
+                    temperature=0.2,
+                    max_tokens=1024,
+                    groq_api_key=GROQ_API_KEY
+                )
+                self._llm_chain = ChatPromptTemplate.from_template(PROMPT_TEMPLATE) | llm | StrOutputParser()
+
+            print(f"Loading RAG retriever for index build {timestamp}")
+            self._retriever = self._build_retriever()
+            self._config_timestamp = timestamp
+            # only recorded once the rebuild succeeded, so a failed build is retried
+            self._config_mtime = mtime
+
+    def retrieve(self, question: str):
+        self.ensure_ready()
+        return self._retriever.invoke(question)
+
+    def answer(self, question: str):
+        """
+        Serve from the answer cache when the same or a near-identical question
+        was answered against the current index; otherwise retrieve once and
+        feed the same documents to the LLM.
+        """
+        self.ensure_ready()
+        index_version = self._config_timestamp
+
+        cached = answer_cache.get_exact(question, index_version)
+        if cached:
+            return cached
+
+        embedding = self._embeddings.embed_query(question)
+        cached = answer_cache.get_similar(embedding, index_version)
+        if cached:
+            return cached
+
+        docs = self._retriever.invoke(question)
+        answer = self._llm_chain.invoke({"context": format_docs(docs), "question": question})
+        answer_cache.put(question, embedding, answer, docs, index_version)
+        return answer, docs
+
+    async def astream_answer(self, question: str) -> AsyncIterator[str]:
+        """
+        Async counterpart of answer() that yields the LLM output as it is
+        generated. Cached answers are yielded in one piece.
+        """
+        start = time.perf_counter()
+        await asyncio.to_thread(self.ensure_ready)
+        index_version = self._config_timestamp
+
+        cached = answer_cache.get_exact(question, index_version)
+        if cached is None:
+            embedding = await self._embeddings.aembed_query(question)
+            cached = answer_cache.get_similar(embedding, index_version)
+        if cached:
+            metrics.observe("rag.time_to_first_token", (time.perf_counter() - start) * 1000)
+            yield cached[0]
+            return
+
+        docs = await self._retriever.ainvoke(question)
+        parts = []
+        async for token in self._llm_chain.astream({"context": format_docs(docs), "question": question}):
+            if not parts:
+                metrics.observe("rag.time_to_first_token", (time.perf_counter() - start) * 1000)
+            parts.append(token)
+            yield token
+
+        metrics.observe("rag.stream_total", (time.perf_counter() - start) * 1000)
+        answer_cache.put(question, embedding, "".join(parts), docs, index_version)
+
+
+rag_engine = RagEngine()
+answer_cache = AnswerCache(
+    max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+    similarity_threshold=settings.ANSWER_CACHE_SIMILARITY
+)
+
+
+
+def diff_chunk_ids(ids: List[str], previous_ids: List[str]):
+    """Positions in ids not present in previous_ids, and previous ids no longer present."""
+    previous = set(previous_ids)
+    current = set(ids)
+    new_positions = [i for i, cid in enumerate(ids) if cid not in previous]
+    removed_ids = [pid for pid in previous_ids if pid not in current]
+    return new_positions, removed_ids
+
+
+def index_chunks(chunks: List[str], full: bool = False) -> Dict:
+    """
+    Diff the new chunks against the persisted index by content hash. Only
+    added chunks are embedded (through the embedding cache) and upserted,
+    removed chunk ids are deleted, and unchanged chunks reuse their stored
+    dense vectors. BM25 is refit on
+    the whole corpus (cheap); unchanged chunks keep the sparse weights they
+    were uploaded with until the next full rebuild.
+    """
+    from pinecone_text.sparse import BM25Encoder
+
+    chunks = list(dict.fromkeys(chunks))
+    ids = [chunk_id(chunk) for chunk in chunks]
+
+    previous = None
+    if not full and LocalVectorIndex.exists():
+        previous = LocalVectorIndex.load()
+    previous_rows = {pid: row for row, pid in enumerate(previous.ids)} if previous else {}
+
+    new_positions, removed_ids = diff_chunk_ids(ids, list(previous_rows))
+    print(f"  {len(new_positions)} new, {len(removed_ids)} removed, "
+          f"{len(chunks) - len(new_positions)} unchanged chunks")
+
+    bm25 = BM25Encoder().default()
+    bm25.fit(chunks)
+    bm25.dump(BM25_PATH)
+    sparse = bm25.encode_documents(chunks) if chunks else []
+    print("   ✓ BM25 parameters saved")
+
+    new_dense = []
+    if new_positions:
+        new_dense = rag_engine.get_embeddings().embed_documents([chunks[i] for i in new_positions])
+
+    dim = len(new_dense[0]) if new_dense else (previous.dense.shape[1] if previous else EMBEDDING_DIM)
+    dense = np.empty((len(chunks), dim), dtype=np.float32)
+    for i, cid in enumerate(ids):
+        if cid in previous_rows:
+            dense[i] = previous.dense[previous_rows[cid]]
+    for i, vector in zip(new_positions, new_dense):
+        dense[i] = vector
+
+    LocalVectorIndex(ids, chunks, dense, sparse).save()
+    print("   ✓ Local vector index saved")
+
+    if settings.RAG_RETRIEVER_BACKEND == "pinecone":
+        index = initialize_pinecone()
+        # without a local index there is nothing to diff against: the Pinecone
+        # index may hold chunks from an earlier add_texts run, so rebuild it
+        if full or previous is None:
+            index.delete(delete_all=True)
+            upsert_positions = list(range(len(chunks)))
+        else:
+            if removed_ids:
+                index.delete(ids=removed_ids)
+            upsert_positions = new_positions
+
+        upsert_to_pinecone(
+            index,
+            [ids[i] for i in upsert_positions],
+            [chunks[i] for i in upsert_positions],
+            [dense[i] for i in upsert_positions],
+            [sparse[i] for i in upsert_positions]
+        )
+        print(f" Upserted {len(upsert_positions)} chunks to Pinecone")
+
+    return {
+        "chunk_count": len(chunks),
+        "added": len(new_positions),
+        "removed": len(removed_ids),
+        "unchanged": len(chunks) - len(new_positions),
+        "full": full or previous is None
+    }
+
+
+async def store_terms_to_pinecone(full: bool = False) -> Dict:
+    """
+    Fetch hotel terms & conditions from MongoDB and bring the vector index
+    up to date. The CPU-bound embedding work runs in a worker thread.
+    """
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
     print("\n Fetching hotel Terms & Conditions from MongoDB...")
     doc = await collection_cm.find_one({"terms_and_conditions": {"$exists": True}})
     
@@ -149,70 +374,53 @@ async def store_terms_to_pinecone():
     chunks = splitter.split_text(combined_text)
     print(f"  Split into {len(chunks)} text chunks")
 
-    index = initialize_pinecone()
-
-    print("\n  Setting up embedding + sparse encoders...")
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2",
-        model_kwargs={"device": "cpu"},
-        encode_kwargs={"normalize_embeddings": True}
-    )
-
-    bm25 = BM25Encoder().default()
-    bm25.fit(chunks)
-    bm25.dump(BM25_PATH)
-    print("   ✓ BM25 parameters saved")
-
-    retriever = PineconeHybridSearchRetriever(
-        embeddings=embeddings,
-        sparse_encoder=bm25,
-        index=index
-    )
-
-    print("\n Uploading text chunks to Pinecone...")
-    retriever.add_texts(chunks)
-    print(f" Successfully stored {len(chunks)} chunks in Pinecone")
+    stats = await asyncio.to_thread(index_chunks, chunks, full)
     
     config = {
         "index_name": INDEX_NAME,
-        "chunk_count": len(chunks),
+        "backend": settings.RAG_RETRIEVER_BACKEND,
+        "chunk_count": stats["chunk_count"],
         "timestamp": time.time(),
         "initialized": True
     }
     
     with open(CONFIG_PATH, "w") as f:
         json.dump(config, f, indent=2)
+    answer_cache.clear()
     
     print("\n" + "="*80)
     print(" SYSTEM SETUP COMPLETE!")
     print("="*80)
     
-    return True
+    return stats
 
 
 def is_rag_initialized() -> bool:
     """Check if RAG system has been initialized."""
-    return CONFIG_PATH.exists() and Path(BM25_PATH).exists()
+    if not (CONFIG_PATH.exists() and Path(BM25_PATH).exists()):
+        return False
+    return settings.RAG_RETRIEVER_BACKEND != "local" or LocalVectorIndex.exists()
+
+
+def warmup():
+    """Load the embedding model, LLM client and retriever ahead of the first question."""
+    if is_rag_initialized():
+        rag_engine.ensure_ready()
+    else:
+        rag_engine.get_embeddings()
 
 
 def ask_question(question: str):
     """
-    Ask a question using the RAG system.
-    Creates fresh connections each time (no pickling issues).
+    Ask a question using the shared RAG engine.
     """
     if not is_rag_initialized():
         print("\n RAG system not initialized. Run store_terms_to_pinecone() first.")
         return None, None
     
     try:
-        rag_chain, retriever = get_rag_chain()
-        
         print("\n Processing...")
-        answer = rag_chain.invoke(question)
-        
-        docs = retriever.invoke(question)
-        
-        
+        answer, docs = rag_engine.answer(question)
         
         for i, doc in enumerate(docs[:3], 1):
             print(f"\n[Source {i}]")
@@ -223,4 +431,4 @@ def ask_question(question: str):
         
     except Exception as e:
         print(f"\n Error: {str(e)}")
-        return None, None
\ No newline at end of file
+        return None, None
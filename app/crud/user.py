@@ -16,30 +16,31 @@ from app.models.token_store import TokenStore
 from app.schemas.user_profile_schema import Address, UserProfileBase
 from app.auth.hashing import (
     verify_password, 
-    get_password_hash
+    get_password_hash,
+    password_hasher
 )
 from app.auth.jwt_handler import(
     create_access_token,
     create_refresh_token,
+    hash_token,
     verify_access_token,
     verify_refresh_token
 )
 from app.crud.generic_crud import insert_record
+from app.auth.revocation import record_revocation, revocation_list
 from fastapi import BackgroundTasks, UploadFile
 from datetime import datetime, timezone
 from io import BytesIO
 from fastapi import BackgroundTasks, HTTPException
 from fastapi_mail import FastMail, MessageSchema
 from typing import Optional, Union, Dict
-from passlib.context import CryptContext
 from app.utils import get_role
 import secrets
 import string
+import uuid
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def create_user(db: Session, user_data: UserBase):
+async def create_user(db: Session, user_data: UserBase):
     existing_user = db.query(Users).filter(
         (Users.email == user_data.email) | (Users.phone_no == user_data.phone_no)
     ).first()
@@ -54,7 +55,7 @@ def create_user(db: Session, user_data: UserBase):
     if not role:
         raise ValueError(f"Role '{user_data.role}' not found in database")
     
-    hashed_password = pwd_context.hash(user_data.password)
+    hashed_password = await password_hasher.hash(user_data.password)
     if(user_data.role == "user"):
         new_user = Users(
             first_name=user_data.first_name,
@@ -103,6 +104,17 @@ def delete_user(db: Session, user_id: str):
     user = db.query(Users).filter(Users.id == user_id).first()
     if not user:
         return None
+
+    # token_store rows go with the user through ON DELETE CASCADE, which skips
+    # the ORM after_delete hook, so every session is revoked here first
+    sessions = db.query(TokenStore.session_id, TokenStore.access_token_expiry).filter(
+        TokenStore.user_id == user.id
+    ).all()
+    connection = db.connection()
+    for session_id, access_token_expiry in sessions:
+        record_revocation(db, connection, session_id, access_token_expiry)
+    db.query(TokenStore).filter(TokenStore.user_id == user.id).delete(synchronize_session="fetch")
+
     db.delete(user)
     db.commit()
     return user
@@ -118,20 +130,11 @@ def change_password(db: Session,user_data: UserForgetPassword):
     return user_data
 
 
-def generate_tokens(db:Session , user_data: Users) -> Dict[str, str]:
-    """Generate access and refresh tokens for a user."""
+def generate_tokens(db:Session , user_data: Users, session_id: str) -> Dict[str, str]:
+    """Generate access and refresh tokens for a user session."""
     role = db.query(Roles).filter(Roles.id == user_data.role_id).first()
-    role_name = role.role_name
-    token_data = {
-        "sub": str(user_data.id),
-        "email": user_data.email,
-        "phone_no": user_data.phone_no,
-        "role": role_name,
-        "role_id" : user_data.role_id
-    }
-    
-    access_token = create_access_token(token_data)
-    refresh_token = create_refresh_token({"sub": str(user_data.id)})
+    access_token = create_access_token(build_access_claims(user_data, role, session_id))
+    refresh_token = create_refresh_token({"sub": str(user_data.id), "sid": session_id})
     
     return {
         "access_token": access_token,
@@ -139,6 +142,19 @@ def generate_tokens(db:Session , user_data: Users) -> Dict[str, str]:
         "token_type": "bearer"
         
     }
+
+
+def build_access_claims(user_data: Users, role: Roles, session_id: str) -> Dict:
+    """Claims the auth middleware needs to authenticate without a database lookup."""
+    return {
+        "sub": str(user_data.id),
+        "sid": session_id,
+        "email": user_data.email,
+        "phone_no": user_data.phone_no,
+        "role": role.role_name,
+        "role_id" : user_data.role_id,
+        "scope": " ".join(scope.scope_name for scope in role.scope)
+    }
     
 
 async def login_by_phoneno_or_email(user_: str, password: str, db: Session) -> Dict:
@@ -155,10 +171,16 @@ async def login_by_phoneno_or_email(user_: str, password: str, db: Session) -> D
     if existing_user is None:
         raise ValueError("Invalid user detail")
 
-    if not verify_password(password, existing_user.password):
+    verified, new_hash = await password_hasher.verify_and_update(password, existing_user.password)
+    if not verified:
         raise ValueError("Invalid password")
 
-    tokens = generate_tokens(db, existing_user)
+    if new_hash:
+        # Cost parameter changed since this hash was made; committed with the session below
+        existing_user.password = new_hash
+
+    session_id = uuid.uuid4().hex
+    tokens = generate_tokens(db, existing_user, session_id)
     access_token = tokens["access_token"]
     refresh_token = tokens["refresh_token"]
 
@@ -170,8 +192,9 @@ async def login_by_phoneno_or_email(user_: str, password: str, db: Session) -> D
 
     dicts = {
         "user_id": existing_user.id,
-        "access_token": access_token,
-        "refresh_token": refresh_token,
+        "session_id": session_id,
+        "access_token_hash": hash_token(access_token),
+        "refresh_token_hash": hash_token(refresh_token),
         "access_token_expiry": access_token_expiry_dt,
         "refresh_token_expiry": refresh_token_expiry_dt
     }
@@ -210,28 +233,55 @@ async def login_by_phoneno_or_email(user_: str, password: str, db: Session) -> D
 
 
 
-def refresh_access_token(db: Session, user_id: str) -> Dict[str, str]:
-    """Generate new access token using refresh token."""
-    user = db.query(Users).filter(Users.id == user_id).first()
-    role = get_role(db,user.role_id)
+def refresh_access_token(db: Session, user_id: str, refresh_token: str, session_id: Optional[str] = None) -> Dict[str, str]:
+    """
+    Issue a new access token for a live session. This is the only request
+    on the stateless auth path that consults the token store.
+    """
+    query = db.query(TokenStore).filter(TokenStore.user_id == user_id)
+    if session_id:
+        query = query.filter(TokenStore.session_id == session_id)
+    else:
+        query = query.filter(TokenStore.refresh_token_hash == hash_token(refresh_token))
+    token_entry = query.first()
+
+    if not token_entry or (session_id and revocation_list.is_revoked(session_id)):
+        raise ValueError("Session not found. Please login again.")
 
+    if token_entry.refresh_token_expiry <= datetime.now(timezone.utc):
+        raise ValueError("Refresh token expired. Please login again.")
+
+    user = db.query(Users).filter(Users.id == user_id).first()
     if not user:
         raise ValueError("User not found")
-    
-    token_data = {
-        "sub": str(user.id),
-        "email": user.email,
-        "phone_no": user.phone_no,
-        "role": role
-    }
-    
-    access_token = create_access_token(token_data)
+
+    role = db.query(Roles).filter(Roles.id == user.role_id).first()
+    if token_entry.session_id is None:
+        token_entry.session_id = uuid.uuid4().hex
+
+    access_token = create_access_token(build_access_claims(user, role, token_entry.session_id))
+    at = verify_access_token(access_token)
+
+    token_entry.access_token_hash = hash_token(access_token)
+    token_entry.access_token_expiry = datetime.fromtimestamp(at.get("exp"), tz=timezone.utc)
+    db.commit()
     
     return {
         "access_token": access_token,
         "token_type": "bearer"
     }
 
+
+def revoke_session(db: Session, session_id: str) -> bool:
+    """Delete a session from the token store; the delete hook records the revocation."""
+    token_entry = db.query(TokenStore).filter(TokenStore.session_id == session_id).first()
+    if not token_entry:
+        return False
+    db.delete(token_entry)
+    db.commit()
+    return True
+
+
 def tuple_to_address(address_tuple):
     if not address_tuple:
         return None
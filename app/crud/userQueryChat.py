@@ -1,8 +1,15 @@
 from datetime import datetime
-from app.core.database_mongo import chat_collection1 
+from typing import Optional
+from bson import ObjectId
+from app.core.config import get_settings
+from app.core.database_mongo import chat_collection1, conversations_collection
+from app.services.chat_writer import ChatWriter
+from pymongo import UpdateOne
 from app.utils import convertTOString
 from dateutil import parser
 
+settings = get_settings()
+
 def _to_int(x):
     try:
         return int(x)
@@ -14,71 +21,184 @@ async def save_message(sender_id, receiver_id, message, sender_role):
     receiver_id = _to_int(receiver_id)
 
     doc = {
+        "_id": ObjectId(),
         "sender_id": sender_id,
         "receiver_id": receiver_id,
         "message": message,
         "sender_role": sender_role.lower(),
-        "timestamp": datetime.now(),
-        "seen": False
+        "timestamp": datetime.now()
     }
-    res = await chat_collection1.insert_one(doc)
+    await chat_writer.enqueue(doc)
 
-    inserted_id = res.inserted_id
-    doc["_id"] = convertTOString(inserted_id)
-    doc["timestamp"] = doc["timestamp"].isoformat()
-    return doc
+    saved = dict(doc)
+    saved["_id"] = convertTOString(doc["_id"])
+    saved["timestamp"] = doc["timestamp"].isoformat()
+    saved["seen"] = False
+    return saved
 
 
-async def get_all_user():
-    
-    participants = {}
+async def update_conversations(docs):
+    """
+    Keep the per-participant summary in `conversations` current: latest
+    message for both sides, and the unseen count of messages sent to admin.
+    Called by the chat writer with each flushed batch, in send order.
 
-    cursor = chat_collection1.find().sort("timestamp", -1)
-    async for chat in cursor:
-        sid = chat.get("sender_id")
-        rid = chat.get("receiver_id")
-        ts = chat.get("timestamp")
+    Each summary also holds the read watermarks of the conversation:
+    admin_last_seen (admins reading the user) and user_last_seen (the user
+    reading admins). A message is seen once its timestamp is at or below
+    the reader's watermark; chat documents themselves are never updated.
+    """
+    operations = []
+    for doc in docs:
+        sid = doc["sender_id"]
+        rid = doc["receiver_id"]
         for pid in (sid, rid):
-            if pid is None:
+            if not (isinstance(pid, int) and pid > 0):
                 continue
-            if isinstance(pid, int) and pid > 0:
-                if pid not in participants:
-                    participants[pid] = {
-                        "user_id": pid,
-                        "last_message": chat.get("message"),
-                        "last_timestamp": ts.isoformat() if hasattr(ts, "isoformat") else str(ts),
-                        "last_sender_role": chat.get("sender_role"),
-                        "unseen_count": 0,
-                        "email": None  
-                    }
-
-    unseen_cursor = chat_collection1.find({"seen": False})
-    async for chat in unseen_cursor:
-        sid = chat.get("sender_id")
-        rid = chat.get("receiver_id")
-        if isinstance(sid, int) and sid > 0 and rid == 0:
-            if sid in participants:
-                participants[sid]["unseen_count"] += 1
-
-    result = list(participants.values())
-    result.sort(key=lambda r: r.get("last_timestamp") or "", reverse=True)
+            unseen = 1 if pid == sid and rid == 0 else 0
+            # a message can be flushed after an admin's watermark already
+            # covers it; only messages newer than the watermark count as
+            # unseen (a missing watermark is null, which sorts below any date)
+            operations.append(UpdateOne(
+                {"_id": pid},
+                [{"$set": {
+                    "last_message": {"$literal": doc["message"]},
+                    "last_timestamp": doc["timestamp"],
+                    "last_sender_role": {"$literal": doc["sender_role"]},
+                    "unseen_count": {"$add": [
+                        {"$ifNull": ["$unseen_count", 0]},
+                        {"$cond": [{"$gt": [doc["timestamp"], {"$ifNull": ["$admin_last_seen", None]}]}, unseen, 0]}
+                    ]},
+                    "admin_last_seen": {"$ifNull": ["$admin_last_seen", None]},
+                    "user_last_seen": {"$ifNull": ["$user_last_seen", None]}
+                }}],
+                upsert=True
+            ))
+    if operations:
+        await conversations_collection.bulk_write(operations, ordered=True)
+
+
+
+
+async def rebuild_conversations():
+    """
+    Rebuild `conversations` from `chats` in one aggregation. Run at startup
+    when summaries are missing, e.g. right after this was deployed. Read
+    watermarks are seeded from the legacy per-message `seen` flags.
+    """
+    pipeline = [
+        {"$sort": {"timestamp": -1}},
+        {"$project": {
+            "message": 1, "timestamp": 1, "sender_role": 1, "receiver_id": 1,
+            "unseen": {"$cond": [{"$and": [{"$eq": ["$receiver_id", 0]}, {"$ne": ["$seen", True]}]}, 1, 0]},
+            "seen_at": {"$cond": [{"$eq": ["$seen", True]}, "$timestamp", None]},
+            "participants": [
+                {"pid": "$sender_id", "own": True},
+                {"pid": "$receiver_id", "own": False}
+            ]
+        }},
+        {"$unwind": "$participants"},
+        {"$match": {"participants.pid": {"$type": "number", "$gt": 0}}},
+        {"$group": {
+            "_id": "$participants.pid",
+            "last_message": {"$first": "$message"},
+            "last_timestamp": {"$first": "$timestamp"},
+            "last_sender_role": {"$first": "$sender_role"},
+            "unseen_count": {"$sum": {"$cond": ["$participants.own", "$unseen", 0]}},
+            "admin_last_seen": {"$max": {"$cond": [
+                {"$and": ["$participants.own", {"$eq": ["$receiver_id", 0]}]}, "$seen_at", None
+            ]}},
+            "user_last_seen": {"$max": {"$cond": ["$participants.own", None, "$seen_at"]}}
+        }},
+        {"$merge": {"into": conversations_collection.name, "whenMatched": "replace"}}
+    ]
+    await chat_collection1.aggregate(pipeline).to_list(None)
+
+
+async def ensure_conversations():
+    if await chat_collection1.estimated_document_count() == 0:
+        return
+    missing = await conversations_collection.estimated_document_count() == 0
+    without_watermarks = await conversations_collection.count_documents(
+        {"admin_last_seen": {"$exists": False}}, limit=1
+    )
+    if missing or without_watermarks:
+        print("Building chat conversation summaries...")
+        await rebuild_conversations()
+
+
+async def get_all_user():
+    
+    result = []
+
+    cursor = conversations_collection.find().sort("last_timestamp", -1)
+    async for conversation in cursor:
+        ts = conversation.get("last_timestamp")
+        result.append({
+            "user_id": conversation["_id"],
+            "last_message": conversation.get("last_message"),
+            "last_timestamp": ts.isoformat() if hasattr(ts, "isoformat") else str(ts),
+            "last_sender_role": conversation.get("last_sender_role"),
+            "unseen_count": conversation.get("unseen_count", 0),
+            "email": None
+        })
     
     return result
 
 
-async def get_chat_history(user_id: int):
+async def get_chat_history(user_id: int, limit: Optional[int] = None, before: Optional[str] = None):
+    """
+    One page of a user's conversation, oldest first. `before` is the _id of
+    the oldest message the client already has; the returned next_cursor is
+    passed back to scroll further. Cost depends on the page size only.
+    """
     user_id = _to_int(user_id)
-    cursor = chat_collection1.find(
-        {
-            "$or": [
-                {"sender_id": user_id},
-                {"receiver_id": user_id}
-            ]
-        }
-    ).sort("timestamp", 1)  
+    if limit is None:
+        limit = settings.CHAT_HISTORY_PAGE_SIZE
+    elif int(limit) < 1:
+        raise ValueError("History limit must be at least 1")
+    limit = min(int(limit), settings.CHAT_HISTORY_MAX_PAGE_SIZE)
+
+    query = {
+        "$or": [
+            {"sender_id": user_id},
+            {"receiver_id": user_id}
+        ]
+    }
+    if before:
+        if not ObjectId.is_valid(before):
+            raise ValueError("Invalid history cursor")
+        anchor = await chat_collection1.find_one({"_id": ObjectId(before)}, {"timestamp": 1})
+        if anchor is None:
+            raise ValueError("History cursor not found")
+        query = {"$and": [query, {"$or": [
+            {"timestamp": {"$lt": anchor["timestamp"]}},
+            {"timestamp": anchor["timestamp"], "_id": {"$lt": anchor["_id"]}}
+        ]}]}
+
+    cursor = chat_collection1.find(query).sort([("timestamp", -1), ("_id", -1)]).limit(limit + 1)
+    rows = await cursor.to_list(None)
+
+    if not before:
+        # messages still waiting in the write-behind queue belong on the newest page
+        stored = {row["_id"] for row in rows}
+        rows += [
+            dict(doc) for doc in chat_writer.pending_messages()
+            if user_id in (doc["sender_id"], doc["receiver_id"]) and doc["_id"] not in stored
+        ]
+        rows.sort(key=lambda row: (row["timestamp"], row["_id"]), reverse=True)
+        rows = rows[:limit + 1]
+
+    watermarks = {}
+    conversation_ids = {chat["sender_id"] if chat["receiver_id"] == 0 else chat["receiver_id"] for chat in rows}
+    async for conversation in conversations_collection.find(
+        {"_id": {"$in": list(conversation_ids)}}, {"admin_last_seen": 1, "user_last_seen": 1}
+    ):
+        watermarks[conversation["_id"]] = conversation
 
     chats = []
-    async for chat in cursor:
+    for chat in rows:
+        chat["seen"] = is_seen(chat, watermarks)
         if "_id" in chat:
             chat["_id"] = convertTOString(chat["_id"])
         if "timestamp" in chat and hasattr(chat["timestamp"], "isoformat"):
@@ -86,7 +206,15 @@ async def get_chat_history(user_id: int):
         elif "timestamp" in chat:
             chat["timestamp"] = str(chat["timestamp"])
         chats.append(chat)
-    return chats
+
+    has_more = len(chats) > limit
+    chats = chats[:limit]
+    chats.reverse()
+    return {
+        "messages": chats,
+        "has_more": has_more,
+        "next_cursor": chats[0]["_id"] if has_more and chats else None
+    }
 
 
 async def del_user_history(user_id: int):
@@ -97,47 +225,70 @@ async def del_user_history(user_id: int):
             {"receiver_id": user_id}
         ]
     })
+    await conversations_collection.delete_one({"_id": user_id})
     return {"deleted_count": result.deleted_count}
 
 
-async def mark_seen_until(reader_id: int, peer_id: int, max_iso_ts: str):
-    
-    try:
-        ts = parser.isoparse(max_iso_ts)
-    except Exception:
-        ts = max_iso_ts
+def is_seen(chat, watermarks) -> bool:
+    if chat["receiver_id"] == 0:
+        watermark = watermarks.get(chat["sender_id"], {}).get("admin_last_seen")
+    else:
+        watermark = watermarks.get(chat["receiver_id"], {}).get("user_last_seen")
+    return watermark is not None and chat["timestamp"] <= watermark
 
-    reader_id = _to_int(reader_id)
-    peer_id = _to_int(peer_id)
 
-    query = {
-        "receiver_id": reader_id,
-        "sender_id": peer_id,
-        "timestamp": {"$lte": ts},
-        "seen": False
-    }
-    
-    cursor = chat_collection1.find(query)
-    ids = []
-    async for doc in cursor:
-        if "_id" in doc:
-            ids.append(convertTOString(doc["_id"]))
+async def apply_seen(reader_id: int, peer_id: int, until: datetime) -> int:
+    """
+    Advance the reader's watermark to `until` (never backwards) and return
+    how many messages that newly covers, counted over the
+    (sender_id, receiver_id, timestamp) index.
+    """
+    if reader_id == 0:
+        conversation_id, field, sender = peer_id, "admin_last_seen", {"sender_id": peer_id}
+    else:
+        conversation_id, field, sender = reader_id, "user_last_seen", {"sender_id": {"$ne": reader_id}}
 
-    if ids:
-        await chat_collection1.update_many(query, {"$set": {"seen": True}})
+    previous = await conversations_collection.find_one_and_update(
+        {"_id": conversation_id},
+        [{"$set": {field: {"$max": [f"${field}", until]}}}],
+        projection={field: 1}
+    )
+    if previous is None:
+        return 0
 
-    return {"ids": ids, "count": len(ids)}
+    window = {"$lte": until}
+    if previous.get(field) is not None:
+        if previous[field] >= until:
+            return 0
+        window["$gt"] = previous[field]
+    count = await chat_collection1.count_documents({**sender, "receiver_id": reader_id, "timestamp": window})
 
+    if reader_id == 0:
+        await conversations_collection.update_one(
+            {"_id": peer_id}, {"$set": {"unseen_count": await get_unseen_count(peer_id)}}
+        )
+    return count
+
+
+async def mark_seen_until(reader_id: int, peer_id: int, max_iso_ts: str):
+    """
+    Mark the peer's messages up to max_iso_ts as seen by moving the
+    reader's watermark. Marks for the same conversation are coalesced by
+    the chat writer into one update.
+    """
+    ts = parser.isoparse(max_iso_ts)
+    count = await chat_writer.mark_seen(_to_int(reader_id), _to_int(peer_id), ts)
+    return {"count": count}
 
-async def get_unseen_count(user_id: int):
 
+async def get_unseen_count(user_id: int):
+    """Messages from the user to admin after the admins' watermark: one index range count."""
     user_id = _to_int(user_id)
-    count = await chat_collection1.count_documents({
-        "sender_id": user_id,
-        "receiver_id": 0,  
-        "seen": False
-    })
-    return count
+    conversation = await conversations_collection.find_one({"_id": user_id}, {"admin_last_seen": 1})
+    query = {"sender_id": user_id, "receiver_id": 0}
+    if conversation and conversation.get("admin_last_seen") is not None:
+        query["timestamp"] = {"$gt": conversation["admin_last_seen"]}
+    return await chat_collection1.count_documents(query)
 
 
 async def get_conversation_participants():
@@ -148,4 +299,14 @@ async def get_conversation_participants():
     for x in senders + receivers:
         if isinstance(x, int) and x > 0:
             ids.add(x)
-    return sorted(list(ids))
\ No newline at end of file
+    return sorted(list(ids))
+
+
+chat_writer = ChatWriter(
+    chat_collection1,
+    batch_size=settings.CHAT_WRITE_BATCH_SIZE,
+    flush_ms=settings.CHAT_WRITE_FLUSH_MS,
+    max_pending=settings.CHAT_WRITE_MAX_PENDING,
+    on_inserted=update_conversations,
+    apply_seen=apply_seen
+)
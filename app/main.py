@@ -1,12 +1,26 @@
-from fastapi import Depends, FastAPI 
+from app.core.startup_profile import profiler, print_report
+import asyncio
+import time
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from app.core.database_postgres import init_db
+from app.auth.scope_mask import init_scope_catalog
+from app.auth.revocation import revocation_list
+from app.auth.auth_utils import require_scope
+from app.core.metrics import metrics
+from app.auth.hashing import password_hasher
+from app.core.config import get_settings
+from app.core.database_mongo import init_mongo_indexes
+from app.crud.content_store import backfill_content_types
+from app.crud.room_ratings import seed_room_ratings
+from app.crud.userQueryChat import chat_writer, ensure_conversations
 from app.middleware.auth_middleware import AuthMiddleware
 from app.routes import booked_contact, general_contact, postgress_backup_restore, users,feature,room_type_with_size,bed_type,floor,room,addon,booking,reviewsRatings,content_management,mongo_backup_restore
 from app.middleware.logging_middleware import ActivityLoggingMiddleware
 from app.services.scheduler import scheduler
 
+settings = get_settings()
 application = FastAPI(
     title="Hotel Booking System",
     description="Secure API with JWT Cookie-based Authentication",
@@ -28,7 +42,52 @@ application.add_middleware(ActivityLoggingMiddleware)
 def on_startup():
     
     init_db()
+    init_scope_catalog()
+    revocation_list.sync()
     scheduler.start()
+
+    if profiler is not None:
+        profiler.uninstall()
+        report = profiler.report()
+        print_report(report)
+        metrics.set_gauge("startup.import_ms", report["total_ms"])
+        metrics.set_gauge("startup.max_rss_mb", report["max_rss_mb"])
+
+
+def warm_up_rag():
+    start = time.perf_counter()
+    try:
+        from app.crud import terms_conditions_assist
+        terms_conditions_assist.warmup()
+        metrics.observe("rag.warmup", (time.perf_counter() - start) * 1000)
+        print(f"RAG stack warmed up in {time.perf_counter() - start:.1f}s")
+    except Exception as e:
+        print(f"RAG warmup failed: {str(e)}")
+
+
+@application.on_event("startup")
+async def on_startup_mongo():
+    try:
+        await init_mongo_indexes()
+        await ensure_conversations()
+        await backfill_content_types()
+        await seed_room_ratings()
+    except Exception as e:
+        print(f"Mongo index bootstrap failed: {str(e)}")
+
+
+@application.on_event("startup")
+async def on_startup_chat():
+    await chat_writer.start()
+    await booked_contact.manager.start()
+
+
+@application.on_event("startup")
+async def on_startup_warmup():
+    # RAG_WARMUP loads the model in the background so startup is not delayed
+    # and workers that leave it off never import the RAG stack at all
+    if settings.RAG_WARMUP:
+        application.state.rag_warmup = asyncio.create_task(asyncio.to_thread(warm_up_rag))
     
     
 application.mount("/static", StaticFiles(directory="app/static"), name="static")
@@ -58,10 +117,23 @@ def health_check():
         "service": "Hotel Booking System"
     }
 
+@application.get("/metrics", tags=["Root"])
+@require_scope(["scope:read"])
+def metrics_snapshot(request: Request):
+    """Process-local counters, gauges and timings"""
+    return metrics.snapshot()
+
+@application.on_event("shutdown")
+async def on_shutdown_chat():
+    await booked_contact.manager.stop()
+    await chat_writer.stop()
+
+
 @application.on_event("shutdown")
 def on_shutdown():
     
     scheduler.shutdown()
+    password_hasher.shutdown()
     print("Shutting down server...")
 
 
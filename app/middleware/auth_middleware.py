@@ -6,9 +6,15 @@ from app.core.database_postgres import SessionLocal
 from app.models.user import Users
 from app.models.role import Roles
 from app.models.token_store import TokenStore
-from app.auth.jwt_handler import get_token, verify_access_token, verify_refresh_token
+from app.auth.jwt_handler import get_token, hash_token, verify_access_token, verify_refresh_token
+from app.auth.scope_mask import role_mask, scope_claim_mask
+from app.auth.principal import Principal, RolePrincipal
+from app.auth.revocation import revocation_list
+from app.core.config import get_settings
 import traceback
 
+settings = get_settings()
+
 
 class AuthMiddleware(BaseHTTPMiddleware):
     
@@ -22,6 +28,7 @@ class AuthMiddleware(BaseHTTPMiddleware):
             "/openapi.json",
             "/health",
             "/user/verify_email",
+            "/user/refresh",
             "/"
         ]
 
@@ -30,6 +37,34 @@ class AuthMiddleware(BaseHTTPMiddleware):
         if request.url.path in self.EXCLUDE_PATHS:
             return await call_next(request)
 
+        if settings.AUTH_STATELESS_FAST_PATH:
+            try:
+                access_token = get_token(request)
+                access_payload = verify_access_token(access_token)
+            except HTTPException as e:
+                return JSONResponse(status_code=e.status_code, content={"detail": e.detail})
+
+            session_id = access_payload.get("sid")
+            if session_id and access_payload.get("sub"):
+                if revocation_list.is_revoked(session_id):
+                    return JSONResponse(
+                        status_code=status.HTTP_401_UNAUTHORIZED,
+                        content={"detail": "Session has been revoked. Please login again."}
+                    )
+
+                scope_mask = scope_claim_mask(access_payload.get("scope", ""))
+                if not scope_mask:
+                    return JSONResponse(
+                        status_code=status.HTTP_401_UNAUTHORIZED,
+                        content={"detail": "No scopes assigned"}
+                    )
+
+                request.state.user = Principal(access_payload)
+                request.state.role = RolePrincipal(access_payload.get("role_id"), access_payload.get("role"))
+                request.state.scope_mask = scope_mask
+                request.state.session_id = session_id
+                return await call_next(request)
+
         db = SessionLocal()
         try:
             print(f"Auth check for: {request.url.path}")
@@ -52,8 +87,8 @@ class AuthMiddleware(BaseHTTPMiddleware):
             now = datetime.now(timezone.utc)
             token_entry = db.query(TokenStore).filter(
                 TokenStore.user_id == user_id,
-                TokenStore.access_token == access_token,
-                TokenStore.refresh_token == refresh_token
+                TokenStore.access_token_hash == hash_token(access_token),
+                TokenStore.refresh_token_hash == hash_token(refresh_token)
             ).first()
 
             if not token_entry:
@@ -86,13 +121,14 @@ class AuthMiddleware(BaseHTTPMiddleware):
             if not role:
                 raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Role not found")
 
-            scopes = [scope.scope_name for scope in role.scope] if role.scope else []
-            if not scopes:
+            scope_mask = role_mask(role)
+            if not scope_mask:
                 raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="No scopes assigned")
 
             request.state.user = user
             request.state.role = role
-            request.state.scopes = scopes
+            request.state.scope_mask = scope_mask
+            request.state.session_id = token_entry.session_id
 
             print(f"Authenticated user {user.id} with role {role.role_name}")
 
@@ -18,6 +18,7 @@ from app.models.associations import role_scopes
 from app.models.otps import OTPModel
 from app.models.role import Roles
 from app.models.token_store import TokenStore
+from app.models.revoked_session import RevokedSessions
 from app.models.scope import Scopes
 from app.models.bed_type import BedTypes
 from app.models.features import Features
@@ -57,6 +58,8 @@ from app.models.bookings import Bookings
 from app.models.payment import Payments
 
 from app.models.rating_reviews import RatingsReviews
+from app.models.room_rating_stats import RoomRatingStats
+from app.models.review_outbox import ReviewOutbox
 
 from app.models.refund import Refunds
 # ============================================
@@ -98,6 +101,7 @@ __all__ = [
     "OTPModel",
     "Roles",
     "TokenStore",
+    "RevokedSessions",
     "Scopes",
     "BedTypes",
     "Features",
@@ -110,6 +114,8 @@ __all__ = [
     "Bookings",
     "Payments",
     "RatingsReviews",
+    "RoomRatingStats",
+    "ReviewOutbox",
     "Refunds",
     "PaymentStatus",
     "BookingStatusHistory",
@@ -1,4 +1,4 @@
-from sqlalchemy import JSON, Column, Integer, String, DateTime, Boolean
+from sqlalchemy import JSON, Column, Integer, String, DateTime, Boolean, Index, text
 from sqlalchemy.sql import func
 from datetime import datetime, timedelta
 from app.core.database_postgres import Base 
@@ -16,5 +16,9 @@ class OTPModel(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     expiry = Column(DateTime(timezone=True), default=default_expiry)
 
+    __table_args__ = (
+        Index("ix_otps_expiry", "expiry", postgresql_where=text("expiry IS NOT NULL")),
+    )
+
     def __repr__(self):
         return f"<OTP(email={self.email}, otp={self.otp}, expiry={self.expiry})>"
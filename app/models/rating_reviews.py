@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, String, DateTime, func, Integer
+from sqlalchemy import CheckConstraint, Column, ForeignKey, Index, SmallInteger, String, DateTime, func, Integer
 from app.core.database_postgres import Base
 from sqlalchemy.orm import relationship
 from app.models.associations import room_type_features
@@ -22,6 +22,9 @@ class RatingsReviews(Base):
       String,
       nullable=False
     )
+    # star value mirrored from the Mongo review so room_rating_stats can be
+    # maintained and recomputed in SQL; NULL only for rows not yet backfilled
+    ratings = Column(SmallInteger, nullable=True)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     
@@ -30,10 +33,16 @@ class RatingsReviews(Base):
         back_populates="ratingReview",
         lazy="joined"
     )
-    
+
     room = relationship(
         "Rooms",
         back_populates="ratingReview",
         lazy="joined"
     )
-   
+
+    __table_args__ = (
+        CheckConstraint("ratings IS NULL OR ratings BETWEEN 1 AND 5", name="check_ratings_range"),
+        # keyset paging of a room's reviews, newest first
+        Index("ix_ratings_reviews_room_created", "room_id", created_at.desc(), id.desc()),
+    )
+
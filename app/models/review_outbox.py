@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, CheckConstraint, Index, func, text
+from sqlalchemy.dialects.postgresql import JSONB
+from app.core.database_postgres import Base
+
+
+class ReviewOutbox(Base):
+    """
+    Pending review writes for Mongo. A row is committed in the same
+    transaction as the ratings_reviews change it describes and is applied to
+    the reviews collection by the outbox relay.
+    """
+    __tablename__ = "review_outbox"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True, nullable=False)
+    op = Column(String(10), nullable=False)
+    object_id = Column(String(24), nullable=False)
+    payload = Column(JSONB, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        CheckConstraint("op IN ('upsert', 'delete')", name="check_review_outbox_op"),
+        Index("ix_review_outbox_pending", "id", postgresql_where=text("processed_at IS NULL")),
+        Index("ix_review_outbox_object_id", "object_id"),
+    )
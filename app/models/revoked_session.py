@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, String, DateTime, func
+from app.core.database_postgres import Base
+
+
+class RevokedSessions(Base):
+    __tablename__ = "revoked_sessions"
+
+    id = Column(Integer, primary_key=True, autoincrement=True, nullable=False)
+    session_id = Column(String(32), nullable=False, index=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, ForeignKey, Integer, Numeric, DateTime, CheckConstraint, Index, func
+from app.core.database_postgres import Base
+
+
+class RoomRatingStats(Base):
+    __tablename__ = "room_rating_stats"
+
+    room_id = Column(
+        Integer,
+        ForeignKey("rooms.id", ondelete="CASCADE"),
+        primary_key=True,
+        nullable=False
+    )
+    rating_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    avg_rating = Column(Numeric(3, 2))
+    star_1 = Column(Integer, nullable=False, default=0, server_default="0")
+    star_2 = Column(Integer, nullable=False, default=0, server_default="0")
+    star_3 = Column(Integer, nullable=False, default=0, server_default="0")
+    star_4 = Column(Integer, nullable=False, default=0, server_default="0")
+    star_5 = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_room_rating_stats_avg_rating", "avg_rating", "rating_count"),
+        CheckConstraint("rating_count >= 0", name="check_rating_count_non_negative"),
+    )
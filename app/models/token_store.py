@@ -1,4 +1,4 @@
-from sqlalchemy import (Column,Integer,String,DateTime,ForeignKey,func,UniqueConstraint,CheckConstraint)
+from sqlalchemy import (Column,Integer,String,DateTime,ForeignKey,LargeBinary,func,Index,CheckConstraint)
 from sqlalchemy.orm import relationship
 from app.core.database_postgres import Base
 
@@ -9,19 +9,21 @@ class TokenStore(Base):
     id = Column(Integer, primary_key=True, autoincrement=True, nullable=False)
 
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    session_id = Column(String(32), nullable=True, unique=True)
 
-    access_token = Column(String(512), nullable=False, unique=True)
-    refresh_token = Column(String(512), nullable=False, unique=True)
+    # SHA-256 digests of the issued JWTs; the raw tokens are never stored
+    access_token_hash = Column(LargeBinary(32), nullable=False)
+    refresh_token_hash = Column(LargeBinary(32), nullable=False, unique=True)
     
     access_token_expiry = Column(DateTime(timezone=True), nullable=False)
-    refresh_token_expiry = Column(DateTime(timezone=True), nullable=False)
+    refresh_token_expiry = Column(DateTime(timezone=True), nullable=False, index=True)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     user = relationship("Users", back_populates="token", lazy="joined")
 
     __table_args__ = (
-        UniqueConstraint("user_id", "refresh_token", name="uq_user_refresh_token"),
-        CheckConstraint("char_length(access_token) > 10", name="check_access_token_length"),
-        CheckConstraint("char_length(refresh_token) > 10", name="check_refresh_token_length"),
+        Index("ix_token_store_user_tokens", "user_id", "access_token_hash", "refresh_token_hash"),
+        CheckConstraint("octet_length(access_token_hash) = 32", name="check_access_token_hash_length"),
+        CheckConstraint("octet_length(refresh_token_hash) = 32", name="check_refresh_token_hash_length"),
     )
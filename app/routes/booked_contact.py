@@ -1,15 +1,20 @@
 # app/routes/userQueryChat.py
-from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, Request, HTTPException
+import asyncio
+import time
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, Request, HTTPException, Query
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from app.core.dependency import get_db
 from app.crud.generic_crud import get_record
 from app.crud.userQueryChat import (
-    save_message, get_chat_history, del_user_history, get_all_user, get_conversation_participants
+    save_message, get_chat_history, del_user_history, get_all_user, get_conversation_participants, mark_seen_until
 )
 from app.auth.jwt_handler import verify_access_token
+from app.auth.revocation import revocation_list
+from app.services.chat_bus import WORKER_ID, ChatBus, create_chat_bus
+from app.core.metrics import metrics
+from app.services.chat_frames import JSON, MSGPACK, Frame, decode_message, negotiate_encoding
 from jose import jwt
-import json
 from sqlalchemy.orm import Session
 from app.core.config import get_settings
 from typing import Optional
@@ -26,82 +31,341 @@ router = APIRouter(prefix="/Query", tags=["Contact By Booked User"])
 templates = Jinja2Templates(directory="app/templates")
 
 
+class ClientConnection:
+    """
+    One chat socket with a bounded outgoing queue drained by its own writer
+    task, so a slow client never holds up delivery to anyone else. Droppable
+    frames (presence) are skipped when the queue is full; anything else
+    disconnects the slow client, which reloads history when it reconnects.
+    """
+
+    def __init__(self, websocket: WebSocket, user_id: int, email: str, role: str, encoding: str = JSON):
+        self.websocket = websocket
+        self.user_id = int(user_id)
+        self.email = email
+        self.role = role.lower()
+        self.encoding = encoding
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.CHAT_SEND_QUEUE_SIZE)
+        self.closed = False
+        self._writer = asyncio.create_task(self._write_loop())
+
+    async def _write_loop(self):
+        try:
+            while True:
+                frame = await self.queue.get()
+                data = frame.encode(self.encoding)
+                if self.encoding == MSGPACK:
+                    await self.websocket.send_bytes(data)
+                    size = len(data)
+                else:
+                    await self.websocket.send_text(data)
+                    size = len(data.encode("utf-8"))
+                # sizes are before permessage-deflate, which the server applies per socket
+                self.frames_sent += 1
+                self.bytes_sent += size
+                metrics.incr(f"chat.frames_sent.{self.encoding}")
+                metrics.incr(f"chat.bytes_sent.{self.encoding}", size)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f" Send failed for {self.role} {self.user_id}: {e}")
+            self.closed = True
+
+    def stats(self) -> dict:
+        return {
+            "user_id": self.user_id,
+            "role": self.role,
+            "encoding": self.encoding,
+            "frames_sent": self.frames_sent,
+            "bytes_sent": self.bytes_sent,
+            "avg_frame_bytes": round(self.bytes_sent / self.frames_sent, 1) if self.frames_sent else 0,
+            "queued": self.queue.qsize()
+        }
+
+    def offer(self, frame: Frame, droppable: bool = False) -> bool:
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            if droppable:
+                metrics.incr("chat.frames_dropped")
+                return False
+            metrics.incr("chat.slow_consumers_closed")
+            print(f" Closing slow {self.role} connection {self.user_id}")
+            self.close(code=1013)
+            return False
+
+    def close(self, code: int = 1000):
+        if self.closed:
+            return
+        self.closed = True
+        self._writer.cancel()
+        asyncio.create_task(self._close_socket(code))
+
+    async def _close_socket(self, code: int):
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+    async def shutdown(self):
+        self._writer.cancel()
+        await asyncio.gather(self._writer, return_exceptions=True)
+
+
 class ConnectionManager:
+    """
+    Tracks this worker's chat sockets: any number of user and admin
+    sessions. Deliveries are also published on the chat bus so sockets held
+    by other workers receive them. Presence travels as numbered per-user
+    deltas; a worker that sees a gap in another's sequence (or a heartbeat
+    with a different one) asks that worker for a full snapshot. Remote
+    presence expires if a worker stops sending heartbeats. Presence frames
+    are debounced so a burst of connects produces one broadcast.
+    """
+
     def __init__(self):
-        self.user_connections: dict[int, dict] = {}
-        self.admin_connection: Optional[WebSocket] = None
-        self.admin_id: Optional[int] = None
-        self.admin_email: Optional[str] = None
-
-    async def connect(self, websocket: WebSocket, user_id: int, email: str, role: str):
-        if role.lower() == "admin":
-            self.admin_connection = websocket
-            self.admin_id = int(user_id)
-            self.admin_email = email
-            print(f" Admin connected: {email} (ID: {user_id})")
-            await self.broadcast_online_status()
-        else:
-            self.user_connections[int(user_id)] = {
-                "websocket": websocket,
-                "email": email
-            }
-            print(f" User connected: {email} (ID: {user_id})")
-            await self.broadcast_online_status()
+        self.user_connections: dict[int, set] = {}
+        self.admin_connections: dict[int, set] = {}
+        self.remote_presence: dict[str, dict] = {}
+        self.bus: Optional[ChatBus] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._presence_task: Optional[asyncio.Task] = None
+        self._presence_seq = 0
+        self._presence_changes: dict[tuple, Optional[dict]] = {}
+
+    async def start(self):
+        self.bus = create_chat_bus()
+        await self.bus.start(self.on_bus_event)
+        await self.bus.publish({"type": "presence_request", "origin": WORKER_ID})
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+
+    async def stop(self):
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+        if self.bus:
+            await self.bus.publish({"type": "presence_offline", "origin": WORKER_ID})
+            await self.bus.stop()
+
+    def _registry(self, role: str) -> dict:
+        return self.admin_connections if role == "admin" else self.user_connections
+
+    async def connect(self, websocket: WebSocket, user_id: int, email: str, role: str,
+                      encoding: str = JSON) -> ClientConnection:
+        connection = ClientConnection(websocket, user_id, email, role, encoding)
+        registry = self._registry(connection.role)
+        if connection.user_id not in registry:
+            self._presence_changes[(connection.role, connection.user_id)] = self._presence_entry(connection)
+        registry.setdefault(connection.user_id, set()).add(connection)
+        print(f" {connection.role.capitalize()} connected: {email} (ID: {user_id})")
+        self.presence_changed()
+        return connection
+
+    @staticmethod
+    def _presence_entry(connection: ClientConnection) -> dict:
+        return {"user_id": connection.user_id, "email": connection.email, "role": connection.role}
+
+    def _connections(self, registry: dict, ids=None):
+        ids = registry.keys() if ids is None else ids
+        return [connection for uid in ids for connection in registry.get(int(uid), ())]
+
+    def local_presence(self):
+        users = {
+            str(uid): {"user_id": uid, "email": next(iter(connections)).email, "role": "user"}
+            for uid, connections in self.user_connections.items()
+        }
+        admins = {
+            str(uid): {"user_id": uid, "email": next(iter(connections)).email, "role": "admin"}
+            for uid, connections in self.admin_connections.items()
+        }
+        return users, admins
 
     def cur_online_connection(self):
         online_users = {}
-        for uid, info in self.user_connections.items():
-            online_users[str(uid)] = {
-                "user_id": uid,
-                "email": info["email"],
-                "role": "user"
-            }
-        if self.admin_connection and self.admin_id is not None:
-            online_users[str(self.admin_id)] = {
-                "user_id": self.admin_id,
-                "email": self.admin_email,
-                "role": "admin"
-            }
+        snapshots = list(self.remote_presence.values())
+        users, admins = self.local_presence()
+        snapshots.append({"users": users, "admins": admins})
+        for snapshot in snapshots:
+            online_users.update(snapshot["users"])
+            online_users.update(snapshot["admins"])
         return online_users
 
     def is_user_online(self, user_id: int) -> bool:
-        return int(user_id) in self.user_connections
+        if int(user_id) in self.user_connections:
+            return True
+        return any(str(user_id) in snapshot["users"] for snapshot in self.remote_presence.values())
 
     def is_admin_online(self) -> bool:
-        return self.admin_connection is not None
-
-    async def disconnect(self, user_id: int, role: str = "user"):
-        if role.lower() == "admin":
-            self.admin_connection = None
-            self.admin_id = None
-            self.admin_email = None
-            print(f"🔌 Admin disconnected")
-        else:
-            self.user_connections.pop(int(user_id), None)
-            print(f"🔌 User {user_id} disconnected")
-        await self.broadcast_online_status()
-
-    async def broadcast_online_status(self):
+        if self.admin_connections:
+            return True
+        return any(snapshot["admins"] for snapshot in self.remote_presence.values())
+
+    async def disconnect(self, connection: ClientConnection):
+        registry = self._registry(connection.role)
+        connections = registry.get(connection.user_id)
+        if connections is not None:
+            connections.discard(connection)
+            if not connections:
+                del registry[connection.user_id]
+                self._presence_changes[(connection.role, connection.user_id)] = None
+        await connection.shutdown()
+        print(f"🔌 {connection.role.capitalize()} {connection.user_id} disconnected")
+        self.presence_changed()
+
+    def presence_changed(self):
+        """
+        Schedule one coalesced presence broadcast after the debounce window.
+        Local connect/disconnect changes recorded by then are also published
+        as one delta; changes learned from other workers only refresh the
+        local clients.
+        """
+        if self._presence_task is None or self._presence_task.done():
+            self._presence_task = asyncio.create_task(self._flush_presence())
+
+    async def _flush_presence(self):
+        await asyncio.sleep(settings.CHAT_PRESENCE_DEBOUNCE_MS / 1000)
+        changes, self._presence_changes = self._presence_changes, {}
+        self.broadcast_online_status()
+        if changes:
+            await self.publish_presence_delta(changes)
+
+    async def _publish(self, event: dict):
+        if self.bus is None:
+            return
+        try:
+            await self.bus.publish(event)
+        except Exception as e:
+            print(f" Failed to publish {event['type']}: {e}")
+
+    async def publish_presence_delta(self, changes: dict):
+        self._presence_seq += 1
+        await self._publish({
+            "type": "presence_delta",
+            "origin": WORKER_ID,
+            "seq": self._presence_seq,
+            "changes": [{"role": role, "user_id": uid, "entry": entry} for (role, uid), entry in changes.items()]
+        })
+
+    async def publish_presence(self):
+        """Full snapshot; only sent when another worker asks for it."""
+        users, admins = self.local_presence()
+        await self._publish({
+            "type": "presence", "origin": WORKER_ID, "seq": self._presence_seq, "users": users, "admins": admins
+        })
+
+    async def request_presence(self, target: str):
+        await self._publish({"type": "presence_request", "origin": WORKER_ID, "target": target})
+
+    async def _heartbeat(self):
+        interval = settings.CHAT_PRESENCE_HEARTBEAT_SECONDS
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            expired = [origin for origin, snapshot in self.remote_presence.items()
+                       if now - snapshot["seen_at"] > 3 * interval]
+            for origin in expired:
+                del self.remote_presence[origin]
+            if expired:
+                self.presence_changed()
+            await self._publish({"type": "presence_heartbeat", "origin": WORKER_ID, "seq": self._presence_seq})
+
+    def _apply_presence_delta(self, snapshot: dict, changes: list):
+        for change in changes:
+            registry = snapshot["admins"] if change["role"] == "admin" else snapshot["users"]
+            if change["entry"] is None:
+                registry.pop(str(change["user_id"]), None)
+            else:
+                registry[str(change["user_id"])] = change["entry"]
+
+    async def on_bus_event(self, event: dict):
+        origin = event.get("origin")
+        if origin == WORKER_ID:
+            return
+
+        if event["type"] == "deliver":
+            self.deliver_local(event["user_ids"], event["admins"], Frame(event["payload"]))
+        elif event["type"] == "presence":
+            previous = self.remote_presence.get(origin)
+            self.remote_presence[origin] = {
+                "users": event["users"],
+                "admins": event["admins"],
+                "seq": event["seq"],
+                "seen_at": time.monotonic()
+            }
+            if previous is None or (previous["users"], previous["admins"]) != (event["users"], event["admins"]):
+                self.presence_changed()
+        elif event["type"] == "presence_delta":
+            snapshot = self.remote_presence.get(origin)
+            if snapshot is None or event["seq"] != snapshot["seq"] + 1:
+                # missed a delta (or never had a snapshot): resync from the origin
+                metrics.incr("chat.presence_resyncs")
+                await self.request_presence(origin)
+                return
+            self._apply_presence_delta(snapshot, event["changes"])
+            snapshot["seq"] = event["seq"]
+            snapshot["seen_at"] = time.monotonic()
+            self.presence_changed()
+        elif event["type"] == "presence_heartbeat":
+            snapshot = self.remote_presence.get(origin)
+            if snapshot is None or snapshot["seq"] != event["seq"]:
+                metrics.incr("chat.presence_resyncs")
+                await self.request_presence(origin)
+            else:
+                snapshot["seen_at"] = time.monotonic()
+        elif event["type"] == "presence_offline":
+            if self.remote_presence.pop(origin, None) is not None:
+                self.presence_changed()
+        elif event["type"] == "presence_request":
+            if event.get("target") in (None, WORKER_ID):
+                await self.publish_presence()
+
+    def broadcast_online_status(self):
         online_users = self.cur_online_connection()
-        payload = json.dumps({"type": "online_users", "users": online_users})
-        
-        if self.admin_connection:
-            try:
-                await self.admin_connection.send_text(payload)
-            except:
-                pass
-        
-        for user_info in self.user_connections.values():
+        frame = Frame({"type": "online_users", "users": online_users})
+        for connection in self._connections(self.admin_connections) + self._connections(self.user_connections):
+            connection.offer(frame, droppable=True)
+
+    async def send_personal_message(self, payload: dict, connection: ClientConnection):
+        connection.offer(Frame(payload))
+
+    def connection_stats(self) -> list:
+        return [connection.stats() for connection in
+                self._connections(self.admin_connections) + self._connections(self.user_connections)]
+
+    def deliver_local(self, user_ids: list, admins: bool, frame: Frame):
+        """Queue a chat frame for the listed users and, if asked, every admin connected to this worker."""
+        targets = self._connections(self.user_connections, user_ids)
+        if admins:
+            targets += self._connections(self.admin_connections)
+        for connection in targets:
+            connection.offer(frame)
+        metrics.incr("chat.frames_queued", len(targets))
+
+    async def publish_read_receipt(self, reader_role: str, conversation_user_id: int, until: str, count: int):
+        """Tell both sides of the conversation (every worker) that messages up to `until` were read."""
+        payload = {
+            "type": "seen",
+            "reader_role": reader_role,
+            "user_id": conversation_user_id,
+            "until": until,
+            "count": count
+        }
+        self.deliver_local([conversation_user_id], True, Frame(payload))
+        if self.bus is not None:
             try:
-                await user_info["websocket"].send_text(payload)
-            except:
-                pass
-
-    async def send_personal_message(self, message: str, websocket: WebSocket):
-        try:
-            await websocket.send_text(message)
-        except:
-            pass
+                await self.bus.publish({
+                    "type": "deliver",
+                    "origin": WORKER_ID,
+                    "user_ids": [conversation_user_id],
+                    "admins": True,
+                    "payload": payload
+                })
+            except Exception as e:
+                print(f" Failed to publish read receipt to other workers: {e}")
 
     async def send_private_message(self, sender_id: int, receiver_id: int, message: str,
                                    sender_role: str, sender_username: str):
@@ -127,41 +391,23 @@ class ConnectionManager:
             "timestamp": persisted_ts,
             "seen": False
         }
-        data = json.dumps(payload)
 
-        if sender_role.lower() == "admin":
-            target_ws = self.user_connections.get(int(receiver_id))
-            if target_ws:
-                try:
-                    await target_ws["websocket"].send_text(data)
-                    print(f" Delivered to user {receiver_id}")
-                except Exception as e:
-                    print(f" Failed to deliver to user {receiver_id}: {e}")
-            else:
-                print(f" User {receiver_id} not online")
-        else:
-            if self.admin_connection:
-                try:
-                    await self.admin_connection.send_text(data)
-                    print(" Delivered to admin")
-                except Exception as e:
-                    print(" Failed to deliver to admin:", e)
-            else:
-                print(" Admin not online")
+        # admin messages go to the user and every admin session; user
+        # messages go to every admin session and echo back to the user
+        user_ids = [int(receiver_id)] if sender_role.lower() == "admin" else [int(sender_id)]
 
-        if sender_role.lower() == "admin":
-            if self.admin_connection:
-                try:
-                    await self.admin_connection.send_text(data)
-                except:
-                    pass
-        else:
-            sender_ws = self.user_connections.get(int(sender_id))
-            if sender_ws:
-                try:
-                    await sender_ws["websocket"].send_text(data)
-                except:
-                    pass
+        self.deliver_local(user_ids, True, Frame(payload))
+        if self.bus is not None:
+            try:
+                await self.bus.publish({
+                    "type": "deliver",
+                    "origin": WORKER_ID,
+                    "user_ids": user_ids,
+                    "admins": True,
+                    "payload": payload
+                })
+            except Exception as e:
+                print(f" Failed to publish message to other workers: {e}")
 
 
 manager = ConnectionManager()
@@ -182,26 +428,81 @@ async def websocket_endpoint(websocket: WebSocket,cookie : str = None):
         await websocket.close(code=1008)
         return
 
+    session_id = payload.get("sid")
+    if session_id and revocation_list.is_revoked(session_id):
+        print(" Session revoked")
+        await websocket.close(code=1008)
+        return
+
     user_id = payload.get("sub")
     role = payload.get("role")
     email = payload.get("email")
 
-    await websocket.accept()
-    await manager.connect(websocket, user_id, email, role)
+    # permessage-deflate is negotiated by the server (see main.py); the
+    # compact msgpack encoding is opted into with a subprotocol
+    subprotocol = negotiate_encoding(websocket.scope.get("subprotocols", []))
+    await websocket.accept(subprotocol=subprotocol)
+    encoding = MSGPACK if subprotocol else JSON
+    connection = await manager.connect(websocket, user_id, email, role, encoding)
 
     if role.lower() == "admin":
-        await manager.send_personal_message(json.dumps({"type": "system", "message": f"Connected as ADMIN - {email}"}), websocket)
+        await manager.send_personal_message({"type": "system", "message": f"Connected as ADMIN - {email}"}, connection)
     else:
-        await manager.send_personal_message(json.dumps({"type": "system", "message": f"Connected as USER - {email} (ID: {user_id})"}), websocket)
-
-    result = await get_chat_history(int(user_id))
-    await manager.send_personal_message(json.dumps({"type": "chat_history", "data": result}), websocket)
+        await manager.send_personal_message({"type": "system", "message": f"Connected as USER - {email} (ID: {user_id})"}, connection)
 
-    await manager.broadcast_online_status()
+    page = await get_chat_history(int(user_id))
+    await manager.send_personal_message({
+        "type": "chat_history",
+        "data": page["messages"],
+        "has_more": page["has_more"],
+        "next_cursor": page["next_cursor"]
+    }, connection)
 
     try:
         while True:
-            data = await websocket.receive_json()
+            incoming = await websocket.receive()
+            if incoming["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(incoming.get("code", 1000))
+            try:
+                data = decode_message(incoming)
+            except ValueError as e:
+                await manager.send_personal_message({"type": "error", "message": f"Malformed frame: {e}"}, connection)
+                continue
+
+            if data.get("type") == "load_history":
+                # scroll-back: users page through their own conversation,
+                # admins through the conversation with data["user_id"]
+                history_user = data.get("user_id") if role.lower() == "admin" else user_id
+                try:
+                    page = await get_chat_history(int(history_user), data.get("limit"), data.get("before"))
+                except (TypeError, ValueError) as e:
+                    await manager.send_personal_message({"type": "error", "message": str(e)}, connection)
+                    continue
+                await manager.send_personal_message({
+                    "type": "chat_history_page",
+                    "user_id": int(history_user),
+                    "data": page["messages"],
+                    "has_more": page["has_more"],
+                    "next_cursor": page["next_cursor"]
+                }, connection)
+                continue
+
+            if data.get("type") == "mark_seen":
+                # read receipt: everything up to `until` in the conversation
+                # (admins name the user, users read their admin thread)
+                is_admin = role.lower() == "admin"
+                try:
+                    conversation_user_id = int(data.get("user_id") if is_admin else user_id)
+                    reader_id, peer_id = (0, conversation_user_id) if is_admin else (conversation_user_id, 0)
+                    result = await mark_seen_until(reader_id, peer_id, str(data["until"]))
+                except (KeyError, TypeError, ValueError) as e:
+                    await manager.send_personal_message({"type": "error", "message": f"Invalid mark_seen: {e}"}, connection)
+                    continue
+                await manager.publish_read_receipt(
+                    "admin" if is_admin else "user", conversation_user_id, str(data["until"]), result["count"]
+                )
+                continue
+
             message = (data.get("message") or "").strip()
             if not message:
                 continue
@@ -211,7 +512,7 @@ async def websocket_endpoint(websocket: WebSocket,cookie : str = None):
             if role.lower() == "admin":
                 receiver_id = data.get("receiver_id")
                 if receiver_id is None:
-                    await manager.send_personal_message(json.dumps({"type": "error", "message": "receiver_id is required"}), websocket)
+                    await manager.send_personal_message({"type": "error", "message": "receiver_id is required"}, connection)
                     continue
                 await manager.send_private_message(int(user_id), int(receiver_id), message, role, sender_username)
             else:
@@ -219,12 +520,12 @@ async def websocket_endpoint(websocket: WebSocket,cookie : str = None):
 
     except WebSocketDisconnect:
         print(f" WebSocket disconnected normally for user {user_id}")
-        await manager.disconnect(user_id, role)
+        await manager.disconnect(connection)
     except Exception as e:
         print(f" Error in websocket loop: {e}")
         import traceback
         traceback.print_exc()
-        await manager.disconnect(user_id, role)
+        await manager.disconnect(connection)
 
 
 @router.get("/chat", response_class=HTMLResponse)
@@ -267,10 +568,31 @@ async def get_online_connection():
     }
 
 
+@router.get("/connections/stats")
+async def get_connection_stats():
+    """Per-socket frame counts and sizes for connections held by this worker."""
+    stats = manager.connection_stats()
+    return {"success": True, "total": len(stats), "connections": stats}
+
+
 @router.get("/history/{user_id}")
-async def get_user_chat(user_id: int):
-    history = await get_chat_history(user_id)
-    return {"success": True, "user_id": user_id, "message_count": len(history), "messages": history}
+async def get_user_chat(
+    user_id: int,
+    limit: Optional[int] = Query(None, ge=1, le=settings.CHAT_HISTORY_MAX_PAGE_SIZE),
+    before: Optional[str] = None
+):
+    try:
+        page = await get_chat_history(user_id, limit, before)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "success": True,
+        "user_id": user_id,
+        "message_count": len(page["messages"]),
+        "messages": page["messages"],
+        "has_more": page["has_more"],
+        "next_cursor": page["next_cursor"]
+    }
 
 
 @router.delete("/history/{user_id}")
@@ -1,15 +1,22 @@
+import asyncio
+import json
 import os
 from typing import List, Optional
 from bson import ObjectId
 from fastapi import APIRouter, File, Form, HTTPException, Body, Request, UploadFile
+from fastapi.responses import StreamingResponse
 from datetime import datetime
 from pydantic import EmailStr
 from app.auth.auth_utils import require_scope
 from app.core.database_mongo import collection_cm
 from app.crud.generic_crud import save_image, save_images
-from app.crud.terms_conditions_assist import store_terms_to_pinecone,ask_question
+from app.crud.content_store import CAROUSEL, CONTACT, FOUNDER, MANAGEMENT, TERMS, content_snapshot, find_content
+from app.services.terms_indexer import terms_index_job
+from app.services.rag_client import RagSidecarUnavailable, rag_client
+from app.core.config import get_settings
 from app.schemas.content_management_schema import TermsAndConditions
 
+settings = get_settings()
 router = APIRouter(prefix="/content_management", tags=["Content Management"])
 
 
@@ -30,23 +37,24 @@ async def update_terms_conditions(request : Request , data: TermsAndConditions =
                 {"_id": existing_doc["_id"]},
                 {"$set": {"terms_and_conditions": data_dict, "updated_at": datetime.utcnow()}}
             )
-            await store_terms_to_pinecone()
-        
+            indexing = terms_index_job.schedule()
 
-            return {"message": "Terms and Conditions updated successfully."}
+            return {"message": "Terms and Conditions updated successfully.", "indexing": indexing}
 
         else:
             new_doc = {
+                "type": TERMS,
                 "terms_and_conditions": data_dict,
                 "created_at": datetime.now(),
                 "updated_at": datetime.now()
             }
             insert_result = await collection_cm.insert_one(new_doc)
-            await store_terms_to_pinecone()
+            indexing = terms_index_job.schedule()
             
             return {
                 "message": "Terms and Conditions created successfully.",
-                "id": str(insert_result.inserted_id)
+                "id": str(insert_result.inserted_id),
+                "indexing": indexing
             }
             
     except Exception as e:
@@ -69,16 +77,104 @@ async def get_terms_conditions(request : Request):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/terms_conditions/reindex")
+@require_scope(["scope:write"])
+async def reindex_terms_conditions(request : Request, full: bool = False):
+    """
+    Queue a re-index of the Terms and Conditions. full=true rebuilds every chunk.
+    """
+    return {"message": "Re-indexing queued.", "indexing": terms_index_job.schedule(full=full)}
+
+
+@router.get("/terms_conditions/index_status")
+@require_scope(["scope:read"])
+async def get_terms_index_status(request : Request):
+    """
+    Status of the latest background re-index run in this worker.
+    """
+    return terms_index_job.get_status()
+
+
 @router.get("/ask_terms")
 @require_scope(["scope:read"])
 async def ask_terms(question: str, request: Request):
     
-    
-    response = ask_question(question=question)
+    if settings.RAG_SIDECAR_ENABLED:
+        try:
+            return {"answer": await rag_client.ask(question)}
+        except RagSidecarUnavailable as e:
+            if not settings.RAG_SIDECAR_FALLBACK:
+                raise HTTPException(status_code=503, detail="Terms assistant is unavailable")
+            print(f"RAG sidecar unavailable, answering in-process: {str(e)}")
+
+    from app.crud.terms_conditions_assist import ask_question
+
+    response = await asyncio.to_thread(ask_question, question)
     
     return {"answer": response}
 
 
+@router.get("/ask_terms/health")
+@require_scope(["scope:read"])
+async def ask_terms_health(request: Request):
+    """
+    Health and queue metrics of the RAG sidecar, when it is enabled.
+    """
+    if not settings.RAG_SIDECAR_ENABLED:
+        return {"sidecar": "disabled"}
+    try:
+        return await rag_client.health()
+    except RagSidecarUnavailable as e:
+        raise HTTPException(status_code=503, detail=f"RAG sidecar unavailable: {str(e)}")
+
+
+@router.get("/ask_terms/stream")
+@require_scope(["scope:read"])
+async def ask_terms_stream(question: str, request: Request):
+    """
+    Stream the answer as Server-Sent Events: one `data:` event per token,
+    then `event: done`. Failures are sent as `event: error`.
+    """
+    if settings.RAG_SIDECAR_ENABLED:
+        tokens = rag_client.astream(question)
+    else:
+        from app.crud.terms_conditions_assist import is_rag_initialized, rag_engine
+
+        if not is_rag_initialized():
+            raise HTTPException(status_code=503, detail="Terms assistant is not initialized yet")
+        tokens = rag_engine.astream_answer(question)
+
+    async def event_stream():
+        sent = False
+        try:
+            try:
+                async for token in tokens:
+                    if await request.is_disconnected():
+                        return
+                    sent = True
+                    yield f"data: {json.dumps(token)}\n\n"
+            except RagSidecarUnavailable as e:
+                if sent or not settings.RAG_SIDECAR_FALLBACK:
+                    raise
+                print(f"RAG sidecar unavailable, streaming in-process: {str(e)}")
+                from app.crud.terms_conditions_assist import rag_engine
+
+                async for token in rag_engine.astream_answer(question):
+                    if await request.is_disconnected():
+                        return
+                    yield f"data: {json.dumps(token)}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            print(f"Streaming answer failed: {str(e)}")
+            yield f"event: error\ndata: {json.dumps(str(e))}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post("/carousel/add")
 @require_scope(["scope:write"])
 async def add_carousel_image(
@@ -96,6 +192,7 @@ async def add_carousel_image(
         image_urls = await save_images(images, sub_static_dir)
 
         new_doc = {
+            "type": CAROUSEL,
             "title": title,
             "description": description,
             "images": image_urls,
@@ -104,6 +201,7 @@ async def add_carousel_image(
         }
 
         insert_result = await collection_cm.insert_one(new_doc)
+        content_snapshot.invalidate(CAROUSEL)
 
         return {
             "message": "Carousel image added successfully",
@@ -117,12 +215,9 @@ async def add_carousel_image(
     
 @router.get("/carousel/")
 @require_scope(["scope:read"])
-async def get_all_carousel_images(request : Request):
+async def get_all_carousel_images(request : Request, include_inactive: bool = False):
     try:
-        docs = await collection_cm.find().to_list(None)
-        for doc in docs:
-            doc["_id"] = str(doc["_id"])
-        return {"count": len(docs), "data": docs}
+        return await content_snapshot.get(CAROUSEL, include_inactive=include_inactive)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
@@ -139,7 +234,7 @@ async def update_carousel_image(
     images: Optional[List[UploadFile]] = File(None),
 ):
     try:
-        existing = await collection_cm.find_one({"_id": ObjectId(carousel_id)})
+        existing = await find_content(CAROUSEL, carousel_id)
         if not existing:
             raise HTTPException(status_code=404, detail="Carousel image not found")
 
@@ -171,6 +266,7 @@ async def update_carousel_image(
         await collection_cm.update_one(
             {"_id": ObjectId(carousel_id)}, {"$set": updated_fields}
         )
+        content_snapshot.invalidate(CAROUSEL)
 
         updated_doc = await collection_cm.find_one({"_id": ObjectId(carousel_id)})
         updated_doc["_id"] = str(updated_doc["_id"])
@@ -185,7 +281,7 @@ async def update_carousel_image(
 @require_scope(["scope:delete"])
 async def delete_carousel_image(request : Request,carousel_id: str):
     try:
-        existing = await collection_cm.find_one({"_id": ObjectId(carousel_id)})
+        existing = await find_content(CAROUSEL, carousel_id)
         if not existing:
             raise HTTPException(status_code=404, detail="Carousel image not found")
 
@@ -197,6 +293,7 @@ async def delete_carousel_image(request : Request,carousel_id: str):
                     os.remove(image_path)
                         
         await collection_cm.delete_one({"_id": ObjectId(carousel_id)})
+        content_snapshot.invalidate(CAROUSEL)
 
         return {"message": "Carousel image deleted successfully"}
 
@@ -218,6 +315,7 @@ async def add_management_member(
         image_url = await save_image(image, sub_static_dir) if image else None
 
         new_doc = {
+            "type": MANAGEMENT,
             "name": name,
             "position": position,
             "image": image_url,
@@ -226,6 +324,7 @@ async def add_management_member(
         }
 
         insert_result = await collection_cm.insert_one(new_doc)
+        content_snapshot.invalidate(MANAGEMENT)
 
         return {
             "message": "Management team member added successfully",
@@ -238,12 +337,9 @@ async def add_management_member(
 
 @router.get("/management/")
 @require_scope(["scope:read"])
-async def get_all_management_members(request : Request):
+async def get_all_management_members(request : Request, include_inactive: bool = False):
     try:
-        docs = await collection_cm.find().to_list(None)
-        for doc in docs:
-            doc["_id"] = str(doc["_id"])
-        return {"count": len(docs), "data": docs}
+        return await content_snapshot.get(MANAGEMENT, include_inactive=include_inactive)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -260,7 +356,7 @@ async def update_management_member(
     image: Optional[UploadFile] = File(None),
 ):
     try:
-        existing = await collection_cm.find_one({"_id": ObjectId(member_id)})
+        existing = await find_content(MANAGEMENT, member_id)
         if not existing:
             raise HTTPException(status_code=404, detail="Management team member not found")
 
@@ -292,6 +388,7 @@ async def update_management_member(
         await collection_cm.update_one(
             {"_id": ObjectId(member_id)}, {"$set": updated_fields}
         )
+        content_snapshot.invalidate(MANAGEMENT)
 
         updated_doc = await collection_cm.find_one({"_id": ObjectId(member_id)})
         updated_doc["_id"] = str(updated_doc["_id"])
@@ -306,7 +403,7 @@ async def update_management_member(
 @require_scope(["scope:delete"])
 async def delete_management_member(request : Request,member_id: str):
     try:
-        existing = await collection_cm.find_one({"_id": ObjectId(member_id)})
+        existing = await find_content(MANAGEMENT, member_id)
         if not existing:
             raise HTTPException(status_code=404, detail="Management team member not found")
 
@@ -317,6 +414,7 @@ async def delete_management_member(request : Request,member_id: str):
                 os.remove(image_path)
                 
         await collection_cm.delete_one({"_id": ObjectId(member_id)})
+        content_snapshot.invalidate(MANAGEMENT)
 
         return {"message": "Management team member deleted successfully"}
 
@@ -339,6 +437,7 @@ async def add_contact_details(
 ):
     try:
         new_doc = {
+            "type": CONTACT,
             "email": email,
             "phone": phone,
             "address": address,
@@ -351,6 +450,7 @@ async def add_contact_details(
         }
 
         insert_result = await collection_cm.insert_one(new_doc)
+        content_snapshot.invalidate(CONTACT)
 
         return {
             "message": "Contact details added successfully",
@@ -366,10 +466,7 @@ async def add_contact_details(
 @require_scope(["scope:read"])
 async def get_all_contact_details(request : Request):
     try:
-        docs = await collection_cm.find().to_list(None)
-        for doc in docs:
-            doc["_id"] = str(doc["_id"])
-        return {"count": len(docs), "data": docs}
+        return await content_snapshot.get(CONTACT)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -390,7 +487,7 @@ async def update_contact_details(
     zip_code: Optional[str] = Form(None),
 ):
     try:
-        existing = await collection_cm.find_one({"_id": ObjectId(contact_id)})
+        existing = await find_content(CONTACT, contact_id)
         if not existing:
             raise HTTPException(status_code=404, detail="Contact details not found")
 
@@ -420,6 +517,7 @@ async def update_contact_details(
         await collection_cm.update_one(
             {"_id": ObjectId(contact_id)}, {"$set": updated_fields}
         )
+        content_snapshot.invalidate(CONTACT)
 
         updated_doc = await collection_cm.find_one({"_id": ObjectId(contact_id)})
         updated_doc["_id"] = str(updated_doc["_id"])
@@ -434,11 +532,12 @@ async def update_contact_details(
 @require_scope(["scope:delete"])
 async def delete_contact_details(request : Request,contact_id: str):
     try:
-        existing = await collection_cm.find_one({"_id": ObjectId(contact_id)})
+        existing = await find_content(CONTACT, contact_id)
         if not existing:
             raise HTTPException(status_code=404, detail="Contact details not found")
 
         await collection_cm.delete_one({"_id": ObjectId(contact_id)})
+        content_snapshot.invalidate(CONTACT)
 
         return {"message": "Contact details deleted successfully"}
 
@@ -460,13 +559,15 @@ async def add_founder_info(
         image_url = await save_image(image, sub_static_dir) if image else None
 
         new_doc = {
+            "type": FOUNDER,
             "name": name,
             "title": title,
             "message": message,
-            "image": image,
+            "image": image_url,
         }
 
         insert_result = await collection_cm.insert_one(new_doc)
+        content_snapshot.invalidate(FOUNDER)
 
         return {
             "message": "Founder info added successfully",
@@ -482,10 +583,7 @@ async def add_founder_info(
 @require_scope(["scope:read"])
 async def get_all_founders(request : Request):
     try:
-        docs = await collection_cm.find().to_list(None)
-        for doc in docs:
-            doc["_id"] = str(doc["_id"])
-        return {"count": len(docs), "data": docs}
+        return await content_snapshot.get(FOUNDER)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -501,7 +599,7 @@ async def update_founder_info(
     image: Optional[UploadFile] = File(None),
 ):
     try:
-        existing = await collection_cm.find_one({"_id": ObjectId(founder_id)})
+        existing = await find_content(FOUNDER, founder_id)
         if not existing:
             raise HTTPException(status_code=404, detail="Founder info not found")
 
@@ -521,7 +619,7 @@ async def update_founder_info(
                 if os.path.exists(image_path):
                     os.remove(image_path)
             new_image_url = await save_image(image, sub_static_dir)
-            updated_fields["image_url"] = new_image_url
+            updated_fields["image"] = new_image_url
 
         if not updated_fields:
             raise HTTPException(status_code=400, detail="No fields provided to update")
@@ -529,6 +627,7 @@ async def update_founder_info(
         await collection_cm.update_one(
             {"_id": ObjectId(founder_id)}, {"$set": updated_fields}
         )
+        content_snapshot.invalidate(FOUNDER)
 
         updated_doc = await collection_cm.find_one({"_id": ObjectId(founder_id)})
         updated_doc["_id"] = str(updated_doc["_id"])
@@ -543,7 +642,7 @@ async def update_founder_info(
 @require_scope(["scope:delete"])
 async def delete_founder_info(request : Request,founder_id: str):
     try:
-        existing = await collection_cm.find_one({"_id": ObjectId(founder_id)})
+        existing = await find_content(FOUNDER, founder_id)
         if not existing:
             raise HTTPException(status_code=404, detail="Founder info not found")
 
@@ -554,6 +653,7 @@ async def delete_founder_info(request : Request,founder_id: str):
                 os.remove(image_path)
                 
         await collection_cm.delete_one({"_id": ObjectId(founder_id)})
+        content_snapshot.invalidate(FOUNDER)
 
         return {"message": "Founder info deleted successfully"}
 
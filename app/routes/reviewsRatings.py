@@ -10,10 +10,17 @@ from app.models.rating_reviews import RatingsReviews
 from app.utils import convertTOString
 from app.core.dependency import get_db
 from app.core.database_mongo import db
-from app.crud.generic_crud import delete_record, delete_record_mongo, filter_record, get_record_by_id, get_record_mongo,insert_record_mongo,insert_record
+from bson import ObjectId
+from app.crud.generic_crud import commit_db, filter_record, get_record_by_id, get_record_mongo, insert_record_flush
+from app.crud.room_ratings import apply_rating, get_room_reviews
+from app.core.config import get_settings
+from app.services.review_outbox import enqueue_review_delete, enqueue_review_upsert, kick_relay
+from app.models.room_rating_stats import RoomRatingStats
 from app.core.database_mongo import collection
 from app.utils import convertTOString
 
+settings = get_settings()
+
 router = APIRouter(prefix="/ratings_reviews", tags=["Ratings Reviews"])
 
 @router.post("/add", response_model=RatingsReviewsResponse)
@@ -28,18 +35,56 @@ async def create_ratings_reviews(
     if booking_instance.booking_status != BookingStatusEnum.COMPLETED.value:
         raise ValueError("The reviews can be enabled only after completing the stay")
     
-    result = await insert_record_mongo(collection=collection, data=ratings.model_dump())
+    # the document id is fixed up front; the outbox relay writes it to Mongo
+    object_id = convertTOString(ObjectId())
     
     dicts = {
         "booking_id": booking_instance.id,
         "room_id": booking_instance.room_id,
-        "object_id": convertTOString(result["_id"])
+        "object_id": object_id,
+        "ratings": ratings.ratings
     }
     
-    ratings_reviews_instance = await insert_record(db=db, model=RatingsReviews, **dicts)
+    # the review row, the room's rating aggregate and the outbox row commit together
+    ratings_reviews_instance = await insert_record_flush(db=db, model=RatingsReviews, **dicts)
+    apply_rating(db, booking_instance.room_id, ratings.ratings, 1)
+    enqueue_review_upsert(db, object_id, ratings.model_dump())
+    await commit_db(db)
+    db.refresh(ratings_reviews_instance)
+    kick_relay()
     
     return RatingsReviewsResponse.model_validate(ratings_reviews_instance)
 
+
+@router.get("/room/{room_id}")
+async def get_room_ratings_reviews(
+    room_id: int,
+    limit: Optional[int] = Query(None, ge=1, le=settings.REVIEWS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: Session = Depends(get_db)
+):
+    
+    try:
+        return await get_room_reviews(db=db, room_id=room_id, limit=limit or settings.REVIEWS_PAGE_SIZE, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/room/{room_id}/stats")
+async def get_room_rating_stats(room_id: int, db: Session = Depends(get_db)):
+    
+    stats = db.query(RoomRatingStats).filter(RoomRatingStats.room_id == room_id).first()
+    if not stats:
+        return {"room_id": room_id, "rating_count": 0, "avg_rating": None,
+                "histogram": {str(star): 0 for star in range(1, 6)}}
+    
+    return {
+        "room_id": room_id,
+        "rating_count": stats.rating_count,
+        "avg_rating": float(stats.avg_rating) if stats.avg_rating is not None else None,
+        "histogram": {str(star): getattr(stats, f"star_{star}") for star in range(1, 6)}
+    }
+
 @router.get("/{id}")
 async def get_ratings_reviews(ratings_reviews_id : int, db: Session = Depends(get_db)):
     
@@ -51,6 +96,17 @@ async def get_ratings_reviews(ratings_reviews_id : int, db: Session = Depends(ge
     return result
 
 
+async def delete_review_row(db: Session, instance: RatingsReviews):
+    """Delete the SQL review row, its rating and queue the Mongo delete in one commit."""
+    db.delete(instance)
+    # a row without ratings is not backfilled yet, so it was never counted
+    if instance.ratings is not None:
+        apply_rating(db, instance.room_id, instance.ratings, -1)
+    enqueue_review_delete(db, instance.object_id)
+    await commit_db(db)
+    kick_relay()
+
+
 @router.delete("/delete")
 async def delete_ratings_reviews(
     id: int,
@@ -65,31 +121,11 @@ async def delete_ratings_reviews(
     if not ratings_reviews_instance:
         raise HTTPException(status_code=404, detail="Review not found in SQL database")
 
-    print(f"Attempting to delete MongoDB record with object_id: {ratings_reviews_instance.object_id}")
-
-    mongo_result = await delete_record_mongo(
-        id=ratings_reviews_instance.object_id,
-        collection=collection
-    )
-
-    if not mongo_result["deleted"]:
-        error_msg = mongo_result.get("error", "MongoDB record not found")
-        print(f"MongoDB deletion failed: {error_msg}")
-        
-
-        await delete_record(db=db, model=RatingsReviews, id=id)
-        
-        return {
-            "message": "SQL record deleted, but MongoDB record was not found",
-            "deleted_mongo": False,
-            "deleted_sql": True,
-            "warning": error_msg
-        }
-
-    await delete_record(db=db, model=RatingsReviews, id=id)
+    # the Mongo document is removed by the outbox relay once this commits
+    await delete_review_row(db, ratings_reviews_instance)
 
     return {
         "message": "Review deleted successfully",
-        "deleted_mongo": True,
-        "deleted_sql": True
-    }
\ No newline at end of file
+        "deleted_sql": True,
+        "mongo_delete_queued": True
+    }
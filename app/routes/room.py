@@ -214,7 +214,8 @@ async def filter_advanced(
     no_of_child: Optional[int] = Query(None),
     no_of_adult: Optional[int] = Query(None),
     room_type_name: Optional[str] = Query(None),
-    ratings: Optional[int] = Query(None),
+    ratings: Optional[int] = Query(None, description="Minimum average rating"),
+    sort_by_rating: bool = Query(False, description="Highest rated rooms first"),
     feature_ids: Optional[List[int]] = Query(None),
     bed_type_ids: Optional[List[int]] = Query(None),
     check_in: Optional[date] = Query(None),
@@ -234,7 +235,8 @@ async def filter_advanced(
         check_in=check_in,
         check_out=check_out,
         no_of_child=no_of_child,
-        no_of_adult=no_of_adult
+        no_of_adult=no_of_adult,
+        sort_by_rating=sort_by_rating
     )
     
     rooms_list = [RoomResponse.model_validate(room) for room in result]
@@ -79,7 +79,7 @@ async def verify_email(
         password=instance.temp_user_data["password"],
     )
 
-    new_user = user.create_user(db, data)
+    new_user = await user.create_user(db, data)
 
 
     new_user.verified = True
@@ -140,7 +140,7 @@ def refresh_token(
         if not user_id:
             raise HTTPException(status_code=401, detail="Invalid refresh token")
         
-        new_tokens = user.refresh_access_token(db, user_id)
+        new_tokens = user.refresh_access_token(db, user_id, refresh_token, payload.get("sid"))
         
         response.set_cookie(
             key="access_token",
@@ -163,8 +163,12 @@ def refresh_token(
 
 @router.post("/logout")
 def logout(request: Request,
-    response: Response
+    response: Response,
+    db: Session = Depends(get_db)
 ):
+    session_id = getattr(request.state, "session_id", None)
+    if session_id:
+        user.revoke_session(db, session_id)
     
     response.delete_cookie(
         key="access_token",
@@ -0,0 +1,106 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+import numpy as np
+from app.core.metrics import metrics
+
+
+def normalize_question(question: str) -> str:
+    """Lower-case, collapse whitespace and drop surrounding punctuation."""
+    question = re.sub(r"\s+", " ", question.lower()).strip()
+    return question.strip("?!.,;: ")
+
+
+class CacheEntry:
+    def __init__(self, embedding: np.ndarray, answer: str, sources: List[Any]):
+        self.embedding = embedding
+        self.answer = answer
+        self.sources = sources
+        self.created_at = time.monotonic()
+
+
+class AnswerCache:
+    """
+    LRU/TTL cache of terms & conditions answers. Repeated questions are
+    matched on their normalized text; paraphrases on the cosine similarity
+    of the (normalized) question embedding. The whole cache belongs to one
+    index build and is dropped when the build timestamp changes.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int, similarity_threshold: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[str] = []
+        self._index_version = None
+        self._lock = threading.Lock()
+
+    def _check_version(self, index_version):
+        if index_version != self._index_version:
+            self._entries.clear()
+            self._matrix = None
+            self._index_version = index_version
+
+    def _expire(self):
+        now = time.monotonic()
+        expired = [key for key, entry in self._entries.items() if now - entry.created_at > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+    def get_exact(self, question: str, index_version) -> Optional[Tuple[str, List[Any]]]:
+        key = normalize_question(question)
+        with self._lock:
+            self._check_version(index_version)
+            self._expire()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+        metrics.incr("answer_cache.exact_hits")
+        return entry.answer, entry.sources
+
+    def get_similar(self, embedding, index_version) -> Optional[Tuple[str, List[Any]]]:
+        query = np.asarray(embedding, dtype=np.float32)
+        with self._lock:
+            self._check_version(index_version)
+            self._expire()
+            if not self._entries:
+                metrics.incr("answer_cache.misses")
+                return None
+
+            if self._matrix is None:
+                self._matrix_keys = list(self._entries.keys())
+                self._matrix = np.stack([self._entries[key].embedding for key in self._matrix_keys])
+
+            similarities = self._matrix @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.similarity_threshold:
+                metrics.incr("answer_cache.misses")
+                return None
+
+            key = self._matrix_keys[best]
+            entry = self._entries[key]
+            self._entries.move_to_end(key)
+        metrics.incr("answer_cache.semantic_hits")
+        return entry.answer, entry.sources
+
+    def put(self, question: str, embedding, answer: str, sources: List[Any], index_version):
+        key = normalize_question(question)
+        with self._lock:
+            self._check_version(index_version)
+            self._entries[key] = CacheEntry(np.asarray(embedding, dtype=np.float32), answer, sources)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
@@ -0,0 +1,222 @@
+import asyncio
+import json
+import os
+import uuid
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Dict, Optional
+from sqlalchemy import text
+from app.core.config import get_settings
+from app.core.metrics import metrics
+
+settings = get_settings()
+
+Handler = Callable[[Dict], Awaitable[None]]
+
+# Unique per worker process; events carry it so a worker can ignore its own.
+WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+class ChatBus(ABC):
+    """
+    Backplane that carries chat deliveries and presence between workers.
+    publish() sends an event to every worker, including the sender; the
+    handler passed to start() is called for each event received.
+    """
+
+    @abstractmethod
+    async def start(self, handler: Handler):
+        ...
+
+    @abstractmethod
+    async def publish(self, event: Dict):
+        ...
+
+    async def stop(self):
+        pass
+
+
+class LocalChatBus(ChatBus):
+    """Single-process stand-in: events are handed straight back to this worker."""
+
+    def __init__(self):
+        self._handler: Optional[Handler] = None
+
+    async def start(self, handler: Handler):
+        self._handler = handler
+
+    async def publish(self, event: Dict):
+        if self._handler is not None:
+            await self._handler(event)
+
+
+class PostgresChatBus(ChatBus):
+    """
+    Postgres LISTEN/NOTIFY backplane. One dedicated psycopg2 connection per
+    worker listens on the channel and is polled from the event loop;
+    notifications are sent with pg_notify through the regular engine.
+    NOTIFY payloads are limited to 8000 bytes, so larger events are written
+    to chat_bus_events and only their id is notified; listeners fetch the
+    row. If the listening connection drops, it is re-established with
+    backoff and a presence_request is published so presence is rebuilt.
+    """
+
+    MAX_PAYLOAD = 7999
+    RECONNECT_MAX_SECONDS = 30
+
+    def __init__(self, channel: str):
+        self.channel = channel
+        self._handler: Optional[Handler] = None
+        self._listen_conn = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks = set()
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    async def start(self, handler: Handler):
+        self._handler = handler
+        self._loop = asyncio.get_running_loop()
+        await asyncio.to_thread(self._create_spill_table)
+        await self._listen()
+        print(f"Chat bus listening on Postgres channel {self.channel}")
+
+    def _create_spill_table(self):
+        from app.core.database_postgres import engine
+
+        with engine.begin() as connection:
+            connection.execute(text("""
+            CREATE TABLE IF NOT EXISTS chat_bus_events (
+                id BIGSERIAL PRIMARY KEY,
+                payload TEXT NOT NULL,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            );
+            """))
+
+    def _connect(self):
+        import psycopg2
+        from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+        from app.core.database_postgres import DATABASE_URL
+
+        # keepalives make a silently dead connection fail instead of going quiet
+        conn = psycopg2.connect(DATABASE_URL, keepalives=1, keepalives_idle=30,
+                                keepalives_interval=10, keepalives_count=3)
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cur:
+            cur.execute(f'LISTEN "{self.channel}";')
+        return conn
+
+    async def _listen(self):
+        self._listen_conn = await asyncio.to_thread(self._connect)
+        self._loop.add_reader(self._listen_conn.fileno(), self._on_readable)
+
+    def _drop_connection(self):
+        if self._listen_conn is None:
+            return
+        try:
+            self._loop.remove_reader(self._listen_conn.fileno())
+        except Exception:
+            pass
+        try:
+            self._listen_conn.close()
+        except Exception:
+            pass
+        self._listen_conn = None
+
+    def _on_readable(self):
+        try:
+            self._listen_conn.poll()
+        except Exception as e:
+            print(f"Chat bus connection lost: {str(e)}")
+            metrics.incr("chat_bus.errors")
+            self._drop_connection()
+            if not self._stopping and (self._reconnect_task is None or self._reconnect_task.done()):
+                self._reconnect_task = self._loop.create_task(self._reconnect())
+            return
+
+        while self._listen_conn.notifies:
+            notify = self._listen_conn.notifies.pop(0)
+            try:
+                event = json.loads(notify.payload)
+            except ValueError:
+                continue
+            self._spawn(self._dispatch(event))
+
+    def _spawn(self, coro):
+        task = self._loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, event: Dict):
+        if "ref" in event:
+            payload = await asyncio.to_thread(self._fetch_spilled, event["ref"])
+            if payload is None:
+                metrics.incr("chat_bus.spill_missing")
+                return
+            event = json.loads(payload)
+        await self._handler(event)
+
+    async def _reconnect(self):
+        delay = 0.5
+        while not self._stopping:
+            await asyncio.sleep(delay)
+            try:
+                await self._listen()
+            except Exception as e:
+                print(f"Chat bus reconnect failed, retrying in {delay:.1f}s: {str(e)}")
+                delay = min(delay * 2, self.RECONNECT_MAX_SECONDS)
+                continue
+            metrics.incr("chat_bus.reconnects")
+            print(f"Chat bus reconnected to channel {self.channel}")
+            # anything published while disconnected was missed; ask every worker for fresh presence
+            try:
+                await self.publish({"type": "presence_request", "origin": WORKER_ID})
+            except Exception as e:
+                print(f"Chat bus presence request failed: {str(e)}")
+            return
+
+    def _notify(self, payload: str):
+        from app.core.database_postgres import engine
+
+        with engine.begin() as connection:
+            connection.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": self.channel, "payload": payload})
+
+    def _notify_spilled(self, payload: str):
+        from app.core.database_postgres import engine
+
+        # the notification is delivered at commit, when the row is already visible
+        with engine.begin() as connection:
+            ref = connection.execute(
+                text("INSERT INTO chat_bus_events (payload) VALUES (:payload) RETURNING id"), {"payload": payload}
+            ).scalar()
+            connection.execute(
+                text("SELECT pg_notify(:channel, :payload)"), {"channel": self.channel, "payload": json.dumps({"ref": ref})}
+            )
+            connection.execute(text("DELETE FROM chat_bus_events WHERE created_at < now() - interval '5 minutes'"))
+
+    def _fetch_spilled(self, ref: int) -> Optional[str]:
+        from app.core.database_postgres import engine
+
+        with engine.connect() as connection:
+            return connection.execute(
+                text("SELECT payload FROM chat_bus_events WHERE id = :id"), {"id": ref}
+            ).scalar()
+
+    async def publish(self, event: Dict):
+        payload = json.dumps(event)
+        if len(payload.encode("utf-8")) > self.MAX_PAYLOAD:
+            metrics.incr("chat_bus.spilled")
+            await asyncio.to_thread(self._notify_spilled, payload)
+        else:
+            await asyncio.to_thread(self._notify, payload)
+        metrics.incr("chat_bus.published")
+
+    async def stop(self):
+        self._stopping = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        self._drop_connection()
+
+
+def create_chat_bus() -> ChatBus:
+    if settings.CHAT_BUS_BACKEND == "postgres":
+        return PostgresChatBus(settings.CHAT_BUS_CHANNEL)
+    return LocalChatBus()
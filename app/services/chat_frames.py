@@ -0,0 +1,66 @@
+import json
+from typing import Dict, List, Optional, Union
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = "json"
+MSGPACK = "msgpack"
+
+# Clients ask for the compact binary encoding with this WebSocket subprotocol.
+MSGPACK_SUBPROTOCOL = "chat.msgpack"
+
+
+def negotiate_encoding(subprotocols: List[str]) -> Optional[str]:
+    """Return the subprotocol to accept, or None for plain JSON text frames."""
+    if msgpack is not None and MSGPACK_SUBPROTOCOL in subprotocols:
+        return MSGPACK_SUBPROTOCOL
+    return None
+
+
+class Frame:
+    """
+    An outgoing chat frame. It is encoded at most once per encoding, however
+    many sockets it fans out to.
+    """
+
+    __slots__ = ("payload", "_encoded")
+
+    def __init__(self, payload: Dict):
+        self.payload = payload
+        self._encoded: Dict[str, Union[str, bytes]] = {}
+
+    def encode(self, encoding: str) -> Union[str, bytes]:
+        data = self._encoded.get(encoding)
+        if data is None:
+            if encoding == MSGPACK:
+                data = msgpack.packb(self.payload, use_bin_type=True)
+            else:
+                data = json.dumps(self.payload)
+            self._encoded[encoding] = data
+        return data
+
+
+def decode_message(message: Dict) -> Dict:
+    """
+    Decode an incoming ASGI websocket.receive message in either encoding.
+    Raises ValueError for anything that is not a well-formed map.
+    """
+    try:
+        if message.get("bytes") is not None:
+            if msgpack is None:
+                raise ValueError("Binary frames are not supported")
+            data = msgpack.unpackb(message["bytes"], raw=False)
+        else:
+            data = json.loads(message.get("text") or "{}")
+    except ValueError:
+        raise
+    except Exception as e:
+        # msgpack reports some corrupt input with its own exception types
+        raise ValueError(str(e)) from e
+
+    if not isinstance(data, dict):
+        raise ValueError(f"Frame must be an object, not {type(data).__name__}")
+    return data
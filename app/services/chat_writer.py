@@ -0,0 +1,176 @@
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from app.core.metrics import metrics
+
+# Messages that could not be written during shutdown are spooled here and
+# replayed by the next worker that starts.
+SPOOL_PATH = "chat_writeback_spool.jsonl"
+DUPLICATE_KEY = 11000
+
+
+class ChatWriter:
+    """
+    Write-behind persistence for chat messages. Messages carry a
+    pre-generated ObjectId, are handed back to the caller at once and are
+    flushed with insert_many every flush_ms or batch_size messages. Seen
+    marks are coalesced per (reader, peer) to the latest timestamp and
+    applied in the same flush. stop() drains everything still queued.
+    """
+
+    def __init__(self, collection, batch_size: int, flush_ms: float, max_pending: int,
+                 on_inserted: Callable[[List[Dict]], Awaitable[None]],
+                 apply_seen: Callable[[int, int, datetime], Awaitable[int]]):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self.max_pending = max_pending
+        self.on_inserted = on_inserted
+        self.apply_seen = apply_seen
+        self._messages: List[Dict] = []
+        self._seen: Dict[Tuple[int, int], Tuple[datetime, List[asyncio.Future]]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._space: Optional[asyncio.Condition] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Condition()
+        await self._replay_spool()
+        self._task = asyncio.create_task(self._run())
+
+    async def enqueue(self, doc: Dict) -> Dict:
+        """Assign an _id and queue the message; waits only when max_pending messages are unflushed."""
+        doc.setdefault("_id", ObjectId())
+        if self._task is None:
+            await self._insert([doc])
+            return doc
+
+        async with self._space:
+            await self._space.wait_for(lambda: len(self._messages) < self.max_pending)
+            self._messages.append(doc)
+        metrics.set_gauge("chat_writer.pending", len(self._messages))
+        if len(self._messages) >= self.batch_size:
+            self._wakeup.set()
+        return doc
+
+    def pending_messages(self) -> List[Dict]:
+        return list(self._messages)
+
+    async def mark_seen(self, reader_id: int, peer_id: int, until: datetime) -> int:
+        """Queue a seen mark; resolves to the number of messages it newly covers."""
+        if self._task is None:
+            return await self.apply_seen(reader_id, peer_id, until)
+
+        future = asyncio.get_running_loop().create_future()
+        key = (reader_id, peer_id)
+        latest, waiters = self._seen.get(key, (until, []))
+        self._seen[key] = (max(latest, until), waiters + [future])
+        return await future
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        while self._messages:
+            batch = self._messages[:self.batch_size]
+            try:
+                await self._insert(batch)
+            except Exception as e:
+                metrics.incr("chat_writer.errors")
+                print(f"Chat write-behind flush failed, will retry: {str(e)}")
+                if not self._stopping:
+                    await asyncio.sleep(self.flush_interval)
+                    return
+                raise
+            del self._messages[:len(batch)]
+            async with self._space:
+                self._space.notify_all()
+            metrics.set_gauge("chat_writer.pending", len(self._messages))
+
+        if self._seen:
+            seen, self._seen = self._seen, {}
+            await asyncio.gather(*(self._flush_seen(key, until, waiters) for key, (until, waiters) in seen.items()))
+
+    async def _flush_seen(self, key, until, waiters):
+        try:
+            count = await self.apply_seen(key[0], key[1], until)
+        except Exception as e:
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+            return
+        # each caller gets the total for the coalesced update
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(count)
+
+    async def _insert(self, batch: List[Dict]):
+        start = time.perf_counter()
+        try:
+            await self.collection.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            # a retried batch may already be partly stored; ids are fixed, so duplicates are safe to ignore
+            if any(error.get("code") != DUPLICATE_KEY for error in e.details.get("writeErrors", [])):
+                raise
+        try:
+            await self.on_inserted(batch)
+        except Exception as e:
+            # the messages are stored; a stale summary is repaired by the next message
+            print(f"Chat post-insert hook failed: {str(e)}")
+        metrics.observe("chat_writer.flush", (time.perf_counter() - start) * 1000)
+        metrics.incr("chat_writer.written", len(batch))
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await asyncio.gather(self._task, return_exceptions=True)
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"Chat write-behind could not drain, spooling {len(self._messages)} messages: {str(e)}")
+            self._spool(self._messages)
+            self._messages = []
+        self._task = None
+
+    def _spool(self, docs: List[Dict]):
+        with open(SPOOL_PATH, "a") as f:
+            for doc in docs:
+                f.write(json.dumps({**doc, "_id": str(doc["_id"]), "timestamp": doc["timestamp"].isoformat()}) + "\n")
+
+    async def _replay_spool(self):
+        if not os.path.exists(SPOOL_PATH):
+            return
+        replay_path = f"{SPOOL_PATH}.{os.getpid()}"
+        try:
+            os.replace(SPOOL_PATH, replay_path)
+        except FileNotFoundError:
+            return
+        with open(replay_path) as f:
+            docs = [json.loads(line) for line in f if line.strip()]
+        for doc in docs:
+            doc["_id"] = ObjectId(doc["_id"])
+            doc["timestamp"] = datetime.fromisoformat(doc["timestamp"])
+        try:
+            for start in range(0, len(docs), self.batch_size):
+                await self._insert(docs[start:start + self.batch_size])
+        except Exception:
+            self._spool(docs)
+            raise
+        finally:
+            os.remove(replay_path)
+        print(f"Replayed {len(docs)} spooled chat messages")
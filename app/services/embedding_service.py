@@ -0,0 +1,239 @@
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from app.core.config import get_settings
+from app.core.metrics import metrics
+
+settings = get_settings()
+
+EMBEDDING_DIM = 384
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent content-hash -> vector cache. Vectors live in a memory-mapped
+    float32 file (<path>.f32) that grows by doubling; <path>.json maps each
+    hash to its row. Writers take an exclusive flock so several workers can
+    share one cache directory.
+    """
+
+    def __init__(self, path: str, dim: int, model_name: str):
+        self.vectors_path = f"{path}.f32"
+        self.index_path = f"{path}.json"
+        self.lock_path = f"{path}.lock"
+        self.dim = dim
+        self.model_name = model_name
+        self._rows: Dict[str, int] = {}
+        self._capacity = 0
+        self._vectors: Optional[np.memmap] = None
+        self._index_mtime = None
+        self._lock = threading.Lock()
+
+    def _open_vectors(self, capacity: int):
+        self._capacity = capacity
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim)) if capacity else None
+
+    def _refresh(self):
+        """Reload the row index when another process has extended the cache."""
+        if not os.path.exists(self.index_path):
+            return
+        mtime = os.stat(self.index_path).st_mtime
+        if mtime == self._index_mtime:
+            return
+        with open(self.index_path) as f:
+            data = json.load(f)
+        self._index_mtime = mtime
+        if data.get("model") != self.model_name or data.get("dim") != self.dim:
+            print(f"Embedding cache was built for {data.get('model')}, ignoring it")
+            return
+        self._rows = data["rows"]
+        self._open_vectors(data["capacity"])
+
+    def _grow(self, needed: int):
+        capacity = max(needed, self._capacity * 2, 256)
+        tmp_path = f"{self.vectors_path}.tmp"
+        grown = np.memmap(tmp_path, dtype=np.float32, mode="w+", shape=(capacity, self.dim))
+        if self._vectors is not None:
+            grown[:len(self._rows)] = self._vectors[:len(self._rows)]
+        grown.flush()
+        del grown
+        os.replace(tmp_path, self.vectors_path)
+        self._open_vectors(capacity)
+
+    def _write_index(self):
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"model": self.model_name, "dim": self.dim, "capacity": self._capacity, "rows": self._rows}, f)
+        os.replace(tmp_path, self.index_path)
+        self._index_mtime = os.stat(self.index_path).st_mtime
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        with self._lock:
+            self._refresh()
+            return {key: np.array(self._vectors[self._rows[key]]) for key in keys if key in self._rows}
+
+    def put_many(self, vectors: Dict[str, List[float]]):
+        if not vectors:
+            return
+        with self._lock, open(self.lock_path, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self._refresh()
+            fresh = [key for key in vectors if key not in self._rows]
+            if not fresh:
+                return
+            if len(self._rows) + len(fresh) > self._capacity:
+                self._grow(len(self._rows) + len(fresh))
+            for key in fresh:
+                row = len(self._rows)
+                self._vectors[row] = vectors[key]
+                self._rows[key] = row
+            self._vectors.flush()
+            self._write_index()
+
+
+class _PendingQuery:
+    __slots__ = ("text", "done", "vector", "error")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.done = threading.Event()
+        self.vector = None
+        self.error = None
+
+
+class EmbeddingService(Embeddings):
+    """
+    One shared sentence-transformers model for the whole process.
+
+    Document embeddings go through the on-disk EmbeddingCache, so unchanged
+    text is never re-embedded. Query embeddings are micro-batched: the first
+    caller waits EMBEDDING_BATCH_WINDOW_MS, then embeds every query that
+    arrived in the meantime in a single forward pass. Recent query vectors
+    are kept in a small in-memory LRU, so the answer-cache lookup and the
+    retriever share one embedding per question.
+    """
+
+    def __init__(self, model_name: str, dim: int, cache_path: str, window_ms: float, max_batch: int,
+                 query_cache_size: int = 1024):
+        self.model_name = model_name
+        self.cache = EmbeddingCache(cache_path, dim, model_name)
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._queue: List[_PendingQuery] = []
+        self._queue_lock = threading.Lock()
+        self._collecting = False
+        self.query_cache_size = query_cache_size
+        self._query_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._query_cache_lock = threading.Lock()
+
+    def get_model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from langchain_huggingface import HuggingFaceEmbeddings
+                    self._model = HuggingFaceEmbeddings(
+                        model_name=self.model_name,
+                        model_kwargs={"device": "cpu"},
+                        encode_kwargs={"normalize_embeddings": True}
+                    )
+        return self._model
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        start = time.perf_counter()
+        vectors = self.get_model().embed_documents(texts)
+        metrics.observe("embedding.forward", (time.perf_counter() - start) * 1000)
+        metrics.set_gauge("embedding.last_batch_size", len(texts))
+        metrics.incr("embedding.texts", len(texts))
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [content_hash(text) for text in texts]
+        cached = self.cache.get_many(keys)
+        metrics.incr("embedding.cache_hits", len(cached))
+
+        missing = list(dict.fromkeys(key for key in keys if key not in cached))
+        if missing:
+            metrics.incr("embedding.cache_misses", len(missing))
+            text_by_key = dict(zip(keys, texts))
+            fresh = {}
+            for start in range(0, len(missing), self.max_batch):
+                batch = missing[start:start + self.max_batch]
+                fresh.update(zip(batch, self._encode([text_by_key[key] for key in batch])))
+            self.cache.put_many(fresh)
+            cached.update({key: np.asarray(vector, dtype=np.float32) for key, vector in fresh.items()})
+
+        return [cached[key].tolist() for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        with self._query_cache_lock:
+            vector = self._query_cache.get(text)
+            if vector is not None:
+                self._query_cache.move_to_end(text)
+        if vector is not None:
+            metrics.incr("embedding.query_cache_hits")
+            return vector
+
+        vector = self._embed_query_batched(text)
+        if self.query_cache_size > 0:
+            with self._query_cache_lock:
+                self._query_cache[text] = vector
+                while len(self._query_cache) > self.query_cache_size:
+                    self._query_cache.popitem(last=False)
+        return vector
+
+    def _embed_query_batched(self, text: str) -> List[float]:
+        pending = _PendingQuery(text)
+        with self._queue_lock:
+            self._queue.append(pending)
+            leader = not self._collecting
+            self._collecting = True
+
+        if leader:
+            time.sleep(self.window)
+            self._drain()
+
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.vector
+
+    def _drain(self):
+        while True:
+            with self._queue_lock:
+                batch = self._queue[:self.max_batch]
+                del self._queue[:self.max_batch]
+                if not batch:
+                    self._collecting = False
+                    return
+            try:
+                for pending, vector in zip(batch, self._encode([p.text for p in batch])):
+                    pending.vector = vector
+            except Exception as e:
+                for pending in batch:
+                    pending.error = e
+            finally:
+                for pending in batch:
+                    pending.done.set()
+
+
+embedding_service = EmbeddingService(
+    model_name=settings.EMBEDDING_MODEL,
+    dim=EMBEDDING_DIM,
+    cache_path=settings.EMBEDDING_CACHE_PATH,
+    window_ms=settings.EMBEDDING_BATCH_WINDOW_MS,
+    max_batch=settings.EMBEDDING_MAX_BATCH,
+    query_cache_size=settings.EMBEDDING_QUERY_CACHE_SIZE
+)
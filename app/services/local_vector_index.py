@@ -0,0 +1,128 @@
+import glob
+import json
+import os
+import uuid
+from typing import Any, Dict, List, Tuple
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+
+# The chunks file is the manifest: it names the dense matrix written for the
+# same build, and replacing it is what publishes a new index. Each build's
+# matrix gets its own file, so a reader never pairs vectors with another
+# build's ids, texts and postings.
+CHUNKS_PATH = "hotel_terms_chunks.json"
+DENSE_PATTERN = "hotel_terms_dense.{build_id}.npy"
+LEGACY_DENSE_PATH = "hotel_terms_dense.npy"
+
+
+def _atomic_write(path: str, write):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def _manifest_dense_path():
+    try:
+        with open(CHUNKS_PATH) as f:
+            return json.load(f).get("dense_path", LEGACY_DENSE_PATH)
+    except (OSError, ValueError):
+        return None
+
+
+class LocalVectorIndex:
+    """
+    In-process hybrid index over the terms & conditions chunks: a float32
+    dense embedding matrix (memory-mapped from disk) plus an inverted index
+    over the BM25 document vectors. Scores are fused the same way as the
+    Pinecone hybrid retriever: alpha * dense + (1 - alpha) * sparse.
+    """
+
+    def __init__(self, ids: List[str], texts: List[str], dense, sparse: List[Dict]):
+        self.ids = ids
+        self.texts = texts
+        self.dense = dense
+        self.sparse = sparse
+        self._postings = self._build_postings(sparse)
+
+    @staticmethod
+    def _build_postings(sparse: List[Dict]) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+        postings: Dict[int, Tuple[List[int], List[float]]] = {}
+        for doc_idx, vector in enumerate(sparse):
+            for term, weight in zip(vector["indices"], vector["values"]):
+                docs, weights = postings.setdefault(term, ([], []))
+                docs.append(doc_idx)
+                weights.append(weight)
+        return {
+            term: (np.asarray(docs, dtype=np.int64), np.asarray(weights, dtype=np.float32))
+            for term, (docs, weights) in postings.items()
+        }
+
+    @classmethod
+    def exists(cls) -> bool:
+        return os.path.exists(CHUNKS_PATH)
+
+    @classmethod
+    def load(cls) -> "LocalVectorIndex":
+        with open(CHUNKS_PATH) as f:
+            data = json.load(f)
+        dense = np.load(data.get("dense_path", LEGACY_DENSE_PATH), mmap_mode="r")
+        if len(dense) != len(data["ids"]):
+            raise ValueError(f"Dense matrix has {len(dense)} rows for {len(data['ids'])} chunks")
+        return cls(data["ids"], data["texts"], dense, data["sparse"])
+
+    def save(self):
+        previous = _manifest_dense_path()
+        dense_path = DENSE_PATTERN.format(build_id=uuid.uuid4().hex)
+        dense = np.asarray(self.dense, dtype=np.float32)
+        payload = json.dumps({
+            "dense_path": dense_path, "ids": self.ids, "texts": self.texts, "sparse": self.sparse
+        }).encode("utf-8")
+        _atomic_write(dense_path, lambda f: np.save(f, dense))
+        _atomic_write(CHUNKS_PATH, lambda f: f.write(payload))
+
+        # the previous build's matrix stays for readers that already hold its manifest
+        keep = {dense_path, previous}
+        for path in glob.glob(DENSE_PATTERN.format(build_id="*")) + [LEGACY_DENSE_PATH]:
+            if path not in keep and os.path.exists(path):
+                os.remove(path)
+
+    def search(self, dense_query: List[float], sparse_query: Dict, top_k: int, alpha: float) -> List[Tuple[int, float]]:
+        if not self.ids:
+            return []
+
+        scores = alpha * (self.dense @ np.asarray(dense_query, dtype=np.float32))
+        for term, value in zip(sparse_query["indices"], sparse_query["values"]):
+            posting = self._postings.get(term)
+            if posting is not None:
+                docs, weights = posting
+                scores[docs] += (1 - alpha) * value * weights
+
+        top_k = min(top_k, len(scores))
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top]
+
+
+class LocalHybridRetriever(BaseRetriever):
+    """LangChain retriever over a LocalVectorIndex; a drop-in for the Pinecone hybrid retriever."""
+
+    embeddings: Embeddings
+    sparse_encoder: Any
+    index: Any
+    alpha: float = 0.5
+    top_k: int = 4
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        dense_query = self.embeddings.embed_query(query)
+        sparse_query = self.sparse_encoder.encode_queries(query)
+        return [
+            Document(
+                page_content=self.index.texts[i],
+                metadata={"id": self.index.ids[i], "score": score}
+            )
+            for i, score in self.index.search(dense_query, sparse_query, self.top_k, self.alpha)
+        ]
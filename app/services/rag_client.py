@@ -0,0 +1,96 @@
+import asyncio
+import itertools
+import json
+from typing import AsyncIterator, Dict
+from app.core.config import get_settings
+from app.core.metrics import metrics
+
+settings = get_settings()
+
+
+class RagSidecarUnavailable(Exception):
+    """The sidecar could not be reached or did not answer in time."""
+
+
+class RagSidecarError(RagSidecarUnavailable):
+    """
+    The sidecar answered with an error. It subclasses RagSidecarUnavailable
+    so callers fall back or return 503 the same way.
+    """
+
+
+class RagSidecarClient:
+    """
+    Thin async client for app.services.rag_sidecar. Each call opens its own
+    connection (cheap over a Unix socket), so a slow stream never holds up
+    other requests.
+    """
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self._ids = itertools.count(1)
+
+    async def _connect(self):
+        try:
+            if settings.RAG_SIDECAR_HOST:
+                return await asyncio.wait_for(
+                    asyncio.open_connection(settings.RAG_SIDECAR_HOST, settings.RAG_SIDECAR_PORT, limit=2 ** 22),
+                    timeout=self.timeout
+                )
+            return await asyncio.wait_for(
+                asyncio.open_unix_connection(settings.RAG_SIDECAR_SOCKET, limit=2 ** 22),
+                timeout=self.timeout
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            metrics.incr("rag_client.unavailable")
+            raise RagSidecarUnavailable(str(e)) from e
+
+    async def _messages(self, payload: Dict) -> AsyncIterator[Dict]:
+        reader, writer = await self._connect()
+        try:
+            writer.write((json.dumps({"id": next(self._ids), **payload}) + "\n").encode("utf-8"))
+            await writer.drain()
+            while True:
+                try:
+                    line = await asyncio.wait_for(reader.readline(), timeout=self.timeout)
+                except asyncio.TimeoutError as e:
+                    metrics.incr("rag_client.timeouts")
+                    raise RagSidecarUnavailable("RAG sidecar timed out") from e
+                if not line:
+                    raise RagSidecarUnavailable("RAG sidecar closed the connection")
+                message = json.loads(line)
+                if "error" in message:
+                    metrics.incr("rag_client.errors")
+                    raise RagSidecarError(message["error"])
+                yield message
+        except OSError as e:
+            raise RagSidecarUnavailable(str(e)) from e
+        finally:
+            writer.close()
+
+    async def _request(self, payload: Dict):
+        messages = self._messages(payload)
+        try:
+            async for message in messages:
+                return message.get("result")
+        finally:
+            await messages.aclose()
+
+    async def ask(self, question: str):
+        return await self._request({"op": "answer", "question": question})
+
+    async def astream(self, question: str) -> AsyncIterator[str]:
+        messages = self._messages({"op": "stream", "question": question})
+        try:
+            async for message in messages:
+                if message.get("done"):
+                    return
+                yield message["token"]
+        finally:
+            await messages.aclose()
+
+    async def health(self) -> Dict:
+        return await self._request({"op": "health"})
+
+
+rag_client = RagSidecarClient(timeout=settings.RAG_SIDECAR_TIMEOUT_SECONDS)
@@ -0,0 +1,157 @@
+"""
+Optional RAG inference sidecar.
+
+Holds one copy of the embedding model, retriever and LLM client for every
+API worker on the host. Start it with:
+
+    python -m app.services.rag_sidecar
+
+Protocol: newline-delimited JSON over a Unix socket (RAG_SIDECAR_SOCKET) or,
+when RAG_SIDECAR_HOST is set, TCP. Each request line is
+{"id": ..., "op": "answer" | "stream" | "embed" | "health", ...}; responses
+echo the id. "stream" sends one {"id", "token"} line per token followed by
+{"id", "done": true}.
+"""
+import asyncio
+import json
+import os
+import time
+from app.core.config import get_settings
+from app.core.metrics import metrics
+
+settings = get_settings()
+
+
+def serialize_docs(docs):
+    return [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in docs or []]
+
+
+class RagSidecar:
+    """
+    Serves RAG requests from API workers. Work is bounded by
+    RAG_SIDECAR_CONCURRENCY; concurrent query embeddings are merged into
+    single forward passes by the embedding service's micro-batching.
+    """
+
+    def __init__(self, concurrency: int):
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._queued = 0
+        self._in_flight = 0
+        self._started = time.time()
+
+    def _set_gauges(self):
+        metrics.set_gauge("rag_sidecar.queued", self._queued)
+        metrics.set_gauge("rag_sidecar.in_flight", self._in_flight)
+
+    async def _slot(self):
+        self._queued += 1
+        self._set_gauges()
+        await self._semaphore.acquire()
+        self._queued -= 1
+        self._in_flight += 1
+        self._set_gauges()
+
+    def _release(self):
+        self._in_flight -= 1
+        self._set_gauges()
+        self._semaphore.release()
+
+    def health(self):
+        from app.crud.terms_conditions_assist import is_rag_initialized
+
+        return {
+            "status": "healthy",
+            "initialized": is_rag_initialized(),
+            "uptime_seconds": round(time.time() - self._started, 1),
+            "queued": self._queued,
+            "in_flight": self._in_flight,
+            "metrics": metrics.snapshot()
+        }
+
+    async def handle(self, message, send):
+        from app.crud.terms_conditions_assist import ask_question, is_rag_initialized, rag_engine
+        from app.services.embedding_service import embedding_service
+
+        op = message.get("op")
+        if op == "health":
+            await send({"result": self.health()})
+            return
+
+        await self._slot()
+        start = time.perf_counter()
+        try:
+            if op == "answer":
+                answer, docs = await asyncio.to_thread(ask_question, message["question"])
+                await send({"result": [answer, serialize_docs(docs)]})
+            elif op == "stream":
+                if not is_rag_initialized():
+                    raise RuntimeError("Terms assistant is not initialized yet")
+                async for token in rag_engine.astream_answer(message["question"]):
+                    await send({"token": token})
+                await send({"done": True})
+            elif op == "embed":
+                texts = message["texts"]
+                if message.get("query"):
+                    vectors = await asyncio.gather(*(embedding_service.aembed_query(t) for t in texts))
+                else:
+                    vectors = await asyncio.to_thread(embedding_service.embed_documents, texts)
+                await send({"result": vectors})
+            else:
+                await send({"error": f"Unknown op: {op}"})
+            metrics.observe(f"rag_sidecar.{op}", (time.perf_counter() - start) * 1000)
+        except Exception as e:
+            metrics.incr("rag_sidecar.errors")
+            await send({"error": str(e)})
+        finally:
+            self._release()
+
+    async def serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        write_lock = asyncio.Lock()
+        tasks = set()
+
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+
+            async def send(payload, request_id=message.get("id")):
+                async with write_lock:
+                    writer.write((json.dumps({"id": request_id, **payload}) + "\n").encode("utf-8"))
+                    await writer.drain()
+
+            task = asyncio.create_task(self.handle(message, send))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        for task in list(tasks):
+            task.cancel()
+        writer.close()
+
+
+async def serve():
+    from app.crud import terms_conditions_assist
+
+    sidecar = RagSidecar(settings.RAG_SIDECAR_CONCURRENCY)
+    await asyncio.to_thread(terms_conditions_assist.warmup)
+
+    if settings.RAG_SIDECAR_HOST:
+        server = await asyncio.start_server(
+            sidecar.serve_connection, settings.RAG_SIDECAR_HOST, settings.RAG_SIDECAR_PORT, limit=2 ** 22
+        )
+        print(f"RAG sidecar listening on {settings.RAG_SIDECAR_HOST}:{settings.RAG_SIDECAR_PORT}")
+    else:
+        if os.path.exists(settings.RAG_SIDECAR_SOCKET):
+            os.remove(settings.RAG_SIDECAR_SOCKET)
+        server = await asyncio.start_unix_server(sidecar.serve_connection, settings.RAG_SIDECAR_SOCKET, limit=2 ** 22)
+        print(f"RAG sidecar listening on {settings.RAG_SIDECAR_SOCKET}")
+
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    asyncio.run(serve())
@@ -0,0 +1,89 @@
+import asyncio
+import time
+from typing import Dict, Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.core.config import get_settings
+from app.core.database_postgres import SessionLocal
+from app.core.metrics import metrics
+
+settings = get_settings()
+
+# Each target is reaped through its expiry index; a session row is only dead
+# once both tokens are past expiry, so no revocation needs to be recorded.
+REAP_TARGETS: Dict[str, str] = {
+    "token_store": "refresh_token_expiry <= now() AND access_token_expiry <= now()",
+    "otps": "expiry IS NOT NULL AND expiry <= now()",
+    "revoked_sessions": "expires_at <= now()",
+}
+
+
+def reap_batch(db: Session, table: str, batch_size: int) -> int:
+    """
+    Delete at most batch_size expired rows in one short transaction. Rows
+    locked by other transactions are skipped rather than waited on.
+    """
+    condition = REAP_TARGETS[table]
+    db.execute(text(f"SET LOCAL lock_timeout = '{int(settings.REAPER_LOCK_TIMEOUT_MS)}ms'"))
+    result = db.execute(
+        text(f"""
+        DELETE FROM {table}
+        WHERE ctid IN (
+            SELECT ctid FROM {table}
+            WHERE {condition}
+            LIMIT :batch_size
+            FOR UPDATE SKIP LOCKED
+        );
+        """),
+        {"batch_size": batch_size}
+    )
+    db.commit()
+    return result.rowcount
+
+
+def reap_table(table: str, db: Optional[Session] = None) -> Dict:
+    """Reap one table in bounded batches, pausing between batches, and record throughput."""
+    batch_size = settings.REAPER_BATCH_SIZE
+    pause = settings.REAPER_BATCH_PAUSE_MS / 1000
+
+    own_session = db is None
+    db = db or SessionLocal()
+    deleted = 0
+    batches = 0
+    start = time.perf_counter()
+    try:
+        while batches < settings.REAPER_MAX_BATCHES:
+            count = reap_batch(db, table, batch_size)
+            batches += 1
+            deleted += count
+            if count < batch_size:
+                break
+            time.sleep(pause)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        if own_session:
+            db.close()
+
+    elapsed = time.perf_counter() - start
+    rows_per_sec = round(deleted / elapsed, 2) if elapsed > 0 else 0.0
+
+    metrics.incr(f"reaper.{table}.deleted", deleted)
+    metrics.incr(f"reaper.{table}.batches", batches)
+    metrics.observe(f"reaper.{table}.run", elapsed * 1000)
+    metrics.set_gauge(f"reaper.{table}.rows_per_sec", rows_per_sec)
+
+    return {"table": table, "deleted": deleted, "batches": batches, "rows_per_sec": rows_per_sec}
+
+
+async def reaper_job():
+    for table in REAP_TARGETS:
+        try:
+            stats = await asyncio.to_thread(reap_table, table)
+            if stats["deleted"]:
+                print(f"Reaped {stats['deleted']} expired rows from {table} "
+                      f"in {stats['batches']} batches ({stats['rows_per_sec']} rows/s)")
+        except Exception as e:
+            metrics.incr(f"reaper.{table}.errors")
+            print(f"Reaper failed for {table}: {str(e)}")
@@ -0,0 +1,249 @@
+import asyncio
+import time
+from typing import Dict, List, Optional
+from bson import ObjectId
+from pymongo import DeleteOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.core.config import get_settings
+from app.core.database_mongo import collection
+from app.core.database_postgres import SessionLocal
+from app.core.metrics import metrics
+from app.models.review_outbox import ReviewOutbox
+
+settings = get_settings()
+
+# Only one relay drains the outbox at a time across all workers, so the
+# operations for a review reach Mongo in the order they were committed.
+RELAY_LOCK_KEY = 48120001
+
+_kick_task: Optional[asyncio.Task] = None
+
+# Set after Mongo is unreachable; relay passes are skipped until then.
+_backoff_until = 0.0
+_backoff_seconds = 0.0
+BACKOFF_MAX_SECONDS = 60.0
+
+
+class MongoUnavailable(Exception):
+    """The batch could not be written for reasons unrelated to its documents."""
+
+
+def enqueue_review_upsert(db: Session, object_id: str, payload: Dict):
+    """Record a review document write; committed by the caller with its SQL change."""
+    db.add(ReviewOutbox(op="upsert", object_id=object_id, payload=payload))
+
+
+def enqueue_review_delete(db: Session, object_id: str):
+    db.add(ReviewOutbox(op="delete", object_id=object_id))
+
+
+def _to_mongo(row) -> Optional[object]:
+    if not ObjectId.is_valid(row.object_id):
+        return None
+    if row.op == "upsert":
+        return UpdateOne({"_id": ObjectId(row.object_id)}, {"$set": row.payload or {}}, upsert=True)
+    return DeleteOne({"_id": ObjectId(row.object_id)})
+
+
+async def relay_batch(db: Session, batch_size: int) -> int:
+    """
+    Apply one batch of pending outbox rows to Mongo with a single ordered
+    bulk_write. Upserts and deletes are keyed on the pre-generated _id, so
+    replaying a row after a crash is harmless. Returns the rows processed,
+    or -1 when another worker holds the relay lock.
+    """
+    if not db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": RELAY_LOCK_KEY}).scalar():
+        db.rollback()
+        return -1
+
+    rows = db.execute(text("""
+    SELECT id, op, object_id, payload
+    FROM review_outbox
+    WHERE processed_at IS NULL AND attempts < :max_attempts
+    ORDER BY id
+    LIMIT :limit;
+    """), {"max_attempts": settings.REVIEW_OUTBOX_MAX_ATTEMPTS, "limit": batch_size}).fetchall()
+    if not rows:
+        db.rollback()
+        return 0
+
+    ops, op_rows, invalid_ids = [], [], []
+    for row in rows:
+        op = _to_mongo(row)
+        if op is None:
+            invalid_ids.append(row.id)
+        else:
+            ops.append(op)
+            op_rows.append(row)
+
+    applied, failed_id, error = len(op_rows), None, None
+    try:
+        if ops:
+            await collection.bulk_write(ops, ordered=True)
+    except BulkWriteError as e:
+        write_errors = e.details.get("writeErrors") or []
+        if not write_errors:
+            # only a write concern error: nothing is wrong with the documents
+            db.rollback()
+            raise MongoUnavailable(str(e)) from e
+        # ordered: everything before the first failing op was applied
+        applied = write_errors[0]["index"]
+        failed_id, error = op_rows[applied].id, str(write_errors[0].get("errmsg"))
+    except Exception as e:
+        # connection or server selection failure: the rows are untouched and
+        # retried after a backoff, so an outage never counts against attempts
+        db.rollback()
+        raise MongoUnavailable(str(e)) from e
+
+    done_ids = [row.id for row in op_rows[:applied]] + invalid_ids
+    if done_ids:
+        db.execute(text("UPDATE review_outbox SET processed_at = now() WHERE id = ANY(:ids);"), {"ids": done_ids})
+    if failed_id is not None:
+        db.execute(text("""
+        UPDATE review_outbox SET attempts = attempts + 1, last_error = :error WHERE id = :id;
+        """), {"id": failed_id, "error": error})
+        metrics.incr("review_outbox.errors")
+        print(f"Review outbox relay failed on row {failed_id}: {error}")
+    db.commit()
+
+    metrics.incr("review_outbox.relayed", len(done_ids))
+    return len(done_ids) if failed_id is None else 0
+
+
+async def relay_review_outbox():
+    """Drain the outbox batch by batch until it is empty, a batch fails, or another worker has the lock."""
+    global _backoff_until, _backoff_seconds
+    if time.monotonic() < _backoff_until:
+        return
+
+    db = SessionLocal()
+    start = time.perf_counter()
+    try:
+        while await relay_batch(db, settings.REVIEW_OUTBOX_BATCH_SIZE) == settings.REVIEW_OUTBOX_BATCH_SIZE:
+            pass
+        _backoff_seconds = 0.0
+        pending = db.execute(text("SELECT COUNT(*) FROM review_outbox WHERE processed_at IS NULL;")).scalar()
+        db.rollback()
+        metrics.set_gauge("review_outbox.pending", pending)
+    except MongoUnavailable as e:
+        _backoff_seconds = min(max(_backoff_seconds * 2, settings.REVIEW_OUTBOX_RELAY_SECONDS), BACKOFF_MAX_SECONDS)
+        _backoff_until = time.monotonic() + _backoff_seconds
+        metrics.incr("review_outbox.unavailable")
+        print(f"Review outbox relay paused for {_backoff_seconds:.0f}s, Mongo unavailable: {str(e)}")
+    except Exception as e:
+        db.rollback()
+        metrics.incr("review_outbox.errors")
+        print(f"Review outbox relay failed: {str(e)}")
+    finally:
+        db.close()
+        metrics.observe("review_outbox.relay", (time.perf_counter() - start) * 1000)
+
+
+def kick_relay():
+    """Start a relay pass right after a commit instead of waiting for the next scheduled one."""
+    global _kick_task
+    if _kick_task is None or _kick_task.done():
+        _kick_task = asyncio.create_task(relay_review_outbox())
+
+
+def _has_pending(db: Session, object_ids: List[str]) -> set:
+    if not object_ids:
+        return set()
+    rows = db.execute(text("""
+    SELECT DISTINCT object_id FROM review_outbox
+    WHERE processed_at IS NULL AND object_id = ANY(:ids);
+    """), {"ids": object_ids}).fetchall()
+    return {row.object_id for row in rows}
+
+
+def pending_documents(db: Session, object_ids: List[str]) -> Dict[str, Dict]:
+    """
+    The document each id will have once the relay catches up, for ids whose
+    latest pending outbox row is an upsert. Readers use it to serve reviews
+    committed in SQL but not yet written to Mongo.
+    """
+    if not object_ids:
+        return {}
+    rows = db.execute(text("""
+    SELECT DISTINCT ON (object_id) object_id, op, payload FROM review_outbox
+    WHERE processed_at IS NULL AND object_id = ANY(:ids)
+    ORDER BY object_id, id DESC;
+    """), {"ids": object_ids}).fetchall()
+    return {row.object_id: row.payload or {} for row in rows if row.op == "upsert"}
+
+
+async def reconcile_reviews(db: Session, sample_size: int) -> Dict:
+    """
+    Spot-check a random sample in both directions. A SQL row whose document
+    is missing gets its last relayed upsert replayed; a Mongo document with
+    no SQL row gets a delete queued. Ids with outbox work still pending are
+    left alone.
+    """
+    report = {"checked": 0, "replayed": 0, "orphans_queued": 0, "unrecoverable": 0}
+
+    # SQL -> Mongo
+    rows = db.execute(text("""
+    SELECT object_id FROM ratings_reviews ORDER BY random() LIMIT :limit;
+    """), {"limit": sample_size}).fetchall()
+    sql_ids = [row.object_id for row in rows if ObjectId.is_valid(row.object_id)]
+    found = await collection.find({"_id": {"$in": [ObjectId(i) for i in sql_ids]}}, {"_id": 1}).to_list(None)
+    found_ids = {str(doc["_id"]) for doc in found}
+    missing = [i for i in sql_ids if i not in found_ids]
+    pending = _has_pending(db, missing)
+    missing = [i for i in missing if i not in pending]
+    report["checked"] += len(sql_ids)
+
+    for object_id in missing:
+        last = db.execute(text("""
+        SELECT payload FROM review_outbox
+        WHERE object_id = :object_id AND op = 'upsert'
+        ORDER BY id DESC LIMIT 1;
+        """), {"object_id": object_id}).fetchone()
+        if last is not None:
+            enqueue_review_upsert(db, object_id, last.payload)
+            report["replayed"] += 1
+        else:
+            report["unrecoverable"] += 1
+            print(f"Review {object_id} has no document and nothing to replay")
+
+    # Mongo -> SQL
+    docs = await collection.aggregate([{"$sample": {"size": sample_size}}, {"$project": {"_id": 1}}]).to_list(None)
+    mongo_ids = [str(doc["_id"]) for doc in docs]
+    report["checked"] += len(mongo_ids)
+    if mongo_ids:
+        referenced = db.execute(text("""
+        SELECT object_id FROM ratings_reviews WHERE object_id = ANY(:ids);
+        """), {"ids": mongo_ids}).fetchall()
+        referenced_ids = {row.object_id for row in referenced}
+        orphans = [i for i in mongo_ids if i not in referenced_ids]
+        pending = _has_pending(db, orphans)
+        for object_id in orphans:
+            if object_id not in pending:
+                enqueue_review_delete(db, object_id)
+                report["orphans_queued"] += 1
+
+    # processed rows are kept a while so missing documents can be replayed
+    db.execute(text("""
+    DELETE FROM review_outbox
+    WHERE processed_at IS NOT NULL AND processed_at < now() - make_interval(days => :days);
+    """), {"days": settings.REVIEW_OUTBOX_RETENTION_DAYS})
+    db.commit()
+    return report
+
+
+async def reconcile_reviews_job():
+    db = SessionLocal()
+    try:
+        report = await reconcile_reviews(db, settings.REVIEW_RECONCILE_SAMPLE_SIZE)
+        metrics.incr("review_outbox.drift_replayed", report["replayed"])
+        metrics.incr("review_outbox.drift_orphans", report["orphans_queued"])
+        metrics.incr("review_outbox.drift_unrecoverable", report["unrecoverable"])
+        print(f"Review reconciliation: checked {report['checked']}, replayed {report['replayed']}, "
+              f"queued {report['orphans_queued']} orphan deletes, {report['unrecoverable']} unrecoverable")
+    except Exception as e:
+        db.rollback()
+        print(f"Review reconciliation failed: {str(e)}")
+    finally:
+        db.close()
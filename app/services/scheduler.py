@@ -1,13 +1,19 @@
+import asyncio
+from app.auth.revocation import revocation_list
+from app.core.config import get_settings
 from app.core.dependency import get_db
 from app.crud.backup_restore import take_backup, take_backup_mongo
 from app.models.Enum import BookingStatusEnum, RefundStatusEnum
 from app.models.bookings import Bookings
-from app.models.otps import OTPModel
 from app.models.refund import Refunds
+from app.services.reaper import reaper_job
+from app.crud.room_ratings import repair_room_ratings_job
+from app.services.review_outbox import reconcile_reviews_job, relay_review_outbox
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from datetime import datetime, timedelta, timezone
 from sqlalchemy.orm import Session
 
+settings = get_settings()
 scheduler = AsyncIOScheduler()
 
 async def update_status_job():
@@ -51,23 +57,6 @@ async def update_status_job():
         if booking_updated > 0:
             db.commit()
             print(f"Updated {booking_updated} bookings to COMPLETED")
-
-        otp_rows = db.query(OTPModel).filter().all()
-        
-        otp_deleted = 0
-        for row in otp_rows:
-            expiry = row.expiry
-            
-            if expiry.tzinfo is None:
-                expiry = expiry.replace(tzinfo=timezone.utc)
-            
-            if now > expiry:
-                db.delete(row)
-                otp_deleted += 1
-        
-        if otp_deleted > 0:
-            db.commit()
-            print(f"Deleted {otp_deleted} expired OTPs")
             
     except Exception as e:
         db.rollback()
@@ -96,7 +85,25 @@ async def daily_backup_job():
 
 
 
+async def sync_revocations_job():
+    try:
+        await asyncio.to_thread(revocation_list.sync)
+    except Exception as e:
+        print(f"Revocation sync failed: {str(e)}")
+
+
+
 scheduler.add_job(update_status_job, 'interval', minutes=1)
 
+scheduler.add_job(sync_revocations_job, 'interval', seconds=settings.REVOCATION_SYNC_SECONDS)
+
+scheduler.add_job(reaper_job, 'interval', minutes=settings.REAPER_INTERVAL_MINUTES)
+
+
+scheduler.add_job(daily_backup_job, 'cron', hour=2, minute=0)
+
+scheduler.add_job(repair_room_ratings_job, 'cron', hour=3, minute=0)
+
+scheduler.add_job(relay_review_outbox, 'interval', seconds=settings.REVIEW_OUTBOX_RELAY_SECONDS, max_instances=1, coalesce=True)
 
-scheduler.add_job(daily_backup_job, 'cron', hour=2, minute=0)
\ No newline at end of file
+scheduler.add_job(reconcile_reviews_job, 'interval', minutes=settings.REVIEW_RECONCILE_MINUTES)
\ No newline at end of file
@@ -0,0 +1,64 @@
+import asyncio
+from datetime import datetime
+from typing import Dict, Optional
+
+
+class TermsIndexJob:
+    """
+    Runs terms & conditions re-indexing in the background, one run at a
+    time per worker. Updates that arrive during a run are coalesced into a
+    single follow-up run so the index always ends on the latest terms.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._rerun = False
+        self._rerun_full = False
+        self._run_id = 0
+        self.status: Dict = {"state": "idle"}
+
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def schedule(self, full: bool = False) -> Dict:
+        if self.is_running():
+            self._rerun = True
+            self._rerun_full = self._rerun_full or full
+            self.status["rerun_pending"] = True
+            return self.get_status()
+
+        self.status = {"state": "queued", "queued_at": datetime.now().isoformat()}
+        self._task = asyncio.get_running_loop().create_task(self._run(full))
+        return self.get_status()
+
+    async def _run(self, full: bool):
+        # imported here so the RAG stack is only loaded once indexing is needed
+        from app.crud.terms_conditions_assist import store_terms_to_pinecone
+
+        while True:
+            self._rerun = False
+            self._run_id += 1
+            self.status = {
+                "state": "running",
+                "run_id": self._run_id,
+                "started_at": datetime.now().isoformat(),
+                "full": full
+            }
+            try:
+                stats = await store_terms_to_pinecone(full=full)
+                self.status.update(state="succeeded", **stats)
+            except Exception as e:
+                print(f"Terms indexing failed: {str(e)}")
+                self.status.update(state="failed", error=str(e))
+            self.status["finished_at"] = datetime.now().isoformat()
+
+            if not self._rerun:
+                break
+            full = self._rerun_full
+            self._rerun_full = False
+
+    def get_status(self) -> Dict:
+        return dict(self.status)
+
+
+terms_index_job = TermsIndexJob()
@@ -4,7 +4,7 @@ from datetime import datetime
 from requests import Session
 
 from app.models.role import Roles
-from app.models.token_store import TokenStore
+from app.services.reaper import reap_table
 
 def convertTOString(object_id: ObjectId) -> str:
     return str(object_id)
@@ -20,8 +20,4 @@ def get_role(db: Session,role_id :int):
 
 
 def cleanup_expired_tokens(db: Session):
-    now = datetime.now()
-    db.query(TokenStore).filter(
-        (TokenStore.access_token_expiry <= now) | (TokenStore.refresh_token_expiry <= now)
-    ).delete(synchronize_session=False)
-    db.commit()
+    return reap_table("token_store", db)
@@ -1,4 +1,13 @@
 import uvicorn
 
 if __name__ == "__main__":
-    uvicorn.run("app.main:application", host="127.0.0.1", port=8000, reload=True)
+    # the websockets implementation negotiates permessage-deflate with
+    # clients that offer it, compressing chat, history and presence frames
+    uvicorn.run(
+        "app.main:application",
+        host="127.0.0.1",
+        port=8000,
+        reload=True,
+        ws="websockets",
+        ws_per_message_deflate=True
+    )
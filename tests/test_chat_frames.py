@@ -0,0 +1,65 @@
+import pytest
+from app.services import chat_frames
+from app.services.chat_frames import JSON, MSGPACK, MSGPACK_SUBPROTOCOL, Frame, decode_message, negotiate_encoding
+
+
+def test_json_frame_round_trip():
+    frame = Frame({"type": "message", "message": "hello"})
+
+    assert decode_message({"text": frame.encode(JSON)}) == {"type": "message", "message": "hello"}
+
+
+def test_frame_is_encoded_once_per_encoding():
+    frame = Frame({"type": "presence"})
+
+    assert frame.encode(JSON) is frame.encode(JSON)
+
+
+def test_empty_text_frame_decodes_to_empty_map():
+    assert decode_message({"text": None}) == {}
+
+
+@pytest.mark.parametrize("text", ["[1, 2]", "3", '"load_history"', "null"])
+def test_non_map_json_frames_are_rejected(text):
+    with pytest.raises(ValueError):
+        decode_message({"text": text})
+
+
+def test_malformed_json_is_rejected():
+    with pytest.raises(ValueError):
+        decode_message({"text": "{not json"})
+
+
+def test_json_is_negotiated_without_the_subprotocol():
+    assert negotiate_encoding(["chat.v2"]) is None
+
+
+def test_binary_frames_need_msgpack(monkeypatch):
+    monkeypatch.setattr(chat_frames, "msgpack", None)
+
+    with pytest.raises(ValueError):
+        decode_message({"bytes": b"\x80"})
+    assert negotiate_encoding([MSGPACK_SUBPROTOCOL]) is None
+
+
+class TestMsgpack:
+    @pytest.fixture(autouse=True)
+    def _require_msgpack(self):
+        pytest.importorskip("msgpack")
+
+    def test_round_trip(self):
+        frame = Frame({"type": "message", "message": "hello"})
+
+        assert decode_message({"bytes": frame.encode(MSGPACK)}) == {"type": "message", "message": "hello"}
+        assert negotiate_encoding([MSGPACK_SUBPROTOCOL]) == MSGPACK_SUBPROTOCOL
+
+    @pytest.mark.parametrize("value", [[1, 2], 7, "text"])
+    def test_non_map_frames_are_rejected(self, value):
+        import msgpack
+
+        with pytest.raises(ValueError):
+            decode_message({"bytes": msgpack.packb(value)})
+
+    def test_corrupt_frames_are_rejected(self):
+        with pytest.raises(ValueError):
+            decode_message({"bytes": b"\xc1"})
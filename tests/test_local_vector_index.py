@@ -0,0 +1,52 @@
+import glob
+import json
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("langchain_core")
+
+from app.services import local_vector_index
+from app.services.local_vector_index import CHUNKS_PATH, LocalVectorIndex
+
+
+def build(ids):
+    dense = np.eye(len(ids), 4, dtype=np.float32)
+    sparse = [{"indices": [i], "values": [1.0]} for i in range(len(ids))]
+    return LocalVectorIndex(ids, [f"text {i}" for i in ids], dense, sparse)
+
+
+def test_load_reads_the_matrix_named_by_the_manifest(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    build(["a", "b"]).save()
+    build(["c", "d", "e"]).save()
+
+    index = LocalVectorIndex.load()
+
+    assert index.ids == ["c", "d", "e"]
+    assert len(index.dense) == 3
+
+
+def test_save_keeps_only_the_current_and_previous_matrix(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for ids in (["a"], ["b"], ["c"]):
+        build(ids).save()
+
+    with open(CHUNKS_PATH) as f:
+        current = json.load(f)["dense_path"]
+    remaining = glob.glob(local_vector_index.DENSE_PATTERN.format(build_id="*"))
+
+    assert len(remaining) == 2
+    assert current in remaining
+
+
+def test_load_rejects_a_matrix_from_another_build(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    build(["a", "b"]).save()
+    with open(CHUNKS_PATH) as f:
+        manifest = json.load(f)
+    manifest["ids"].append("c")
+    with open(CHUNKS_PATH, "w") as f:
+        json.dump(manifest, f)
+
+    with pytest.raises(ValueError):
+        LocalVectorIndex.load()
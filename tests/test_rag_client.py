@@ -0,0 +1,42 @@
+import asyncio
+import json
+import pytest
+
+pytest.importorskip("pydantic_settings")
+
+from app.services import rag_client as rag_client_module
+from app.services.rag_client import RagSidecarClient, RagSidecarError, RagSidecarUnavailable
+
+
+def serve_once(socket_path, reply):
+    async def handle(reader, writer):
+        request = json.loads(await reader.readline())
+        writer.write((json.dumps({"id": request["id"], **reply}) + "\n").encode("utf-8"))
+        await writer.drain()
+        writer.close()
+
+    return asyncio.start_unix_server(handle, path=socket_path)
+
+
+def ask(tmp_path, monkeypatch, reply):
+    socket_path = str(tmp_path / "sidecar.sock")
+    monkeypatch.setattr(rag_client_module.settings, "RAG_SIDECAR_HOST", None)
+    monkeypatch.setattr(rag_client_module.settings, "RAG_SIDECAR_SOCKET", socket_path)
+
+    async def run():
+        server = await serve_once(socket_path, reply)
+        async with server:
+            return await RagSidecarClient(timeout=5).ask("Can I cancel?")
+
+    return asyncio.run(run())
+
+
+def test_answer_is_returned(tmp_path, monkeypatch):
+    assert ask(tmp_path, monkeypatch, {"result": "Yes, up to 48 hours before."}) == "Yes, up to 48 hours before."
+
+
+def test_error_reply_is_handled_like_an_unavailable_sidecar(tmp_path, monkeypatch):
+    with pytest.raises(RagSidecarUnavailable) as excinfo:
+        ask(tmp_path, monkeypatch, {"error": "Terms assistant is not initialized yet"})
+
+    assert isinstance(excinfo.value, RagSidecarError)
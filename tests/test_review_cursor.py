@@ -0,0 +1,26 @@
+from datetime import datetime, timezone
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("motor")
+pytest.importorskip("pydantic_settings")
+
+from app.crud.room_ratings import decode_review_cursor, encode_review_cursor
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2026, 3, 4, 5, 6, 7, 890123, tzinfo=timezone.utc)
+
+    assert decode_review_cursor(encode_review_cursor(created_at, 42)) == (created_at, 42)
+
+
+def test_cursor_is_url_safe():
+    cursor = encode_review_cursor(datetime(2026, 1, 1, tzinfo=timezone.utc), 7)
+
+    assert all(ch.isalnum() or ch in "-_=" for ch in cursor)
+
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", "bm8tc2VwYXJhdG9y", "MjAyNi0wMS0wMXxub3QtYW4taWQ="])
+def test_malformed_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_review_cursor(cursor)
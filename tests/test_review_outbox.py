@@ -0,0 +1,127 @@
+import asyncio
+from collections import namedtuple
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("motor")
+pytest.importorskip("pydantic_settings")
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, ServerSelectionTimeoutError
+from app.services import review_outbox
+
+Row = namedtuple("Row", "id op object_id payload")
+
+
+class FakeResult:
+    def __init__(self, scalar=None, rows=None):
+        self._scalar = scalar
+        self._rows = rows or []
+
+    def scalar(self):
+        return self._scalar
+
+    def fetchall(self):
+        return self._rows
+
+
+class FakeSession:
+    def __init__(self, rows, locked=True):
+        self.rows = rows
+        self.locked = locked
+        self.processed = []
+        self.failed = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        if "pg_try_advisory_xact_lock" in sql:
+            return FakeResult(scalar=self.locked)
+        if "SELECT id, op, object_id, payload" in sql:
+            return FakeResult(rows=self.rows)
+        if "SET processed_at" in sql:
+            self.processed.extend(params["ids"])
+        elif "attempts = attempts + 1" in sql:
+            self.failed.append(params["id"])
+        return FakeResult()
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class FakeCollection:
+    def __init__(self, error=None):
+        self.error = error
+        self.batches = []
+
+    async def bulk_write(self, ops, ordered):
+        self.batches.append(ops)
+        if self.error:
+            raise self.error
+
+
+def rows(count):
+    return [Row(i + 1, "upsert", str(ObjectId()), {"ratings": 5}) for i in range(count)]
+
+
+def run_batch(monkeypatch, session, collection):
+    monkeypatch.setattr(review_outbox, "collection", collection)
+    return asyncio.run(review_outbox.relay_batch(session, batch_size=10))
+
+
+def test_whole_batch_is_marked_processed(monkeypatch):
+    session = FakeSession(rows(3))
+
+    assert run_batch(monkeypatch, session, FakeCollection()) == 3
+    assert session.processed == [1, 2, 3]
+    assert session.failed == []
+
+
+def test_partial_failure_marks_prefix_and_charges_only_the_failing_row(monkeypatch):
+    session = FakeSession(rows(4))
+    error = BulkWriteError({"writeErrors": [{"index": 2, "errmsg": "bad document"}]})
+
+    assert run_batch(monkeypatch, session, FakeCollection(error)) == 0
+    assert session.processed == [1, 2]
+    assert session.failed == [3]
+    assert session.commits == 1
+
+
+def test_invalid_object_ids_are_retired_without_a_write(monkeypatch):
+    session = FakeSession([
+        Row(1, "delete", "not-an-object-id", None),
+        Row(2, "upsert", str(ObjectId()), {"ratings": 4}),
+    ])
+
+    run_batch(monkeypatch, session, FakeCollection())
+    assert sorted(session.processed) == [1, 2]
+
+
+def test_outage_leaves_rows_untouched(monkeypatch):
+    session = FakeSession(rows(3))
+
+    with pytest.raises(review_outbox.MongoUnavailable):
+        run_batch(monkeypatch, session, FakeCollection(ServerSelectionTimeoutError("no servers")))
+    assert session.processed == []
+    assert session.failed == []
+    assert session.commits == 0
+
+
+def test_write_concern_error_is_treated_as_an_outage(monkeypatch):
+    session = FakeSession(rows(2))
+    error = BulkWriteError({"writeErrors": [], "writeConcernErrors": [{"errmsg": "timeout"}]})
+
+    with pytest.raises(review_outbox.MongoUnavailable):
+        run_batch(monkeypatch, session, FakeCollection(error))
+    assert session.failed == []
+
+
+def test_lock_held_elsewhere(monkeypatch):
+    session = FakeSession(rows(2), locked=False)
+
+    assert run_batch(monkeypatch, session, FakeCollection()) == -1
+    assert session.processed == []
@@ -0,0 +1,141 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("pydantic_settings")
+pytest.importorskip("fastapi_mail")
+
+from app.auth import revocation
+from app.auth.revocation import BloomFilter, RevocationList
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(size_bits=4096, hashes=4)
+    keys = [f"session-{i}" for i in range(200)]
+    for key in keys:
+        bloom.add(key)
+
+    assert all(bloom.might_contain(key) for key in keys)
+
+
+def test_empty_bloom_filter_contains_nothing():
+    bloom = BloomFilter(size_bits=1024, hashes=3)
+
+    assert not bloom.might_contain("session-1")
+
+
+def test_bloom_false_positive_rate_is_low():
+    bloom = BloomFilter(size_bits=1 << 16, hashes=4)
+    for i in range(1000):
+        bloom.add(f"revoked-{i}")
+
+    false_positives = sum(bloom.might_contain(f"live-{i}") for i in range(10000))
+    assert false_positives < 100
+
+
+def test_bloom_hit_is_confirmed_against_exact_set():
+    revoked = RevocationList(size_bits=8, hashes=1)
+    revoked.add("revoked", NOW + timedelta(minutes=5))
+
+    # a one-byte filter collides for almost everything; the exact set decides
+    assert revoked.is_revoked("revoked")
+    assert not revoked.is_revoked("some-other-session")
+
+
+def test_prune_drops_expired_revocations():
+    revoked = RevocationList(size_bits=4096, hashes=3)
+    revoked.add("expired", NOW - timedelta(seconds=1))
+    revoked.add("live", NOW + timedelta(minutes=5))
+
+    revoked.prune(NOW)
+
+    assert not revoked.is_revoked("expired")
+    assert revoked.is_revoked("live")
+
+
+class FakeQuery:
+    def __init__(self, rows):
+        self.rows = rows
+        self.since = None
+
+    def filter(self, condition):
+        self.since = condition.right.value
+        return self
+
+    def all(self):
+        return [
+            (session_id, expires_at) for session_id, expires_at, created_at in self.rows
+            if self.since is None or created_at >= self.since
+        ]
+
+
+class FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def query(self, *columns):
+        return FakeQuery(self.rows)
+
+    def close(self):
+        pass
+
+
+def test_sync_applies_unexpired_rows(monkeypatch):
+    now = datetime.now(timezone.utc)
+    rows = [("first", now + timedelta(minutes=5), now), ("already-expired", now - timedelta(minutes=5), now)]
+    monkeypatch.setattr(revocation, "SessionLocal", lambda: FakeSession(rows))
+    revoked = RevocationList(size_bits=4096, hashes=3)
+
+    assert revoked.sync() == 2
+    assert revoked.is_revoked("first")
+    assert not revoked.is_revoked("already-expired")
+
+
+def test_sync_picks_up_rows_committed_late(monkeypatch):
+    now = datetime.now(timezone.utc)
+    rows = [("early", now + timedelta(minutes=5), now)]
+    monkeypatch.setattr(revocation, "SessionLocal", lambda: FakeSession(rows))
+    revoked = RevocationList(size_bits=4096, hashes=3)
+    revoked.sync()
+
+    # inserted before the last sync but only committed after it
+    rows.append(("slow-commit", now + timedelta(minutes=5), now - timedelta(seconds=10)))
+    revoked.sync()
+
+    assert revoked.is_revoked("slow-commit")
+
+
+class FakeOrmSession:
+    def __init__(self):
+        self.info = {}
+
+
+class FakeConnection:
+    def execute(self, statement):
+        pass
+
+
+def test_revocation_is_applied_only_after_commit(monkeypatch):
+    revoked = RevocationList(size_bits=4096, hashes=3)
+    monkeypatch.setattr(revocation, "revocation_list", revoked)
+    session = FakeOrmSession()
+
+    revocation.record_revocation(session, FakeConnection(), "logged-out", NOW + timedelta(minutes=5))
+    assert not revoked.is_revoked("logged-out")
+
+    revocation._apply_committed_revocations(session)
+    assert revoked.is_revoked("logged-out")
+
+
+def test_rolled_back_revocation_is_dropped(monkeypatch):
+    revoked = RevocationList(size_bits=4096, hashes=3)
+    monkeypatch.setattr(revocation, "revocation_list", revoked)
+    session = FakeOrmSession()
+
+    revocation.record_revocation(session, FakeConnection(), "rolled-back", NOW + timedelta(minutes=5))
+    revocation._drop_rolled_back_revocations(session)
+    revocation._apply_committed_revocations(session)
+
+    assert not revoked.is_revoked("rolled-back")
@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("pydantic_settings")
+pytest.importorskip("fastapi_mail")
+
+from app.auth import scope_mask
+from app.auth.scope_mask import ADMIN_FULL_SCOPE, role_mask, scope_bit, scope_claim_mask, scopes_to_mask
+
+
+def make_role(role_id, *scope_names):
+    return SimpleNamespace(id=role_id, scope=[SimpleNamespace(scope_name=name) for name in scope_names])
+
+
+@pytest.fixture(autouse=True)
+def clear_role_masks():
+    scope_mask.invalidate_role_mask()
+    yield
+    scope_mask.invalidate_role_mask()
+
+
+def test_scope_bits_are_distinct_and_stable():
+    first = scope_bit("room:read")
+
+    assert scope_bit("room:read") == first
+    assert scope_bit("room:write") != first
+    assert bin(first).count("1") == 1
+
+
+def test_default_scopes_are_compiled_at_import():
+    assert ADMIN_FULL_SCOPE in scope_mask._scope_bits
+    assert "booking:write" in scope_mask._scope_bits
+
+
+def test_unseen_scope_gets_a_new_bit():
+    known = set(scope_mask._scope_bits.values())
+
+    assert scope_bit("test:only-in-this-test") not in known
+
+
+def test_mask_is_the_union_of_scope_bits():
+    mask = scopes_to_mask(["room:read", "booking:write"])
+
+    assert mask == scope_bit("room:read") | scope_bit("booking:write")
+    assert not mask & scope_bit("room:write")
+
+
+def test_claim_mask_matches_scope_list():
+    assert scope_claim_mask("room:read booking:write") == scopes_to_mask(["room:read", "booking:write"])
+    assert scope_claim_mask("") == 0
+
+
+def test_role_mask_is_cached_until_invalidated():
+    role = make_role(101, "room:read")
+    assert role_mask(role) == scope_bit("room:read")
+
+    role.scope.append(SimpleNamespace(scope_name="room:write"))
+    assert role_mask(role) == scope_bit("room:read")
+
+    scope_mask.invalidate_role_mask(101)
+    assert role_mask(role) == scope_bit("room:read") | scope_bit("room:write")
+
+
+def test_role_mask_recompiles_after_ttl(monkeypatch):
+    role = make_role(102, "room:read")
+    role_mask(role)
+    role.scope = [SimpleNamespace(scope_name="floor:read")]
+
+    monkeypatch.setattr(scope_mask.settings, "SCOPE_MASK_TTL_SECONDS", 0)
+    assert role_mask(role) == scope_bit("floor:read")
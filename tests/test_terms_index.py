@@ -0,0 +1,80 @@
+import sys
+import types
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("motor")
+pytest.importorskip("langchain_core")
+pytest.importorskip("pydantic_settings")
+
+from app.crud import terms_conditions_assist as assist
+
+
+def test_diff_chunk_ids_reports_added_positions_and_removed_ids():
+    new_positions, removed_ids = assist.diff_chunk_ids(["a", "b", "c"], ["b", "d"])
+
+    assert new_positions == [0, 2]
+    assert removed_ids == ["d"]
+
+
+def test_diff_chunk_ids_unchanged():
+    assert assist.diff_chunk_ids(["a", "b"], ["b", "a"]) == ([], [])
+
+
+def test_diff_chunk_ids_without_previous_index_adds_everything():
+    assert assist.diff_chunk_ids(["a", "b"], []) == ([0, 1], [])
+
+
+class FakeBM25:
+    def default(self):
+        return self
+
+    def fit(self, chunks):
+        self.chunks = chunks
+
+    def dump(self, path):
+        pass
+
+    def encode_documents(self, chunks):
+        return [{"indices": [i], "values": [1.0]} for i in range(len(chunks))]
+
+
+class FakeEmbeddings:
+    def embed_documents(self, texts):
+        return [[1.0] * assist.EMBEDDING_DIM for _ in texts]
+
+
+class FakePineconeIndex:
+    def __init__(self):
+        self.deletes = []
+
+    def delete(self, **kwargs):
+        self.deletes.append(kwargs)
+
+
+@pytest.fixture
+def pinecone_backend(monkeypatch):
+    sparse_module = types.ModuleType("pinecone_text.sparse")
+    sparse_module.BM25Encoder = FakeBM25
+    monkeypatch.setitem(sys.modules, "pinecone_text", types.ModuleType("pinecone_text"))
+    monkeypatch.setitem(sys.modules, "pinecone_text.sparse", sparse_module)
+
+    index = FakePineconeIndex()
+    upserted = []
+    monkeypatch.setattr(assist.settings, "RAG_RETRIEVER_BACKEND", "pinecone")
+    monkeypatch.setattr(assist, "initialize_pinecone", lambda: index)
+    monkeypatch.setattr(assist, "upsert_to_pinecone", lambda _index, ids, *rest: upserted.extend(ids))
+    monkeypatch.setattr(assist.rag_engine, "get_embeddings", lambda: FakeEmbeddings())
+    monkeypatch.setattr(assist.LocalVectorIndex, "save", lambda self: None)
+    return index, upserted
+
+
+def test_first_incremental_run_clears_pinecone(monkeypatch, pinecone_backend):
+    index, upserted = pinecone_backend
+    monkeypatch.setattr(assist.LocalVectorIndex, "exists", classmethod(lambda cls: False))
+
+    result = assist.index_chunks(["first chunk", "second chunk"], full=False)
+
+    assert index.deletes == [{"delete_all": True}]
+    assert len(upserted) == 2
+    assert result["full"] is True